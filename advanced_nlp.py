@@ -9,29 +9,49 @@ lepiej zrozumieć kontekst rozmowy i odpowiednio generować pytania.
 import os
 import logging
 import json
-from google.cloud import aiplatform
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 import random
+from llm_cache import LLMCache, make_cache_key
+from lazy_import import lazy_module
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Inicjalizacja Google AI
-HAS_GOOGLE_AI = False
-google_ai_client = None
+# Google AI (aiplatform) ładowane i inicjalizowane przy pierwszym użyciu,
+# a nie przy imporcie modułu - init() odpytuje metadane i poświadczenia GCP
+aiplatform = lazy_module("google.cloud.aiplatform")
 
-try:
-    aiplatform.init()
-    google_ai_client = aiplatform.PredictionService()
-    HAS_GOOGLE_AI = True
-    logger.info("Zainicjalizowano klienta Google AI")
-except Exception as e:
-    logger.warning(f"Google AI jest niedostępne: {str(e)}")
+_google_ai_client = None
+_google_ai_initialized = False
+_google_ai_lock = threading.Lock()
 
-# Cache na wyniki analizy
-analysis_cache = {}
+def get_google_ai_client():
+    """
+    Zwraca klienta Google AI, inicjalizując go przy pierwszym wywołaniu.
+
+    Returns:
+        PredictionService lub None: Klient lub None, gdy Google AI jest niedostępne
+    """
+    global _google_ai_client, _google_ai_initialized
+    if _google_ai_initialized:
+        return _google_ai_client
+
+    with _google_ai_lock:
+        if not _google_ai_initialized:
+            try:
+                aiplatform.init()
+                _google_ai_client = aiplatform.PredictionService()
+                logger.info("Zainicjalizowano klienta Google AI")
+            except Exception as e:
+                logger.warning(f"Google AI jest niedostępne: {str(e)}")
+            _google_ai_initialized = True
+    return _google_ai_client
+
+# Cache na wyniki analizy (współdzielony przez wszystkie procesy)
+analysis_cache = LLMCache("advanced_nlp")
 
 class NLPModels:
     GOOGLE_TEXT = "text-bison@002"
@@ -42,10 +62,13 @@ def analyze_text(text, cache_key=None):
     """
     Analizuje tekst używając Google AI
     """
-    if cache_key and cache_key in analysis_cache:
-        return analysis_cache[cache_key]
+    if cache_key:
+        cached_analysis = analysis_cache.get(cache_key)
+        if cached_analysis is not None:
+            return cached_analysis
 
-    if not HAS_GOOGLE_AI:
+    google_ai_client = get_google_ai_client()
+    if google_ai_client is None:
         return {
             "analysis": "System analizy chwilowo niedostępny.",
             "sentiment": "neutral",
@@ -65,7 +88,7 @@ def analyze_text(text, cache_key=None):
         }
 
         if cache_key:
-            analysis_cache[cache_key] = analysis
+            analysis_cache.set(cache_key, analysis)
 
         return analysis
 
@@ -102,10 +125,11 @@ def analyze_emotional_state(context: List[Dict[str, Any]]) -> Dict[str, Any]:
             conversation_text += f"Odpowiedź: {item['response']}\n\n"
 
     # Cache'owanie na podstawie zawartości rozmowy
-    cache_key = hash(conversation_text)
-    if cache_key in analysis_cache:
+    cache_key = make_cache_key(NLPModels.GOOGLE_TEXT, None, {"task": "emotional_state"}, conversation_text)
+    cached_analysis = analysis_cache.get(cache_key)
+    if cached_analysis is not None:
         logger.info("Używam zbuforowanej analizy emocjonalnej")
-        return analysis_cache[cache_key]
+        return cached_analysis
 
     # Domyślna analiza na wypadek błędów
     default_analysis = {
@@ -115,7 +139,7 @@ def analyze_emotional_state(context: List[Dict[str, Any]]) -> Dict[str, Any]:
     }
 
     # Spróbuj użyć Google AI do analizy
-    analysis = analyze_text(conversation_text, cache_key)
+    analysis = analyze_text(conversation_text, make_cache_key(NLPModels.GOOGLE_TEXT, None, {"task": "text_analysis"}, conversation_text))
     
     # Extract relevant information from Google AI analysis (adapt as needed)
     dominant_emotions = analysis.get("analysis", {}).get("dominant_emotions", []) or ["neutral"]
@@ -129,6 +153,7 @@ def analyze_emotional_state(context: List[Dict[str, Any]]) -> Dict[str, Any]:
         "suggested_focus_areas": suggested_focus_areas
     }
 
+    analysis_cache.set(cache_key, final_analysis)
 
     return final_analysis
 
@@ -137,7 +162,8 @@ def generate_therapeutic_response(conversation_history):
     """
     Generuje odpowiedź terapeutyczną używając Google AI
     """
-    if not HAS_GOOGLE_AI:
+    google_ai_client = get_google_ai_client()
+    if google_ai_client is None:
         return "Przepraszamy, system odpowiedzi jest chwilowo niedostępny."
 
     try:
@@ -161,7 +187,7 @@ def generate_advanced_question(context: Optional[List[Dict[str, Any]]] = None) -
     """
     # Jeśli nie ma kontekstu, wygeneruj pytanie inicjujące
     if not context or len(context) == 0:
-        if random.random() < 0.7 and HAS_GOOGLE_AI:
+        if random.random() < 0.7 and get_google_ai_client() is not None:
             initial_question = _generate_initial_question()
             return initial_question, {"model": "advanced", "context_used": False}
         else:
@@ -180,10 +206,10 @@ def generate_advanced_question(context: Optional[List[Dict[str, Any]]] = None) -
             conversation_text += f"Data: {item['date']}\n\n"
 
     # Cache'owanie na podstawie zawartości rozmowy
-    cache_key = hash(conversation_text)
-    if cache_key in analysis_cache:
+    cache_key = make_cache_key(NLPModels.GOOGLE_CHAT, None, {"task": "contextual_question"}, conversation_text)
+    cached_question = analysis_cache.get(cache_key)
+    if cached_question:
         logger.info("Używam zbuforowanego pytania")
-        cached_question = analysis_cache[cache_key]
         return cached_question, {"model": "cached", "context_used": True, "emotional_analysis": emotional_analysis}
 
     # Dostępne stany emocjonalne i sugerowane typy pytań
@@ -212,7 +238,7 @@ def generate_advanced_question(context: Optional[List[Dict[str, Any]]] = None) -
 
     # Dodaj do cache
     if generated_question:
-        analysis_cache[cache_key] = generated_question
+        analysis_cache.set(cache_key, generated_question)
 
     return generated_question or random.choice(DEFAULT_QUESTIONS), {
         "model": "advanced",
@@ -237,7 +263,8 @@ def _generate_initial_question() -> str:
     Odpowiedz tylko samym pytaniem, bez dodatkowego tekstu.
     """
 
-    if HAS_GOOGLE_AI and google_ai_client:
+    google_ai_client = get_google_ai_client()
+    if google_ai_client:
         try:
             response = google_ai_client.predict({
                 "text": prompt,
@@ -273,7 +300,8 @@ def _generate_contextual_question(conversation_text: str, emotion_strategy: str,
     Wygeneruj wyłącznie jedno pytanie, bez wprowadzenia ani wyjaśnień.
     """
 
-    if HAS_GOOGLE_AI and google_ai_client:
+    google_ai_client = get_google_ai_client()
+    if google_ai_client:
         try:
             response = google_ai_client.predict({
                 "text": system_prompt + "\n\n" + conversation_text,
@@ -0,0 +1,199 @@
+"""
+Moduł asynchronicznego generowania analiz psychologicznych.
+
+Trasa /analysis jedynie zleca zadanie (tabela AnalysisJob) i od razu wyświetla
+ostatnią zapisaną analizę. Zadania są wykonywane przez osobny proces roboczy:
+
+    python analysis_jobs.py
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Co ile sekund proces roboczy sprawdza kolejkę zadań
+JOB_POLL_INTERVAL = float(os.environ.get("ANALYSIS_JOB_POLL_INTERVAL", 2))
+
+# Po jakim czasie zadanie w stanie 'running' uznajemy za porzucone (np. po awarii procesu)
+JOB_STALE_AFTER = timedelta(seconds=int(os.environ.get("ANALYSIS_JOB_STALE_AFTER", 300)))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def enqueue_analysis_job(user_id, db):
+    """
+    Zleca wygenerowanie nowej analizy dla użytkownika.
+
+    Jeśli użytkownik ma już aktywne zadanie, zwraca je zamiast tworzyć kolejne.
+
+    Args:
+        user_id (int): ID użytkownika
+        db: Obiekt bazy danych SQLAlchemy
+
+    Returns:
+        AnalysisJob: Aktywne zadanie użytkownika
+    """
+    from models import AnalysisJob
+
+    job = AnalysisJob.query.filter_by(user_id=user_id)\
+        .filter(AnalysisJob.status.in_(ACTIVE_STATUSES))\
+        .order_by(AnalysisJob.id.desc())\
+        .first()
+    if job:
+        return job
+
+    job = AnalysisJob(user_id=user_id, status='queued', created_at=datetime.now())
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"Zlecono zadanie analizy {job.id} dla użytkownika {user_id}")
+    return job
+
+
+def get_job_status(job_id, user_id):
+    """
+    Zwraca stan zadania należącego do użytkownika.
+
+    Args:
+        job_id (int): ID zadania
+        user_id (int): ID użytkownika (właściciela zadania)
+
+    Returns:
+        dict lub None: Stan zadania lub None, jeśli zadanie nie istnieje
+    """
+    from models import AnalysisJob
+
+    job = AnalysisJob.query.filter_by(id=job_id, user_id=user_id).first()
+    return job.to_dict() if job else None
+
+
+def requeue_stale_jobs(db):
+    """
+    Przywraca do kolejki zadania porzucone przez procesy, które przestały działać.
+
+    Returns:
+        int: Liczba przywróconych zadań
+    """
+    from models import AnalysisJob
+
+    cutoff = datetime.now() - JOB_STALE_AFTER
+    count = AnalysisJob.query.filter(AnalysisJob.status == 'running', AnalysisJob.started_at < cutoff)\
+        .update({'status': 'queued', 'started_at': None}, synchronize_session=False)
+    db.session.commit()
+    if count:
+        logger.warning(f"Przywrócono do kolejki {count} porzuconych zadań analizy")
+    return count
+
+
+def claim_next_job(db):
+    """
+    Pobiera najstarsze oczekujące zadanie i oznacza je jako wykonywane.
+
+    Wiersz jest blokowany przez SELECT ... FOR UPDATE SKIP LOCKED, dzięki czemu
+    kilka procesów roboczych może bezpiecznie działać równolegle.
+
+    Returns:
+        AnalysisJob lub None: Przejęte zadanie
+    """
+    from models import AnalysisJob
+
+    job = AnalysisJob.query.filter_by(status='queued')\
+        .order_by(AnalysisJob.id.asc())\
+        .with_for_update(skip_locked=True)\
+        .first()
+    if not job:
+        db.session.commit()
+        return None
+
+    job.status = 'running'
+    job.started_at = datetime.now()
+    db.session.commit()
+    return job
+
+
+def run_analysis_job(job, db):
+    """
+    Wykonuje zadanie: generuje analizę i zapisuje ją w bazie danych.
+
+    Args:
+        job (AnalysisJob): Przejęte zadanie
+        db: Obiekt bazy danych SQLAlchemy
+    """
+    from psychology import generate_psychological_insight, store_psychological_analysis
+
+    logger.info(f"Rozpoczynam zadanie analizy {job.id} dla użytkownika {job.user_id}")
+    try:
+        analysis_data = generate_psychological_insight(job.user_id, db)
+        new_analysis = store_psychological_analysis(job.user_id, analysis_data, db)
+
+        job.status = 'done'
+        job.analysis_id = new_analysis.id
+        job.finished_at = datetime.now()
+        db.session.commit()
+        logger.info(f"Zakończono zadanie analizy {job.id}")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Błąd podczas wykonywania zadania analizy {job.id}: {str(e)}")
+        job.status = 'failed'
+        job.error_message = str(e)
+        job.finished_at = datetime.now()
+        db.session.commit()
+
+
+def run_worker(app, poll_interval=None, stop_event=None):
+    """
+    Główna pętla procesu roboczego - pobiera i wykonuje zadania analizy.
+
+    Args:
+        app: Obiekt aplikacji Flask
+        poll_interval (float, optional): Przerwa między sprawdzeniami pustej kolejki
+        stop_event (threading.Event, optional): Zdarzenie kończące pętlę
+    """
+    from database import db
+
+    if poll_interval is None:
+        poll_interval = JOB_POLL_INTERVAL
+
+    logger.info(f"Uruchomiono proces roboczy analiz ({socket.gethostname()}:{os.getpid()})")
+    last_recovery = 0
+    while not (stop_event and stop_event.is_set()):
+        with app.app_context():
+            try:
+                if time.monotonic() - last_recovery > JOB_STALE_AFTER.total_seconds():
+                    requeue_stale_jobs(db)
+                    last_recovery = time.monotonic()
+
+                job = claim_next_job(db)
+                if job:
+                    run_analysis_job(job, db)
+                    continue
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Błąd w procesie roboczym analiz: {str(e)}")
+            finally:
+                db.session.remove()
+        time.sleep(poll_interval)
+
+
+def start_worker_thread(app):
+    """
+    Uruchamia proces roboczy jako wątek w tle (tryb deweloperski, jeden proces).
+
+    Returns:
+        threading.Thread: Uruchomiony wątek
+    """
+    thread = threading.Thread(target=run_worker, args=(app,), name="analysis-worker", daemon=True)
+    thread.start()
+    return thread
+
+
+# Jeśli ten plik jest uruchamiany bezpośrednio, uruchom proces roboczy
+if __name__ == "__main__":
+    from app import app
+    run_worker(app)
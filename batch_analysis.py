@@ -0,0 +1,318 @@
+"""
+Nocne, wsadowe generowanie analiz psychologicznych (Anthropic Message Batches API).
+
+Wyszukuje użytkowników, którzy udzielili nowych odpowiedzi od czasu ostatniej
+analizy, wysyła ich prompty jako jedną paczkę zapytań (taniej niż zapytania
+synchroniczne), czeka na jej przetworzenie i zapisuje wyniki w bazie danych
+jedną transakcją. Dzięki temu pierwsze wejście na /analysis po kilku
+odpowiedziach nie wymaga już generowania analizy na żądanie.
+
+Użycie (np. z crona):
+    0 3 * * * cd /app && python batch_analysis.py
+    python batch_analysis.py --dry-run             # tylko lista użytkowników
+    python batch_analysis.py --resume msgbatch_... # dokończenie przerwanego przebiegu
+
+Lokalnie można użyć fałszywego serwera: python tools/fake_llm_server.py
+oraz ANTHROPIC_BASE_URL=http://127.0.0.1:8089 ANTHROPIC_API_KEY=fake.
+"""
+
+import os
+import time
+import logging
+import argparse
+from datetime import datetime
+from collections import defaultdict
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Co ile sekund sprawdzamy stan paczki
+BATCH_POLL_INTERVAL = float(os.environ.get("ANALYSIS_BATCH_POLL_INTERVAL", 60))
+
+# Maksymalny czas oczekiwania na przetworzenie paczki (API gwarantuje 24 h)
+BATCH_TIMEOUT = float(os.environ.get("ANALYSIS_BATCH_TIMEOUT", 24 * 3600))
+
+# Minimalna liczba odpowiedzi potrzebna do analizy (jak w analyze_user_responses)
+MIN_RESPONSES = 2
+
+# custom_id zapytania: user-<id>-<czas najnowszej uwzględnionej odpowiedzi>, dzięki czemu
+# czas stanu danych jest dostępny także przy dokończeniu przebiegu (--resume)
+_CUSTOM_ID_PREFIX = "user-"
+_SNAPSHOT_FORMAT = "%Y%m%d%H%M%S%f"
+
+
+def _custom_id(user_id, snapshot):
+    return f"{_CUSTOM_ID_PREFIX}{user_id}-{snapshot.strftime(_SNAPSHOT_FORMAT)}"
+
+
+def _parse_custom_id(custom_id):
+    """
+    Odczytuje ID użytkownika i czas stanu danych z custom_id.
+
+    Returns:
+        tuple: (user_id, datetime lub None - paczki sprzed zapisywania czasu w custom_id)
+    """
+    user_part, _, snapshot_part = custom_id[len(_CUSTOM_ID_PREFIX):].partition("-")
+    snapshot = datetime.strptime(snapshot_part, _SNAPSHOT_FORMAT) if snapshot_part else None
+    return int(user_part), snapshot
+
+
+def find_users_needing_analysis(db, min_responses=MIN_RESPONSES):
+    """
+    Zwraca ID użytkowników z odpowiedziami nowszymi niż ich ostatnia analiza.
+
+    Args:
+        db: Obiekt bazy danych SQLAlchemy
+        min_responses (int): Minimalna liczba udzielonych odpowiedzi
+
+    Returns:
+        list: Lista ID użytkowników
+    """
+    from sqlalchemy import func, or_
+    from models import Conversation, PsychologicalAnalysis
+
+    answers = db.session.query(
+        Conversation.user_id.label("user_id"),
+        func.max(Conversation.timestamp).label("last_answer"),
+        func.count(Conversation.id).label("answer_count")
+    ).filter(Conversation.response.isnot(None))\
+        .group_by(Conversation.user_id).subquery()
+
+    analyses = db.session.query(
+        PsychologicalAnalysis.user_id.label("user_id"),
+        func.max(PsychologicalAnalysis.timestamp).label("last_analysis")
+    ).group_by(PsychologicalAnalysis.user_id).subquery()
+
+    rows = db.session.query(answers.c.user_id)\
+        .outerjoin(analyses, analyses.c.user_id == answers.c.user_id)\
+        .filter(answers.c.answer_count >= min_responses)\
+        .filter(or_(analyses.c.last_analysis.is_(None), answers.c.last_answer > analyses.c.last_analysis))\
+        .order_by(answers.c.user_id)\
+        .all()
+    return [row.user_id for row in rows]
+
+
+def load_responses_for_users(user_ids):
+    """
+    Pobiera odpowiedzi wielu użytkowników jednym zapytaniem.
+
+    Returns:
+        dict: user_id -> lista słowników z kluczami 'id', 'question', 'response' i 'timestamp'
+    """
+    from models import Conversation
+
+    responses = defaultdict(list)
+    if not user_ids:
+        return responses
+
+    conversations = Conversation.query.filter(Conversation.user_id.in_(user_ids))\
+        .filter(Conversation.response.isnot(None))\
+        .order_by(Conversation.user_id.asc(), Conversation.timestamp.asc())\
+        .all()
+    for conv in conversations:
+        responses[conv.user_id].append({
+            "id": conv.id,
+            "question": conv.question,
+            "response": conv.response,
+            "timestamp": conv.timestamp
+        })
+    return responses
+
+
+def build_batch_requests(responses_by_user):
+    """
+    Buduje zapytania paczki. Analizy dostępne już w cache'u nie są wysyłane ponownie.
+
+    Returns:
+        tuple: (lista zapytań {custom_id, params}, słownik user_id -> analiza z cache'a,
+                słownik user_id -> klucz cache'a, słownik user_id -> czas najnowszej odpowiedzi)
+    """
+    from psychology import (analysis_cache, build_analysis_cache_key,
+                            build_claude_analysis_request, format_responses_for_analysis)
+
+    requests, cached, cache_keys, snapshots = [], {}, {}, {}
+    for user_id, responses in responses_by_user.items():
+        analysis_text = format_responses_for_analysis(responses)
+        cache_key = build_analysis_cache_key(analysis_text)
+        cache_keys[user_id] = cache_key
+        snapshots[user_id] = max(response["timestamp"] for response in responses)
+
+        analysis = analysis_cache.get(cache_key)
+        if analysis is not None:
+            cached[user_id] = analysis
+            continue
+
+        requests.append({
+            "custom_id": _custom_id(user_id, snapshots[user_id]),
+            "params": build_claude_analysis_request(analysis_text)
+        })
+    return requests, cached, cache_keys, snapshots
+
+
+def wait_for_batch(batch_id, poll_interval=None, timeout=None):
+    """
+    Czeka na zakończenie przetwarzania paczki.
+
+    Returns:
+        object: Stan paczki (processing_status == 'ended')
+
+    Raises:
+        TimeoutError: Gdy paczka nie zakończyła się w wyznaczonym czasie
+    """
+    from llm_gateway import gateway, ProviderUnavailable
+
+    poll_interval = BATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+    deadline = time.monotonic() + (BATCH_TIMEOUT if timeout is None else timeout)
+    while True:
+        try:
+            batch = gateway.anthropic_batch_retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return batch
+            counts = batch.request_counts
+            logger.info(f"Paczka {batch_id}: {batch.processing_status}, "
+                        f"w toku {counts.processing}, gotowe {counts.succeeded}, błędy {counts.errored}")
+        except ProviderUnavailable as e:
+            # Chwilowa niedostępność API nie przerywa oczekiwania - paczka jest przetwarzana dalej
+            logger.warning(f"Nie można sprawdzić stanu paczki {batch_id}: {str(e)}")
+
+        if time.monotonic() + poll_interval > deadline:
+            raise TimeoutError(f"Paczka {batch_id} nie zakończyła się w wyznaczonym czasie")
+        time.sleep(poll_interval)
+
+
+def collect_batch_results(batch_id):
+    """
+    Pobiera i parsuje wyniki paczki.
+
+    Returns:
+        tuple: (słownik user_id -> analiza (tylko poprawne odpowiedzi),
+                słownik user_id -> czas najnowszej uwzględnionej odpowiedzi)
+    """
+    from llm_gateway import gateway
+    from psychology import parse_analysis_response
+
+    results, snapshots = {}, {}
+    for entry in gateway.anthropic_batch_results(batch_id):
+        if not entry.custom_id.startswith(_CUSTOM_ID_PREFIX):
+            continue
+        user_id, snapshot = _parse_custom_id(entry.custom_id)
+        if entry.result.type != "succeeded":
+            logger.warning(f"Analiza wsadowa użytkownika {user_id} nie powiodła się: {entry.result.type}")
+            continue
+
+        analysis = parse_analysis_response(entry.result.message.content[0].text)
+        if analysis is not None:
+            results[user_id] = analysis
+            if snapshot is not None:
+                snapshots[user_id] = snapshot
+    return results, snapshots
+
+
+def store_batch_results(results, db, cache_keys=None, snapshots=None):
+    """
+    Zapisuje analizy wielu użytkowników w jednej transakcji.
+
+    Analiza dostaje czas najnowszej uwzględnionej odpowiedzi, a nie czas zapisu
+    (nawet 24 h później) - odpowiedzi udzielone w trakcie przetwarzania paczki
+    pozostają nowsze od analizy i /analysis zleci jej odświeżenie.
+
+    Args:
+        results (dict): user_id -> analiza
+        db: Obiekt bazy danych SQLAlchemy
+        cache_keys (dict, optional): user_id -> klucz cache'a, pod którym zapisać analizę
+        snapshots (dict, optional): user_id -> czas najnowszej uwzględnionej odpowiedzi
+
+    Returns:
+        int: Liczba zapisanych analiz
+    """
+    from models import PsychologicalAnalysis
+    from psychology import analysis_cache, get_emotional_intelligence_score
+
+    analyses = []
+    for user_id, analysis in results.items():
+        # Zapisz w cache'u przed obliczeniem wyniku EI, który uzupełnia słownik analizy
+        if cache_keys and user_id in cache_keys:
+            analysis_cache.set(cache_keys[user_id], analysis)
+
+        ei_score = get_emotional_intelligence_score(analysis)
+        new_analysis = PsychologicalAnalysis(user_id=user_id, emotional_intelligence_score=ei_score)
+        if snapshots and snapshots.get(user_id) is not None:
+            new_analysis.timestamp = snapshots[user_id]
+        new_analysis.set_analysis(analysis)
+        analyses.append(new_analysis)
+
+    db.session.add_all(analyses)
+    db.session.commit()
+    return len(analyses)
+
+
+def run_batch_analysis(db, resume=None, dry_run=False, poll_interval=None, timeout=None, limit=None):
+    """
+    Wykonuje pełny przebieg analizy wsadowej.
+
+    Args:
+        db: Obiekt bazy danych SQLAlchemy
+        resume (str, optional): ID wcześniej wysłanej paczki, na którą należy poczekać
+        dry_run (bool): Tylko wypisz użytkowników wymagających analizy
+        poll_interval (float, optional): Co ile sekund sprawdzać stan paczki
+        timeout (float, optional): Maksymalny czas oczekiwania na paczkę
+        limit (int, optional): Maksymalna liczba użytkowników w paczce
+
+    Returns:
+        int: Liczba zapisanych analiz
+    """
+    from llm_gateway import gateway
+
+    cache_keys = {}
+    stored = 0
+    if resume:
+        batch_id = resume
+    else:
+        user_ids = find_users_needing_analysis(db)
+        if limit:
+            user_ids = user_ids[:limit]
+        logger.info(f"Użytkownicy wymagający analizy: {len(user_ids)}")
+        if dry_run or not user_ids:
+            for user_id in user_ids:
+                print(user_id)
+            return 0
+
+        requests, cached, cache_keys, snapshots = build_batch_requests(load_responses_for_users(user_ids))
+        if cached:
+            stored += store_batch_results(cached, db, snapshots=snapshots)
+            logger.info(f"Zapisano {len(cached)} analiz z cache'a bez wysyłania zapytań")
+        if not requests:
+            return stored
+
+        batch = gateway.anthropic_batch_create(requests)
+        batch_id = batch.id
+        # ID paczki pozwala dokończyć przebieg po awarii: --resume <id>
+        logger.info(f"Wysłano paczkę {batch_id} z {len(requests)} zapytaniami")
+
+    wait_for_batch(batch_id, poll_interval=poll_interval, timeout=timeout)
+    results, snapshots = collect_batch_results(batch_id)
+    stored += store_batch_results(results, db, cache_keys, snapshots)
+    logger.info(f"Zapisano {stored} analiz z paczki {batch_id}")
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="wypisz użytkowników wymagających analizy")
+    parser.add_argument("--resume", metavar="BATCH_ID", help="poczekaj na wcześniej wysłaną paczkę i zapisz wyniki")
+    parser.add_argument("--poll-interval", type=float, default=None, help="co ile sekund sprawdzać stan paczki")
+    parser.add_argument("--timeout", type=float, default=None, help="maksymalny czas oczekiwania [s]")
+    parser.add_argument("--limit", type=int, default=None, help="maksymalna liczba użytkowników")
+    args = parser.parse_args()
+
+    from app import app
+    from database import db
+
+    with app.app_context():
+        run_batch_analysis(db, resume=args.resume, dry_run=args.dry_run,
+                           poll_interval=args.poll_interval, timeout=args.timeout, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
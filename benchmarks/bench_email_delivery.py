@@ -0,0 +1,116 @@
+"""
+Benchmark: wysyłka przypomnień e-mail - przed i po zmianie.
+
+Uruchamia lokalny serwer tools/fake_smtp_server.py (z opóźnieniem odpowiedzi
+i kosztem nawiązania połączenia, które imitują sieć i STARTTLS) i porównuje:
+- "połączenie na wiadomość": poprzednia ścieżka - dla każdego użytkownika
+  nowe połączenie, EHLO, LOGIN, budowa MIMEMultipart, wysyłka i QUIT, po kolei,
+- "pula sesji": email_delivery.BulkEmailSender - zalogowane sesje z puli,
+  szablon MIME renderowany raz, wysyłka z puli wątków.
+
+Użycie:
+    python benchmarks/bench_email_delivery.py
+    python benchmarks/bench_email_delivery.py --messages 2000 --pool-size 8 --drop-after 50
+"""
+
+import os
+import sys
+import time
+import signal
+import smtplib
+import argparse
+import subprocess
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from email_delivery import BulkEmailSender, ReminderEmailTemplate, SMTPSessionPool  # noqa: E402
+
+SENDER = "przypomnienia@refleksja.app"
+
+
+def start_server(args):
+    command = [sys.executable, os.path.join(ROOT, "tools", "fake_smtp_server.py"), "--port", "0",
+               "--latency", str(args.latency), "--connect-latency", str(args.connect_latency),
+               "--drop-after", str(args.drop_after)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    return process, int(line.rsplit(":", 1)[1])
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGINT)
+    _, stderr = process.communicate(timeout=10)
+    return stderr.strip().splitlines()[-1] if stderr.strip() else ""
+
+
+def legacy_send(port, to, username):
+    """Poprzednia implementacja send_email_reminder (bez STARTTLS - serwer lokalny)."""
+    msg = MIMEMultipart()
+    msg['From'] = SENDER
+    msg['To'] = to
+    msg['Subject'] = "Przypomnienie o codziennej refleksji"
+    body = f"""
+        Cześć {username}!
+
+        To Twoje codzienne przypomnienie o refleksji terapeutycznej.
+        Poświęć kilka minut, aby odpowiedzieć na pytanie dnia i zbliżyć się do lepszego zrozumienia siebie.
+        """
+    msg.attach(MIMEText(body, 'plain'))
+    server = smtplib.SMTP("127.0.0.1", port)
+    server.login("fake", "fake")
+    server.sendmail(SENDER, to, msg.as_string())
+    server.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500, help="liczba wiadomości")
+    parser.add_argument("--pool-size", type=int, default=4, help="liczba sesji SMTP w puli")
+    parser.add_argument("--latency", type=float, default=0.002, help="opóźnienie odpowiedzi serwera [s]")
+    parser.add_argument("--connect-latency", type=float, default=0.03,
+                        help="koszt nawiązania połączenia (TCP + TLS) [s]")
+    parser.add_argument("--drop-after", type=int, default=0,
+                        help="serwer zrywa połączenie po tylu wiadomościach (test ponownego łączenia)")
+    args = parser.parse_args()
+
+    recipients = [(f"user{i}@example.com", f"użytkownik{i}") for i in range(args.messages)]
+    print(f"{args.messages} wiadomości; serwer: opóźnienie odpowiedzi {args.latency * 1000:.0f} ms, "
+          f"nawiązanie połączenia {args.connect_latency * 1000:.0f} ms")
+
+    process, port = start_server(args)
+    try:
+        start = time.perf_counter()
+        legacy_ok = 0
+        for to, username in recipients:
+            try:
+                legacy_send(port, to, username)
+                legacy_ok += 1
+            except (smtplib.SMTPException, OSError):
+                pass
+        legacy_time = time.perf_counter() - start
+
+        pool = SMTPSessionPool(host="127.0.0.1", port=port, username="fake", password="fake",
+                               size=args.pool_size, use_tls=False)
+        sender = BulkEmailSender(pool, ReminderEmailTemplate(SENDER))
+        start = time.perf_counter()
+        results = sender.send_many(recipients)
+        pooled_time = time.perf_counter() - start
+        sender.close()
+    finally:
+        server_stats = stop_server(process)
+
+    pooled_ok = sum(1 for result in results if result["success"])
+    print(f"{'sposób':>26} | {'czas [s]':>8} | {'wiadomości/s':>12} | {'wysłane':>7} | {'połączenia':>10}")
+    print("-" * 76)
+    print(f"{'połączenie na wiadomość':>26} | {legacy_time:>8.2f} | {legacy_ok / legacy_time:>12.1f} | "
+          f"{legacy_ok:>7} | {args.messages:>10}")
+    print(f"{f'pula sesji ({args.pool_size})':>26} | {pooled_time:>8.2f} | {pooled_ok / pooled_time:>12.1f} | "
+          f"{pooled_ok:>7} | {pool.stats['connections']:>10}")
+    print(f"Zerwane sesje: {pool.stats['reconnects']}; serwer: {server_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: rozmiar promptu i czas analizy w trybie pełnym i przyrostowym.
+
+Dla syntetycznych historii od 10 do 1000 odpowiedzi porównuje liczbę tokenów
+wejściowych wysyłanych do modelu oraz (z flagą --live) rzeczywisty czas odpowiedzi API.
+W trybie przyrostowym mierzymy stan ustalony: jedna nowa odpowiedź od ostatniej analizy.
+
+Użycie:
+    python benchmarks/bench_incremental_analysis.py
+    python benchmarks/bench_incremental_analysis.py --live   # wymaga ANTHROPIC_API_KEY
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psychology  # noqa: E402
+from therapy import FOLLOW_UP_QUESTIONS  # noqa: E402
+
+SAMPLE_SENTENCES = [
+    "Dzisiaj czułem się spokojniej niż zwykle, choć praca wciąż mnie przytłacza.",
+    "Rozmowa z przyjaciółką pomogła mi zrozumieć, skąd bierze się mój niepokój.",
+    "Zauważam, że wieczorami wracam myślami do dawnych błędów.",
+    "Spacer w parku dał mi poczucie ulgi i wdzięczności.",
+    "Mam wrażenie, że za dużo od siebie wymagam i rzadko odpoczywam.",
+]
+
+# Podsumowanie kroczące o maksymalnej dopuszczalnej długości (~250 słów)
+STEADY_STATE_SUMMARY = " ".join(random.Random(0).choice(SAMPLE_SENTENCES) for _ in range(22))
+
+
+def synthetic_history(size, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 20, 0)
+    return [{
+        "id": i + 1,
+        "question": rng.choice(FOLLOW_UP_QUESTIONS),
+        "response": " ".join(rng.choice(SAMPLE_SENTENCES) for _ in range(rng.randint(2, 5))),
+        "timestamp": start + timedelta(days=i),
+    } for i in range(size)]
+
+
+def count_tokens(system, prompt, exact):
+    client = psychology.gateway.providers["anthropic"].client if exact else None
+    if client is not None:
+        result = client.messages.count_tokens(
+            model=psychology.ANALYSIS_MODEL,
+            system=system,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return result.input_tokens
+    # Przybliżenie: ~4 znaki na token
+    return (len(system) + len(prompt)) // 4
+
+
+def full_prompt(history):
+    return psychology.CLAUDE_ANALYSIS_SYSTEM_PROMPT, psychology.build_analysis_prompt(
+        psychology.format_responses_for_analysis(history))
+
+
+def incremental_prompt(history):
+    return psychology.INCREMENTAL_ANALYSIS_SYSTEM_PROMPT, psychology.build_incremental_analysis_prompt(
+        STEADY_STATE_SUMMARY, psychology.DEFAULT_ANALYSIS, psychology.format_responses_for_analysis(history[-1:]))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 250, 500, 1000])
+    parser.add_argument("--live", action="store_true", help="wywołaj prawdziwe API i zmierz czas odpowiedzi")
+    args = parser.parse_args()
+
+    header = f"{'historia':>9} | {'tokeny pełna':>13} | {'tokeny przyrost.':>16}"
+    if args.live:
+        header += f" | {'czas pełna [s]':>14} | {'czas przyrost. [s]':>18}"
+    print(header)
+    print("-" * len(header))
+
+    for size in args.sizes:
+        history = synthetic_history(size)
+        full_tokens = count_tokens(*full_prompt(history), exact=args.live)
+        incremental_tokens = count_tokens(*incremental_prompt(history), exact=args.live)
+        row = f"{size:>9} | {full_tokens:>13} | {incremental_tokens:>16}"
+
+        if args.live:
+            psychology.analysis_cache.clear()
+            full_time = timed(psychology.analyze_user_responses, history)
+            incremental_time = timed(psychology.analyze_user_responses_incremental,
+                                     STEADY_STATE_SUMMARY, psychology.DEFAULT_ANALYSIS, history[-1:])
+            row += f" | {full_time:>14.2f} | {incremental_time:>18.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
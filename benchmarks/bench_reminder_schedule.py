@@ -0,0 +1,168 @@
+"""
+Benchmark: wybór użytkowników do przypomnienia (reminders.check_and_send_due_reminders).
+
+Porównuje na syntetycznej tabeli użytkowników (SQLite w pamięci, domyślnie 1 mln wierszy):
+- "pełny skan + is_reminder_due": poprzednia ścieżka - wczytanie wszystkich
+  użytkowników z włączonymi przypomnieniami i sprawdzenie każdego w Pythonie
+  (strefa pytz + arytmetyka dat),
+- "zapytanie zakresowe": WHERE next_reminder_at <= teraz po indeksie, a dla
+  zwróconych kandydatów ponowne wyliczenie terminu (termin z pominiętego dnia
+  przesuwa się na dzisiejszą godzinę - tak robi check_and_send_due_reminders).
+
+Tabela odpowiada stanowi ustalonemu harmonogramu uruchamianego co kilka minut,
+a next_reminder_at jest wyliczany tak jak w aplikacji: w chwili ostatniej
+wysyłki (lub zmiany ustawień), a nie w chwili pomiaru.
+
+Sprawdza też, czy oba sposoby wybierają tych samych użytkowników.
+
+Użycie:
+    python benchmarks/bench_reminder_schedule.py
+    python benchmarks/bench_reminder_schedule.py --users 100000 --interval 15 --missed 0.05
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, time as dt_time
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reminder_schedule import compute_next_reminder_at  # noqa: E402
+
+TIMEZONES = ["Europe/Warsaw", "Europe/London", "America/New_York", "Asia/Tokyo", "UTC"]
+
+
+def legacy_is_reminder_due(reminder_enabled, reminder_time, reminder_timezone, last_reminder_sent, now_utc):
+    """Poprzednia implementacja User.is_reminder_due (z ustalonym czasem bieżącym)."""
+    if not reminder_enabled:
+        return False
+    if not last_reminder_sent:
+        return True
+    timezone = pytz.timezone(reminder_timezone)
+    now = now_utc.astimezone(timezone)
+    last_reminder = pytz.utc.localize(last_reminder_sent).astimezone(timezone)
+    if now.date() == last_reminder.date():
+        return False
+    reminder_datetime = timezone.localize(datetime.combine(now.date(), reminder_time))
+    return now >= reminder_datetime
+
+
+def latest_slot(reminder_time, timezone_name, now):
+    """Ostatnia (UTC, bez strefy) godzina przypomnienia użytkownika nie późniejsza niż now."""
+    timezone = pytz.timezone(timezone_name)
+    today = pytz.utc.localize(now).astimezone(timezone).date()
+    for day in (today, today - timedelta(days=1)):
+        slot = timezone.localize(datetime.combine(day, reminder_time)).astimezone(pytz.utc).replace(tzinfo=None)
+        if slot <= now:
+            return slot
+    return slot
+
+
+def build_table(users, now, interval, missed, seed=42):
+    """
+    Stan ustalony harmonogramu uruchamianego co `interval` minut: użytkownicy,
+    których godzina minęła przed poprzednim uruchomieniem, dostali już
+    przypomnienie; odsetek `missed` ostatnio dostał je kilka dni temu (przerwa w działaniu).
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE user (id INTEGER PRIMARY KEY, reminder_enabled INTEGER, reminder_time TEXT, "
+        "reminder_timezone TEXT, last_reminder_sent TEXT, next_reminder_at TEXT)"
+    )
+
+    previous_run = now - timedelta(minutes=interval)
+    rows = []
+    for user_id in range(1, users + 1):
+        enabled = rng.random() < 0.6
+        reminder_time = dt_time(rng.randint(0, 23), rng.choice((0, 15, 30, 45)))
+        timezone = rng.choice(TIMEZONES)
+        slot = latest_slot(reminder_time, timezone, now)
+        draw = rng.random()
+        if draw < 0.01:
+            last = None
+        elif draw < 0.01 + missed:
+            last = slot - timedelta(days=3)
+        elif slot <= previous_run:
+            last = slot + timedelta(seconds=rng.randint(1, interval * 60))
+        else:
+            last = slot - timedelta(days=1) + timedelta(seconds=rng.randint(1, interval * 60))
+        if last and last > now:
+            last = now
+        # Termin wyliczony tak jak w aplikacji - w chwili wysyłki (lub zapisania ustawień)
+        next_at = compute_next_reminder_at(enabled, reminder_time, timezone, last, last or now)
+        rows.append((user_id, int(enabled), reminder_time.isoformat(), timezone,
+                     last.isoformat(sep=" ") if last else None,
+                     next_at.isoformat(sep=" ") if next_at else None))
+        if len(rows) == 100000:
+            connection.executemany("INSERT INTO user VALUES (?, ?, ?, ?, ?, ?)", rows)
+            rows = []
+    connection.executemany("INSERT INTO user VALUES (?, ?, ?, ?, ?, ?)", rows)
+    connection.execute("CREATE INDEX ix_user_next_reminder_at ON user (next_reminder_at)")
+    connection.commit()
+    return connection
+
+
+def legacy_due(connection, now):
+    now_utc = pytz.utc.localize(now)
+    due = []
+    for user_id, reminder_time, timezone, last in connection.execute(
+            "SELECT id, reminder_time, reminder_timezone, last_reminder_sent FROM user WHERE reminder_enabled = 1"):
+        last = datetime.fromisoformat(last) if last else None
+        if legacy_is_reminder_due(True, dt_time.fromisoformat(reminder_time), timezone, last, now_utc):
+            due.append(user_id)
+    return due
+
+
+def indexed_due(connection, now):
+    """Zwraca (do wysłania, liczba kandydatów z zapytania zakresowego)."""
+    due = []
+    candidates = connection.execute(
+        "SELECT id, reminder_time, reminder_timezone, last_reminder_sent FROM user "
+        "WHERE reminder_enabled = 1 AND next_reminder_at <= ? ORDER BY next_reminder_at",
+        (now.isoformat(sep=" "),)).fetchall()
+    for user_id, reminder_time, timezone, last in candidates:
+        last = datetime.fromisoformat(last) if last else None
+        if compute_next_reminder_at(True, dt_time.fromisoformat(reminder_time), timezone, last, now) <= now:
+            due.append(user_id)
+    return due, len(candidates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000000, help="liczba użytkowników")
+    parser.add_argument("--interval", type=int, default=5, help="odstęp między uruchomieniami harmonogramu [min]")
+    parser.add_argument("--missed", type=float, default=0.01, help="odsetek użytkowników z pominiętym dniem")
+    args = parser.parse_args()
+
+    now = datetime(2024, 3, 15, 18, 7)
+    start = time.perf_counter()
+    connection = build_table(args.users, now, args.interval, args.missed)
+    print(f"Tabela: {args.users} użytkowników, przygotowanie {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    legacy = legacy_due(connection, now)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed, candidates = indexed_due(connection, now)
+    indexed_time = time.perf_counter() - start
+
+    plan = " ".join(row[-1] for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM user WHERE reminder_enabled = 1 AND next_reminder_at <= ?", ("x",)))
+
+    print(f"{'sposób':>30} | {'czas [ms]':>10} | {'do wysłania':>11}")
+    print("-" * 57)
+    print(f"{'pełny skan + is_reminder_due':>30} | {legacy_time * 1000:>10.1f} | {len(legacy):>11}")
+    print(f"{'zapytanie zakresowe':>30} | {indexed_time * 1000:>10.1f} | {len(indexed):>11}")
+    print(f"Kandydaci z zapytania zakresowego: {candidates} (w tym z pominiętego dnia: {candidates - len(indexed)})")
+    print(f"Zgodne: {'tak' if set(legacy) == set(indexed) else 'NIE'}; plan: {plan}")
+
+
+if __name__ == "__main__":
+    main()
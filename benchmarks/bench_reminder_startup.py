@@ -0,0 +1,94 @@
+"""
+Benchmark: zimny start procesu przypomnień - przed i po zmianie.
+
+Każdy pomiar to nowy proces Pythona, który przygotowuje wysyłkę przypomnień:
+- "from app import app": poprzednia ścieżka `python reminders.py` - cała
+  aplikacja webowa (widoki, moduły analizy, klienci LLM, db.create_all()),
+- "reminder_worker": reminder_worker.create_worker_app() - tylko SQLAlchemy
+  z modelami i kanały wysyłki.
+
+Mierzony jest czas importu i inicjalizacji (w procesie), czas całego procesu
+(z uruchomieniem interpretera), szczytowe zużycie pamięci (RSS) i liczba
+zapytań SQL wykonanych przy starcie. Żadna ścieżka nie wysyła przypomnień.
+
+Domyślnie obie ścieżki używają tymczasowej bazy SQLite (DATABASE_URL) z już
+utworzonymi tabelami. Przy zdalnej bazie każde zapytanie przy starcie to
+dodatkowo jeden round-trip sieciowy.
+
+Użycie:
+    python benchmarks/bench_reminder_startup.py
+    python benchmarks/bench_reminder_startup.py --runs 10 --database-url postgresql://localhost/refleksja
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = {
+    "from app import app": "from app import app\nimport reminders",
+    "reminder_worker": "from reminder_worker import create_worker_app\napp = create_worker_app()\nimport reminders",
+}
+
+PROBE = """
+import time, json, resource, sys
+start = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda *args: statements.append(1))
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"init_s": elapsed, "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "modules": len(sys.modules), "statements": len(statements)}}))
+"""
+
+
+def measure(code, database_url):
+    env = dict(os.environ)
+    env.setdefault("SESSION_SECRET", "benchmark")
+    env["DATABASE_URL"] = database_url
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", PROBE.format(code=code)], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    data["wall_s"] = wall
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="liczba pomiarów na ścieżkę")
+    parser.add_argument("--database-url", default=None, help="baza danych (domyślnie tymczasowa SQLite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url or f"sqlite:///{os.path.join(directory, 'refleksja.db')}"
+        # Przebieg rozgrzewający - tworzy tabele, mierzymy start przy istniejącym schemacie
+        measure(PATHS["from app import app"], database_url)
+
+        header = (f"{'ścieżka':>20} | {'import + init [ms]':>17} | {'cały proces [ms]':>16} | "
+                  f"{'szczyt RSS [MB]':>15} | {'moduły':>6} | {'zapytania SQL':>13}")
+        print(header)
+        print("-" * len(header))
+        # Ścieżki na przemian, żeby wahania obciążenia maszyny rozkładały się po równo
+        samples = {name: [] for name in PATHS}
+        for _ in range(args.runs):
+            for name, code in PATHS.items():
+                samples[name].append(measure(code, database_url))
+        for name, runs in samples.items():
+            print(f"{name:>20} | {statistics.median(s['init_s'] for s in runs) * 1000:>17.0f} | "
+                  f"{statistics.median(s['wall_s'] for s in runs) * 1000:>16.0f} | "
+                  f"{statistics.median(s['rss_mb'] for s in runs):>15.1f} | {runs[-1]['modules']:>6} | "
+                  f"{runs[-1]['statements']:>13}")
+
+
+if __name__ == "__main__":
+    main()
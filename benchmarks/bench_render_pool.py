@@ -0,0 +1,80 @@
+"""
+Benchmark: liczba wykresów na sekundę przy 1, 4 i 8 równoczesnych żądaniach.
+
+Porównuje renderowanie w wątkach żądań (obiektowe API Figure, współdzielony GIL)
+z renderowaniem w puli procesów (render_service.py). Każde "żądanie" rysuje
+wykres postępu inteligencji emocjonalnej dla syntetycznej historii analiz.
+
+Użycie:
+    python benchmarks/bench_render_pool.py
+    python benchmarks/bench_render_pool.py --renders 64 --kind emotion
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import render_service  # noqa: E402
+import visualization  # noqa: E402
+
+EMOTIONS = list(visualization.EMOTION_COLORS)
+
+
+def synthetic_payload(points=60, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 20, 0)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(points)]
+    return {
+        "dates": dates,
+        "ei_scores": [rng.randint(40, 90) for _ in range(points)],
+        "emotions": {emotion: [[d, rng.randint(1, 5)] for d in dates if rng.random() < 0.5]
+                     for emotion in EMOTIONS},
+    }
+
+
+def run(render, payload, concurrency, renders):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: render(payload), range(renders)))
+    elapsed = time.perf_counter() - start
+    assert all(results), "renderowanie nie zwróciło obrazu"
+    return renders / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=32, help="liczba wykresów na pomiar")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--kind", choices=["ei-progress", "emotion"], default="ei-progress")
+    args = parser.parse_args()
+
+    payload = synthetic_payload()
+    draw = visualization.draw_ei_progress_chart if args.kind == "ei-progress" else visualization.draw_emotion_chart
+    modes = {
+        "wątki (Figure)": draw,
+        f"pula procesów ({render_service.RENDER_POOL_WORKERS})": lambda p: render_service.render(args.kind, p),
+    }
+
+    # Rozgrzewka: import matplotlib i uruchomienie procesów roboczych
+    draw(payload)
+    for _ in range(render_service.RENDER_POOL_WORKERS):
+        render_service.render(args.kind, payload)
+
+    header = f"{'tryb':>22} | " + " | ".join(f"{c:>3} równocz. [wykr./s]" for c in args.concurrency)
+    print(header)
+    print("-" * len(header))
+    for name, render in modes.items():
+        rates = [run(render, payload, concurrency, args.renders) for concurrency in args.concurrency]
+        print(f"{name:>22} | " + " | ".join(f"{rate:>22.1f}" for rate in rates))
+
+    render_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: wysyłka przypomnień SMS - przed i po zmianie.
+
+Uruchamia lokalny serwer tools/fake_twilio_server.py (opóźnienie odpowiedzi
+i limit wiadomości na sekundę konta) i porównuje:
+- "po kolei": poprzednia ścieżka - jedno synchroniczne zapytanie na
+  użytkownika (jak twilio_client.messages.create w pętli harmonogramu),
+- "dispatcher": sms_delivery.SmsDispatcher z limitem równym limitowi konta,
+- "dispatcher, limit x2": limit ustawiony powyżej limitu konta - serwer
+  odpowiada 429, a dispatcher czeka zgodnie z Retry-After i ponawia.
+
+Użycie:
+    python benchmarks/bench_sms_delivery.py
+    python benchmarks/bench_sms_delivery.py --messages 1000 --mps 50 --concurrency 20
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sms_delivery import SMS_REMINDER_BODY, SmsDispatcher  # noqa: E402
+
+ACCOUNT_SID = "ACfake"
+
+
+def start_server(args):
+    command = [sys.executable, os.path.join(ROOT, "tools", "fake_twilio_server.py"), "--port", "0",
+               "--mps", str(args.mps), "--latency", str(args.latency)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = process.stdout.readline()
+    return process, line.strip().rsplit(" ", 1)[1]
+
+
+def legacy_send_all(base_url, messages):
+    """Poprzednia ścieżka: synchroniczne zapytanie na wiadomość, bez ponowień."""
+    url = f"{base_url}/2010-04-01/Accounts/{ACCOUNT_SID}/Messages.json"
+    latencies, sent = [], 0
+    with httpx.Client(auth=(ACCOUNT_SID, "fake"), timeout=15) as client:
+        for to, body in messages:
+            start = time.perf_counter()
+            response = client.post(url, data={"To": to, "From": "+48100000000", "Body": body})
+            latencies.append(time.perf_counter() - start)
+            sent += response.status_code == 201
+    return sent, latencies
+
+
+def percentile(samples, value):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(value * (len(samples) - 1))))] if samples else 0.0
+
+
+def server_stats(base_url):
+    return json.loads(httpx.get(f"{base_url}/stats").text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="liczba wiadomości")
+    parser.add_argument("--mps", type=float, default=20, help="limit wiadomości na sekundę konta (serwer)")
+    parser.add_argument("--latency", type=float, default=0.15, help="opóźnienie odpowiedzi API [s]")
+    parser.add_argument("--concurrency", type=int, default=10, help="SMS_MAX_CONCURRENCY")
+    args = parser.parse_args()
+
+    messages = [(f"+4860{i:07d}", SMS_REMINDER_BODY) for i in range(args.messages)]
+    print(f"{args.messages} wiadomości; API: opóźnienie {args.latency * 1000:.0f} ms, limit konta {args.mps:g}/s")
+    header = (f"{'sposób':>22} | {'czas [s]':>8} | {'SMS/s':>6} | {'wysłane':>7} | {'429':>4} | "
+              f"{'p50 [ms]':>8} | {'p95 [ms]':>8} | {'maks./s (serwer)':>16}")
+    print(header)
+    print("-" * len(header))
+
+    runs = [("po kolei", None), ("dispatcher", args.mps), ("dispatcher, limit x2", args.mps * 2)]
+    for name, rate in runs:
+        # Osobny serwer na przebieg - czyste liczniki i pełny limit konta na starcie
+        process, base_url = start_server(args)
+        try:
+            start = time.perf_counter()
+            if rate is None:
+                sent, latencies = legacy_send_all(base_url, messages)
+            else:
+                dispatcher = SmsDispatcher(account_sid=ACCOUNT_SID, auth_token="fake", from_number="+48100000000",
+                                           base_url=base_url, rate=rate, max_concurrency=args.concurrency)
+                results = dispatcher.send_batch(messages)
+                sent = sum(1 for result in results if result["success"])
+                latencies = [result["latency"] for result in results if result["success"]]
+            elapsed = time.perf_counter() - start
+            stats = server_stats(base_url)
+        finally:
+            process.send_signal(signal.SIGINT)
+            process.wait(timeout=10)
+
+        print(f"{name:>22} | {elapsed:>8.2f} | {sent / elapsed:>6.1f} | {sent:>7} | {stats['rate_limited']:>4} | "
+              f"{percentile(latencies, 0.5) * 1000:>8.0f} | {percentile(latencies, 0.95) * 1000:>8.0f} | "
+              f"{stats['max_accepted_per_second']:>16}")
+
+
+if __name__ == "__main__":
+    main()
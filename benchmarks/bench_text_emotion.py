@@ -0,0 +1,104 @@
+"""
+Benchmark: oś czasu emocji dla pełnej historii użytkownika.
+
+Porównuje poprzednią implementację TextEmotionAnalyzer.analyze_text
+(dla każdego słowa przeszukanie list wszystkich emocji, tekst po tekście)
+z analizą wsadową analyze_batch (indeks odwrotny + np.bincount).
+
+Użycie:
+    python benchmarks/bench_text_emotion.py
+    python benchmarks/bench_text_emotion.py --answers 5000 --words 60
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_emotion_analyzer import EMOTION_WORDS, TextEmotionAnalyzer  # noqa: E402
+
+FILLER = ("dzisiaj rano poszedłem do pracy i rozmawiałem z szefem o projekcie który "
+          "trwa już od miesięcy wieczorem spotkałem się z rodziną było dużo rozmów").split()
+INFLECTIONS = ("", "", "a", "e", "ego", "ej", "ymi")
+
+
+def synthetic_answers(answers, words, seed=42):
+    rng = random.Random(seed)
+    lexicon = [word for emotion_words in EMOTION_WORDS.values() for word in emotion_words]
+    texts = []
+    for _ in range(answers):
+        tokens = []
+        for _ in range(words):
+            if rng.random() < 0.08:
+                word = rng.choice(lexicon)
+                suffix = rng.choice(INFLECTIONS)
+                tokens.append(word[:-1] + suffix if suffix else word)
+            else:
+                tokens.append(rng.choice(FILLER))
+        texts.append(" ".join(tokens) + ".")
+    return texts
+
+
+def legacy_analyze_text(text):
+    """Poprzednia implementacja analyze_text (przed zmianą)."""
+    text = text.lower()
+    emotion_counts = defaultdict(int)
+    words = text.split()
+    for word in words:
+        for emotion, emotion_words in EMOTION_WORDS.items():
+            if word in emotion_words:
+                emotion_counts[emotion] += 1
+    total_emotional_words = sum(emotion_counts.values())
+    emotion_scores = {}
+    for emotion in EMOTION_WORDS.keys():
+        score = emotion_counts[emotion] / len(words) if len(words) > 0 else 0
+        emotion_scores[emotion] = round(score * 100, 2)
+    dominant_emotion = max(emotion_scores.items(), key=lambda x: x[1])[0] if emotion_scores else None
+    emotion_intensity = (total_emotional_words / len(words)) * 100 if len(words) > 0 else 0
+    return {'dominant_emotion': dominant_emotion, 'emotion_scores': emotion_scores,
+            'emotion_intensity': round(emotion_intensity, 2)}
+
+
+def measure(func, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=5000, help="liczba odpowiedzi w historii")
+    parser.add_argument("--words", type=int, default=60, help="średnia liczba słów w odpowiedzi")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = synthetic_answers(args.answers, args.words)
+    analyzer = TextEmotionAnalyzer()
+    analyzer.analyze_batch(texts[:10])  # rozgrzewka (import NumPy)
+
+    cold = TextEmotionAnalyzer()
+    cold_time, _ = measure(lambda: cold.analyze_batch(texts), 1)
+    legacy_time, legacy = measure(lambda: [legacy_analyze_text(t) for t in texts], args.repeats)
+    batch_time, batch = measure(lambda: analyzer.analyze_batch(texts), args.repeats)
+
+    legacy_hits = sum(r['emotion_intensity'] > 0 for r in legacy)
+    batch_hits = sum(r['emotion_intensity'] > 0 for r in batch)
+    print(f"Historia: {args.answers} odpowiedzi x ~{args.words} słów")
+    print(f"{'implementacja':>34} | {'czas [ms]':>10} | {'teksty z emocjami':>17}")
+    print("-" * 68)
+    print(f"{'analyze_text w pętli (poprzednio)':>34} | {legacy_time * 1000:>10.1f} | {legacy_hits:>17}")
+    print(f"{'analyze_batch (pierwsze wywołanie)':>34} | {cold_time * 1000:>10.1f} | {batch_hits:>17}")
+    print(f"{'analyze_batch':>34} | {batch_time * 1000:>10.1f} | {batch_hits:>17}")
+    print(f"Przyspieszenie: {legacy_time / batch_time:.1f}x "
+          "(analyze_batch rozpoznaje też odmienione formy i słowa przy znakach interpunkcyjnych)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: wykrywanie tematów w historii odpowiedzi (therapy.analyze_context).
+
+Porównuje poprzednie podejście (osobne `keyword in text` dla każdego z ~150
+słów kluczowych na połączonej historii) z automatem Aho–Corasick
+(therapy.ThemeMatcher), który znajduje wszystkie słowa kluczowe w jednym
+przebiegu po tekście:
+- "AC, jeden przebieg": match() na połączonej historii,
+- "AC, pierwsze wywołanie": match_texts() - każda odpowiedź skanowana osobno,
+- "AC, nowa odpowiedź": match_texts() po dopisaniu jednej odpowiedzi
+  (poprzednie odpowiedzi są zapamiętane - tak działa analyze_context przy
+  kolejnych pytaniach).
+
+Użycie:
+    python benchmarks/bench_theme_matcher.py
+    python benchmarks/bench_theme_matcher.py --sizes 10 100 1000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from therapy import KEYWORDS, ThemeMatcher  # noqa: E402
+
+FILLER = ("dzisiaj rano poszedłem do pracy i rozmawiałem z szefem o projekcie który trwa "
+          "już od miesięcy wieczorem spotkałem się z rodziną było dużo rozmów o tym co "
+          "czuję i jak sobie radzę z codziennymi sprawami").split()
+
+
+def synthetic_history(size_kb, seed=42, response_bytes=200):
+    """Historia odpowiedzi o zadanym łącznym rozmiarze (małe litery, jak w analyze_context)."""
+    rng = random.Random(seed)
+    keywords = [keyword for words in KEYWORDS.values() for keyword in words]
+    responses = []
+    total = 0
+    while total < size_kb * 1024:
+        words = []
+        length = 0
+        while length < response_bytes:
+            word = rng.choice(keywords) if rng.random() < 0.02 else rng.choice(FILLER)
+            words.append(word)
+            length += len(word) + 1
+        responses.append(" ".join(words).lower())
+        total += length
+    return responses
+
+
+def legacy_match(text):
+    """Poprzednia implementacja (przed zmianą): jedno przeszukanie tekstu na słowo kluczowe."""
+    themes = {}
+    for theme, keywords in KEYWORDS.items():
+        count = sum(1 for keyword in keywords if keyword.lower() in text)
+        if count > 0:
+            themes[theme] = count
+    return themes
+
+
+def measure(func, text, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="rozmiary historii w KB")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matcher = ThemeMatcher(KEYWORDS)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Automat: {len(matcher.patterns)} słów kluczowych, {len(matcher._delta)} stanów, "
+          f"budowa {build_ms:.1f} ms (raz przy imporcie)")
+
+    columns = ["keyword in text", "AC, jeden przebieg", "AC, pierwsze wywołanie", "AC, nowa odpowiedź"]
+    header = f"{'historia [KB]':>13} | " + " | ".join(f"{c + ' [ms]':>27}" for c in columns) + f" | {'zgodne':>6}"
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        responses = synthetic_history(size)
+        text = " ".join(responses)
+        legacy_time, legacy = measure(legacy_match, text, args.repeats)
+        single_time, single = measure(matcher.match, text, args.repeats)
+
+        # Zimny cache: nowy automat dla każdego pomiaru
+        cold_time = float("inf")
+        for _ in range(args.repeats):
+            cold_matcher = ThemeMatcher(KEYWORDS)
+            start = time.perf_counter()
+            cold_matcher.match_texts(responses)
+            cold_time = min(cold_time, time.perf_counter() - start)
+
+        # Ciepły cache: historia już widziana, dochodzi jedna nowa odpowiedź
+        matcher.match_texts(responses)
+        warm_time = float("inf")
+        for i in range(args.repeats):
+            history = responses + [f"nowa odpowiedź numer {size}-{i} czuję stres i niepokój"]
+            start = time.perf_counter()
+            matcher.match_texts(history)
+            warm_time = min(warm_time, time.perf_counter() - start)
+
+        agree = legacy == single == matcher.match_texts(responses)
+        times = [legacy_time, single_time, cold_time, warm_time]
+        print(f"{size:>13} | " + " | ".join(f"{t * 1000:>27.2f}" for t in times) + f" | {'tak' if agree else 'NIE':>6}")
+
+
+if __name__ == "__main__":
+    main()
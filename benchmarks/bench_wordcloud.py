@@ -0,0 +1,126 @@
+"""
+Benchmark: renderowanie chmury tagów - przed i po zmianie.
+
+Porównuje:
+- "matplotlib (scale=3)": poprzednia ścieżka - WordCloud w skali 3 (~2400x1200),
+  przepuszczony przez figurę matplotlib (imshow + savefig) do PNG 800x400,
+- "PIL (scale=1)": WordCloud.to_image() zapisany wprost do zoptymalizowanego PNG,
+- "cache (skrót)": ponowne żądanie o ten sam słownik częstotliwości.
+
+Każdy tryb działa w osobnym procesie, więc szczytowe zużycie pamięci (RSS)
+nie jest zaburzone przez pozostałe pomiary. Mierzony jest przyrost maksymalnego
+RSS względem stanu po imporcie bibliotek i rozgrzewce.
+
+Użycie:
+    python benchmarks/bench_wordcloud.py
+    python benchmarks/bench_wordcloud.py --renders 20 --words 100
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ("matplotlib (scale=3)", "PIL (scale=1)", "cache (skrót)")
+
+SYLLABLES = ["pra", "ca", "stres", "ro", "dzi", "na", "sen", "zmę", "cze", "nie", "ra", "dość",
+             "spa", "cer", "lęk", "przy", "ja", "ciel", "tę", "sk", "no", "ta", "mów", "ić"]
+
+
+def synthetic_frequencies(words=100, seed=42):
+    rng = random.Random(seed)
+    frequencies = {}
+    while len(frequencies) < words:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        frequencies[word] = rng.randint(1, 60)
+    return frequencies
+
+
+def draw_wordcloud_matplotlib(payload):
+    """Poprzednia implementacja (przed zmianą) - odtworzona na potrzeby porównania."""
+    from matplotlib.figure import Figure
+    from wordcloud import WordCloud
+
+    width, height = payload["width"], payload["height"]
+    wordcloud = WordCloud(width=width, height=height, background_color='#0d1117', colormap='viridis',
+                          max_words=100, prefer_horizontal=0.9, scale=3, min_font_size=10,
+                          max_font_size=200, random_state=42)
+    wordcloud.generate_from_frequencies(payload["frequencies"])
+
+    fig = Figure(figsize=(width / 100, height / 100), facecolor='#0d1117')
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis("off")
+    fig.tight_layout(pad=0)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', facecolor='#0d1117', bbox_inches='tight', pad_inches=0, dpi=100)
+    return buf.getvalue()
+
+
+def run_mode(mode, renders, words):
+    """Wykonywane w procesie potomnym: mierzy czas i przyrost szczytowego RSS jednego trybu."""
+    import wordcloud_analyzer
+
+    payload = wordcloud_analyzer.build_wordcloud_payload(synthetic_frequencies(words))
+    if mode == MODES[0]:
+        render = draw_wordcloud_matplotlib
+    elif mode == MODES[1]:
+        render = wordcloud_analyzer._render_wordcloud_png
+    else:
+        render = wordcloud_analyzer.draw_wordcloud
+
+    # Rozgrzewka (importy wordcloud, PIL, matplotlib; w trybie cache - zapis do cache'a)
+    png = render(payload)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(renders):
+        start = time.perf_counter()
+        png = render(payload)
+        timings.append(time.perf_counter() - start)
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": sorted(timings)[max(0, int(len(timings) * 0.95) - 1)] * 1000,
+        "rss_growth_mb": (peak_kb - baseline_kb) / 1024,
+        "peak_rss_mb": peak_kb / 1024,
+        "png_kb": len(png) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=10, help="liczba renderowań na tryb")
+    parser.add_argument("--words", type=int, default=100, help="liczba słów w chmurze")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.renders, args.words)))
+        return
+
+    header = f"{'tryb':>22} | {'mediana [ms]':>12} | {'p95 [ms]':>9} | {'szczyt RSS [MB]':>15} | {'przyrost RSS [MB]':>17} | {'PNG [KB]':>8}"
+    print(header)
+    print("-" * len(header))
+    for mode in MODES:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode,
+             "--renders", str(args.renders), "--words", str(args.words)],
+            capture_output=True, text=True, check=True
+        )
+        r = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{mode:>22} | {r['median_ms']:>12.1f} | {r['p95_ms']:>9.1f} | {r['peak_rss_mb']:>15.1f} | "
+              f"{r['rss_growth_mb']:>17.1f} | {r['png_kb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
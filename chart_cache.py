@@ -0,0 +1,252 @@
+"""
+Cache wykresów PNG na dysku, serwowanych przez /charts/<kind>/<user>.png.
+
+Każdy wykres jest identyfikowany skrótem (digest) danych, z których powstaje:
+ID analiz psychologicznych użytkownika (wykresy emocji i inteligencji
+emocjonalnej) lub udzielonych odpowiedzi (chmura słów). Obraz jest renderowany
+raz, zapisywany na dysku i serwowany z silnym nagłówkiem ETag, dzięki czemu
+przeglądarka pobiera go ponownie dopiero po zmianie danych.
+
+Nowa analiza lub odpowiedź zmienia skrót, a zdarzenia SQLAlchemy
+(register_invalidation_hooks) usuwają nieaktualne pliki użytkownika.
+"""
+
+import os
+import glob
+import random
+import hashlib
+import logging
+from datetime import date
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Katalog cache'a wykresów
+CHART_CACHE_DIR = os.environ.get(
+    "CHART_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "chart_cache")
+)
+
+# Maksymalny łączny rozmiar plików cache'a (w bajtach) - 256 MB
+CHART_CACHE_MAX_BYTES = int(os.environ.get("CHART_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Zmiana wersji unieważnia wszystkie zapisane wykresy (np. po zmianie wyglądu)
+CHART_RENDER_VERSION = "2"
+
+# Rodzaje wykresów i dane, od których zależą
+ANALYSIS_CHARTS = ("emotion", "ei-progress")
+RESPONSE_CHARTS = ("wordcloud",)
+CHART_KINDS = ANALYSIS_CHARTS + RESPONSE_CHARTS
+
+# Co ile zapisów (średnio) sprawdzamy limit rozmiaru
+_EVICTION_CHECK_RATE = 0.02
+
+
+def chart_digest(kind, user_id):
+    """
+    Oblicza skrót danych, na podstawie których powstaje wykres.
+
+    Args:
+        kind (str): Rodzaj wykresu (jeden z CHART_KINDS)
+        user_id (int): ID użytkownika
+
+    Returns:
+        str: Skrót szesnastkowy (identyfikuje wersję wykresu)
+    """
+    from sqlalchemy import func
+    from database import db
+    from models import PsychologicalAnalysis, Conversation
+
+    if kind in ANALYSIS_CHARTS:
+        ids = [row[0] for row in db.session.query(PsychologicalAnalysis.id)
+               .filter_by(user_id=user_id).order_by(PsychologicalAnalysis.id.asc()).all()]
+        parts = [",".join(map(str, ids))]
+        if kind == "emotion":
+            # Wykres emocji obejmuje ostatnie 30 dni, więc zmienia się także z upływem czasu
+            parts.append(date.today().isoformat())
+    elif kind in RESPONSE_CHARTS:
+        # Liczba i największe ID opisują dopisane odpowiedzi, a czas ostatniego zapisu
+        # odpowiedzi - także nadpisanie wcześniejszej (submit_response)
+        count, max_id, updated_at = db.session.query(
+            func.count(Conversation.id), func.max(Conversation.id), func.max(Conversation.response_updated_at)
+        ).filter(Conversation.user_id == user_id, Conversation.response.isnot(None)).one()
+        parts = [str(count), str(max_id), str(updated_at)]
+    else:
+        raise ValueError(f"Nieznany rodzaj wykresu: {kind}")
+
+    payload = "|".join([CHART_RENDER_VERSION, kind, str(user_id)] + parts)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def build_chart_payload(kind, user_id):
+    """
+    Przygotowuje dane wykresu (proste typy) do przekazania usłudze renderowania.
+
+    Returns:
+        dict lub None: Dane wykresu lub None, gdy brak wystarczających danych
+    """
+    if kind in ANALYSIS_CHARTS:
+        from models import PsychologicalAnalysis
+        from visualization import build_emotion_chart_payload, build_ei_progress_payload
+
+        analyses = PsychologicalAnalysis.query.filter_by(user_id=user_id)\
+            .order_by(PsychologicalAnalysis.timestamp.asc()).all()
+        if kind == "emotion":
+            return build_emotion_chart_payload(analyses)
+        return build_ei_progress_payload(analyses)
+
+    if kind == "wordcloud":
+        from term_frequency import get_top_terms
+        from wordcloud_analyzer import build_wordcloud_payload
+
+        frequencies = get_top_terms(user_id)
+        return build_wordcloud_payload(frequencies) if frequencies else None
+
+    raise ValueError(f"Nieznany rodzaj wykresu: {kind}")
+
+
+def render_chart(kind, user_id):
+    """
+    Renderuje wykres użytkownika w puli procesów (render_service.py).
+
+    Returns:
+        bytes lub None: Obraz PNG lub None, gdy brak danych albo renderowanie się nie powiodło
+    """
+    from render_service import render
+
+    payload = build_chart_payload(kind, user_id)
+    return render(kind, payload) if payload else None
+
+
+class DiskChartCache:
+    """Pliki PNG w katalogu <dir>/<user_id>/<kind>-<digest>.png."""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or CHART_CACHE_DIR
+        self.max_bytes = CHART_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    def _path(self, kind, user_id, digest):
+        return os.path.join(self.directory, str(user_id), f"{kind}-{digest}.png")
+
+    def get(self, kind, user_id, digest):
+        """Zwraca zapisany obraz lub None."""
+        try:
+            with open(self._path(kind, user_id, digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, kind, user_id, digest, png):
+        """Zapisuje obraz atomowo (plik tymczasowy + zmiana nazwy) i usuwa starsze wersje wykresu."""
+        path = self._path(kind, user_id, digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, path)
+            self.invalidate(user_id, kinds=[kind], keep=path)
+            if random.random() < _EVICTION_CHECK_RATE:
+                self.evict()
+        except OSError as e:
+            logger.warning(f"Błąd zapisu wykresu do cache'a: {str(e)}")
+
+    def invalidate(self, user_id, kinds=None, keep=None):
+        """
+        Usuwa zapisane wykresy użytkownika.
+
+        Args:
+            user_id (int): ID użytkownika
+            kinds (list, optional): Rodzaje wykresów do usunięcia (domyślnie wszystkie)
+            keep (str, optional): Ścieżka pliku, którego nie należy usuwać
+
+        Returns:
+            int: Liczba usuniętych plików
+        """
+        removed = 0
+        for kind in kinds or CHART_KINDS:
+            for path in glob.glob(os.path.join(self.directory, str(user_id), f"{kind}-*.png")):
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def evict(self):
+        """
+        Usuwa najstarsze pliki, dopóki łączny rozmiar przekracza limit.
+
+        Returns:
+            int: Liczba usuniętych plików
+        """
+        files = []
+        for path in glob.glob(os.path.join(self.directory, "*", "*.png")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                total -= size
+            except OSError:
+                pass
+        return removed
+
+
+chart_cache = DiskChartCache()
+
+
+def get_chart_png(kind, user_id, digest=None):
+    """
+    Zwraca wykres z cache'a, renderując go przy pierwszym żądaniu.
+
+    Args:
+        kind (str): Rodzaj wykresu
+        user_id (int): ID użytkownika
+        digest (str, optional): Wcześniej obliczony skrót danych
+
+    Returns:
+        bytes lub None: Obraz PNG lub None, gdy brak danych do wykresu
+    """
+    digest = digest or chart_digest(kind, user_id)
+    png = chart_cache.get(kind, user_id, digest)
+    if png is None:
+        png = render_chart(kind, user_id)
+        if png:
+            chart_cache.set(kind, user_id, digest, png)
+    return png
+
+
+def get_chart_versions(user_id):
+    """Zwraca skróty wszystkich wykresów użytkownika (do budowania adresów obrazów)."""
+    return {kind.replace("-", "_"): chart_digest(kind, user_id) for kind in CHART_KINDS}
+
+
+def register_invalidation_hooks():
+    """
+    Usuwa nieaktualne wykresy po zapisaniu nowej analizy lub odpowiedzi,
+    niezależnie od miejsca zapisu (trasy, proces roboczy, przetwarzanie wsadowe).
+    """
+    from sqlalchemy import event
+    from models import PsychologicalAnalysis, Conversation
+
+    @event.listens_for(PsychologicalAnalysis, "after_insert")
+    def _analysis_inserted(mapper, connection, target):
+        chart_cache.invalidate(target.user_id, kinds=ANALYSIS_CHARTS)
+
+    @event.listens_for(Conversation, "after_update")
+    def _conversation_answered(mapper, connection, target):
+        if target.response is not None:
+            chart_cache.invalidate(target.user_id, kinds=RESPONSE_CHARTS)
@@ -1,41 +1,26 @@
 import os
 import json
 import logging
-import time
 import random
-import anthropic
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Optional, Iterator
+from llm_cache import LLMCache, make_cache_key
+from llm_gateway import gateway
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Inicjalizacja klienta Claude
-HAS_ANTHROPIC = False
-client = None
-
-try:
-    from anthropic import Anthropic
-    HAS_ANTHROPIC = True
-    
-    # Inicjalizacja klienta Anthropic Claude
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if api_key:
-        client = Anthropic(api_key=api_key)
-        logger.info("Zainicjalizowano klienta Anthropic Claude API")
-    else:
-        logger.warning("Brak klucza API Anthropic (ANTHROPIC_API_KEY)")
-except ImportError as e:
-    logger.warning(f"Nie można zaimportować pakietu Anthropic: {str(e)}")
-except Exception as e:
-    logger.warning(f"Anthropic API jest niedostępne: {str(e)}")
-
-# Cache na wyniki analizy, aby ograniczyć liczbę zapytań do API
-question_cache = {}
+# Cache na wyniki analizy, aby ograniczyć liczbę zapytań do API (współdzielony przez wszystkie procesy)
+question_cache = LLMCache("claude_question")
 
 # Standardowe wartości zastępcze dla analizy niedzialajacegp API
 DEFAULT_QUESTION = "Jakie emocje towarzyszą Ci najczęściej w ciągu dnia? Potrafisz je nazwać?"
 
+# Model i prompt systemowy używane do generowania pytań
+QUESTION_MODEL = "claude-3-5-sonnet-20241022"  # the newest Anthropic model is "claude-3-5-sonnet-20241022" which was released October 22, 2024.
+QUESTION_SYSTEM_PROMPT = "Jesteś empatycznym polskim psychoterapeutą specjalizującym się w terapii poznawczo-behawioralnej i refleksyjnym podejściu do problemów życiowych. Twoje pytania są głębokie, wnikliwe i zachęcają do autorefleksji."
+
 # Komunikat wyświetlany przy błędzie limitu API
 API_LIMIT_MESSAGES = [
     "Wystąpił błąd podczas generowania pytania z powodu ograniczeń API.",
@@ -43,6 +28,40 @@ API_LIMIT_MESSAGES = [
     "Spróbuj ponownie później lub zapoznaj się z alternatywnie generowanymi pytaniami."
 ]
 
+INITIAL_QUESTION_PROMPT = """
+            Wygeneruj jedno głębokie, refleksyjne pytanie terapeutyczne w języku polskim, które mogłoby rozpocząć rozmowę z nowym użytkownikiem aplikacji wsparcia psychologicznego. 
+            Pytanie powinno być empatyczne, otwarte i zachęcające do głębszej refleksji nad sobą i swoim samopoczuciem.
+            Unikaj pytań zamkniętych i powierzchownych. Pytanie powinno być napisane w drugiej osobie liczby pojedynczej (Ty).
+            
+            Odpowiedz tylko samym pytaniem, bez dodatkowego tekstu.
+            """
+
+def _format_conversation_history(context: List[Dict[str, Any]]) -> str:
+    """Formatuje ostatnie 5 wpisów rozmowy jako tekst dla modelu."""
+    conversation_history = ""
+    for entry in context[-5:]:  # Use only last 5 entries for context
+        if entry.get("question") and entry.get("response"):
+            conversation_history += f"Pytanie: {entry['question']}\n"
+            conversation_history += f"Odpowiedź użytkownika: {entry['response']}\n\n"
+    return conversation_history
+
+def _build_followup_prompt(conversation_history: str) -> str:
+    """Buduje prompt dla kolejnego pytania na podstawie historii rozmowy."""
+    return f"""
+    Oto fragment rozmowy terapeutycznej w języku polskim. Przeanalizuj kontekst i wygeneruj jedno kolejne, pogłębiające pytanie dla użytkownika:
+
+    {conversation_history}
+
+    Na podstawie powyższego kontekstu i odpowiedzi użytkownika, sformułuj jedno głębokie, wnikliwe pytanie terapeutyczne, które:
+    1. Odnosi się do tematów, emocji lub wzorców widocznych w powyższych odpowiedziach
+    2. Zachęca do głębszej refleksji nad sobą
+    3. Jest empatyczne i pełne zrozumienia
+    4. Jest sformułowane w sposób otwarty (nie może być odpowiedzią tak/nie)
+    5. Nie zawiera osądów ani założeń
+    
+    Wygeneruj wyłącznie jedno pytanie, bez żadnego dodatkowego tekstu czy wyjaśnień.
+    """
+
 def generate_claude_question(context: Optional[List[Dict[str, Any]]] = None) -> str:
     """
     Generuje terapeutyczne pytanie wykorzystując model Claude, które jest dopasowane 
@@ -56,7 +75,7 @@ def generate_claude_question(context: Optional[List[Dict[str, Any]]] = None) ->
         str: Terapeutyczne pytanie w języku polskim.
     """
     # Jeśli Claude nie jest dostępny, użyj algorytmu zastępczego
-    if not HAS_ANTHROPIC or client is None:
+    if not gateway.is_available("anthropic"):
         logger.warning("Anthropic Claude API jest niedostępne. Używam domyślnego mechanizmu generowania pytań.")
         from therapy import generate_question
         return generate_question(context)
@@ -65,27 +84,23 @@ def generate_claude_question(context: Optional[List[Dict[str, Any]]] = None) ->
     if not context or len(context) == 0:
         try:
             # Generujemy pierwsze pytanie inicjujące rozmowę
-            prompt = """
-            Wygeneruj jedno głębokie, refleksyjne pytanie terapeutyczne w języku polskim, które mogłoby rozpocząć rozmowę z nowym użytkownikiem aplikacji wsparcia psychologicznego. 
-            Pytanie powinno być empatyczne, otwarte i zachęcające do głębszej refleksji nad sobą i swoim samopoczuciem.
-            Unikaj pytań zamkniętych i powierzchownych. Pytanie powinno być napisane w drugiej osobie liczby pojedynczej (Ty).
-            
-            Odpowiedz tylko samym pytaniem, bez dodatkowego tekstu.
-            """
+            prompt = INITIAL_QUESTION_PROMPT
             
             # Cache key for the initial question
-            cache_key = "initial_question"
+            cache_key = make_cache_key(QUESTION_MODEL, QUESTION_SYSTEM_PROMPT,
+                                       {"max_tokens": 150, "temperature": 0.7}, prompt)
             
             # Check if we have a cached response
-            if cache_key in question_cache:
-                return question_cache[cache_key]
+            cached_question = question_cache.get(cache_key)
+            if cached_question:
+                return cached_question
             
             # Call the Claude API
-            message = client.messages.create(
-                model="claude-3-5-sonnet-20241022", # the newest Anthropic model is "claude-3-5-sonnet-20241022" which was released October 22, 2024.
+            message = gateway.anthropic_messages(
+                model=QUESTION_MODEL,
                 max_tokens=150,
                 temperature=0.7,
-                system="Jesteś empatycznym polskim psychoterapeutą specjalizującym się w terapii poznawczo-behawioralnej i refleksyjnym podejściu do problemów życiowych. Twoje pytania są głębokie, wnikliwe i zachęcają do autorefleksji.",
+                system=QUESTION_SYSTEM_PROMPT,
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
@@ -94,7 +109,7 @@ def generate_claude_question(context: Optional[List[Dict[str, Any]]] = None) ->
             question = message.content[0].text.strip()
             
             # Cache the response
-            question_cache[cache_key] = question
+            question_cache.set(cache_key, question)
             
             return question
             
@@ -105,88 +120,100 @@ def generate_claude_question(context: Optional[List[Dict[str, Any]]] = None) ->
             return random.choice(DEFAULT_FIRST_QUESTIONS)
     
     # Prepare conversation context for Claude
-    conversation_history = ""
-    for i, entry in enumerate(context[-5:]):  # Use only last 5 entries for context
-        if entry.get("question") and entry.get("response"):
-            conversation_history += f"Pytanie: {entry['question']}\n"
-            conversation_history += f"Odpowiedź użytkownika: {entry['response']}\n\n"
+    conversation_history = _format_conversation_history(context)
     
-    # Generate a hash of the conversation history for caching
-    cache_key = hash(conversation_history)
+    # Define the prompt for Claude
+    prompt = _build_followup_prompt(conversation_history)
+    
+    # Generate a stable digest of the request for caching
+    cache_key = make_cache_key(QUESTION_MODEL, QUESTION_SYSTEM_PROMPT,
+                               {"max_tokens": 200, "temperature": 0.7}, prompt)
     
     # Check if we have a cached response for this conversation
-    if cache_key in question_cache:
-        return question_cache[cache_key]
+    cached_question = question_cache.get(cache_key)
+    if cached_question:
+        return cached_question
     
-    # Define the prompt for Claude
-    prompt = f"""
-    Oto fragment rozmowy terapeutycznej w języku polskim. Przeanalizuj kontekst i wygeneruj jedno kolejne, pogłębiające pytanie dla użytkownika:
+    try:
+        # Ponawianiem, limitami i wyłącznikiem obwodu zarządza brama LLM
+        message = gateway.anthropic_messages(
+            model=QUESTION_MODEL,
+            max_tokens=200,
+            temperature=0.7,
+            system=QUESTION_SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
 
-    {conversation_history}
+        question = message.content[0].text.strip()
+
+        # Cache the response
+        question_cache.set(cache_key, question)
+
+        return question
 
-    Na podstawie powyższego kontekstu i odpowiedzi użytkownika, sformułuj jedno głębokie, wnikliwe pytanie terapeutyczne, które:
-    1. Odnosi się do tematów, emocji lub wzorców widocznych w powyższych odpowiedziach
-    2. Zachęca do głębszej refleksji nad sobą
-    3. Jest empatyczne i pełne zrozumienia
-    4. Jest sformułowane w sposób otwarty (nie może być odpowiedzią tak/nie)
-    5. Nie zawiera osądów ani założeń
-    
-    Wygeneruj wyłącznie jedno pytanie, bez żadnego dodatkowego tekstu czy wyjaśnień.
-    """
-    
-    try:
-        # Mechanizm ponownych prób z wykładniczym opóźnieniem
-        max_retries = 3
-        retry_delay = 1  # początkowe opóźnienie w sekundach
-        
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Próba generowania pytania z Claude {attempt+1}/{max_retries}")
-                
-                # Call the Claude API
-                message = client.messages.create(
-                    model="claude-3-5-sonnet-20241022", # the newest Anthropic model is "claude-3-5-sonnet-20241022" which was released October 22, 2024.
-                    max_tokens=200,
-                    temperature=0.7,
-                    system="Jesteś empatycznym polskim psychoterapeutą specjalizującym się w terapii poznawczo-behawioralnej i refleksyjnym podejściu do problemów życiowych. Twoje pytania są głębokie, wnikliwe i zachęcają do autorefleksji.",
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                
-                question = message.content[0].text.strip()
-                
-                # Cache the response
-                question_cache[cache_key] = question
-                
-                return question
-                
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Błąd podczas generowania pytania z Claude: {error_msg}")
-                
-                # Check if it's a rate limit error
-                if "rate_limit" in error_msg.lower() or "rate limit" in error_msg.lower():
-                    logger.warning("Osiągnięto limit zapytań API Claude.")
-                    
-                    # Fallback to our standard question generation mechanism
-                    from therapy import generate_question
-                    return generate_question(context)
-                    
-                # If this is the last retry, use the standard question generation
-                if attempt == max_retries - 1:
-                    logger.error("Wyczerpano limit prób Claude. Używam standardowego mechanizmu.")
-                    from therapy import generate_question
-                    return generate_question(context)
-                    
-                # Add random jitter to delay
-                jitter = random.uniform(0, 0.5)
-                wait_time = retry_delay * (2 ** attempt) + jitter
-                logger.info(f"Ponawiam próbę za {wait_time:.2f} sekund...")
-                time.sleep(wait_time)
-                
     except Exception as e:
-        logger.error(f"Nieoczekiwany błąd w module Claude: {str(e)}")
+        logger.error(f"Błąd podczas generowania pytania z Claude: {str(e)}. Używam standardowego mechanizmu.")
         # Fallback to standard question generation
         from therapy import generate_question
-        return generate_question(context)
\ No newline at end of file
+        return generate_question(context)
+
+# Koniec pierwszego pełnego zdania pytającego w strumieniu tokenów
+_QUESTION_END_RE = re.compile(r"\?(?=\s|$)")
+
+def stream_claude_question(context: Optional[List[Dict[str, Any]]] = None) -> Iterator[str]:
+    """
+    Generuje terapeutyczne pytanie w trybie strumieniowym (Anthropic streaming API).
+
+    Fragmenty tekstu są zwracane w miarę ich otrzymywania. Strumień jest przerywany,
+    gdy tylko model zakończy pierwsze pełne zdanie pytające.
+
+    Args:
+        context (list, optional): Lista poprzednich elementów konwersacji.
+
+    Yields:
+        str: Kolejne fragmenty pytania. Połączone tworzą pełne pytanie.
+    """
+    from therapy import generate_question
+
+    if not gateway.is_available("anthropic"):
+        logger.warning("Anthropic Claude API jest niedostępne. Używam domyślnego mechanizmu generowania pytań.")
+        yield generate_question(context)
+        return
+
+    if not context or len(context) == 0:
+        prompt = INITIAL_QUESTION_PROMPT
+        max_tokens = 150
+    else:
+        prompt = _build_followup_prompt(_format_conversation_history(context))
+        max_tokens = 200
+
+    emitted = ""
+    try:
+        stream = gateway.anthropic_stream_text(
+            model=QUESTION_MODEL,
+            max_tokens=max_tokens,
+            temperature=0.7,
+            system=QUESTION_SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+        for text in stream:
+            candidate = emitted + text
+            match = _QUESTION_END_RE.search(candidate)
+            if match:
+                # Pierwsze pełne pytanie gotowe - przerywamy strumień
+                chunk = candidate[len(emitted):match.end()]
+                if chunk:
+                    emitted += chunk
+                    yield chunk
+                stream.close()
+                break
+            emitted = candidate
+            yield text
+    except Exception as e:
+        logger.error(f"Błąd podczas strumieniowego generowania pytania z Claude: {str(e)}")
+        if not emitted.strip():
+            yield generate_question(context)
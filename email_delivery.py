@@ -0,0 +1,323 @@
+"""
+Wysyłka przypomnień e-mail przez pulę uwierzytelnionych sesji SMTP.
+
+Zamiast nowego połączenia (TCP, STARTTLS, LOGIN) dla każdej wiadomości:
+
+- SMTPSessionPool utrzymuje kilka zalogowanych sesji, które wysyłają kolejne
+  wiadomości jedna po drugiej (sesja jest zamykana po SMTP_MAX_MESSAGES_PER_SESSION
+  wiadomościach, bo serwery ograniczają ich liczbę na połączenie),
+- ReminderEmailTemplate renderuje nagłówki MIME i zakodowaną treść raz;
+  dla odbiorcy podstawiany jest tylko adres i wiersz powitania,
+- BulkEmailSender wysyła wiadomości z puli wątków (po jednym wątku na sesję),
+  a po zerwaniu połączenia otwiera nową sesję i ponawia wysyłkę.
+
+Konfiguracja SMTP pochodzi ze zmiennych środowiskowych (SMTP_SERVER, SMTP_PORT,
+SMTP_USERNAME, SMTP_PASSWORD, SENDER_EMAIL); SMTP_USE_TLS=0 wyłącza STARTTLS
+(np. dla lokalnego serwera tools/fake_smtp_server.py).
+"""
+
+import os
+import ssl
+import time
+import queue
+import quopri
+import logging
+import smtplib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from email.header import Header
+from email.utils import formatdate, make_msgid
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Konfiguracja SMTP dla powiadomień email
+SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_USERNAME = os.environ.get("SMTP_USERNAME")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
+SENDER_EMAIL = os.environ.get("SENDER_EMAIL", SMTP_USERNAME)
+SMTP_USE_TLS = os.environ.get("SMTP_USE_TLS", "1") != "0"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30.0))
+
+# Liczba równoczesnych sesji SMTP (i wątków wysyłających)
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 4))
+
+# Po tylu wiadomościach sesja jest zamykana i otwierana na nowo
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.environ.get("SMTP_MAX_MESSAGES_PER_SESSION", 100))
+
+# Liczba ponowień wiadomości po zerwanym połączeniu
+SMTP_MAX_RETRIES = int(os.environ.get("SMTP_MAX_RETRIES", 2))
+
+REMINDER_SUBJECT = "Przypomnienie o codziennej refleksji"
+
+REMINDER_GREETING = "Cześć {username}!"
+
+REMINDER_BODY = """
+To Twoje codzienne przypomnienie o refleksji terapeutycznej.
+Poświęć kilka minut, aby odpowiedzieć na pytanie dnia i zbliżyć się do lepszego zrozumienia siebie.
+
+Przejdź do aplikacji: https://terapia.replit.app
+
+Pozdrawiamy,
+Zespół RefleksjaApp
+
+---
+To jest wiadomość automatyczna. Możesz wyłączyć lub zmodyfikować powiadomienia w ustawieniach swojego konta.
+"""
+
+
+class SMTPSessionError(Exception):
+    """Nie udało się otworzyć sesji SMTP (połączenie, STARTTLS, logowanie) - błąd serwera lub konfiguracji, nie wiadomości."""
+
+
+def _is_connection_error(error):
+    """Czy błąd oznacza zerwaną sesję (wiadomość można ponowić na nowym połączeniu)."""
+    # SMTPException dziedziczy po OSError - błędy protokołu nie zrywają sesji
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def _qp(text):
+    """Koduje tekst UTF-8 w quoted-printable z końcami wierszy CRLF."""
+    return quopri.encodestring(text.encode("utf-8")).replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+
+
+class ReminderEmailTemplate:
+    """Wstępnie wyrenderowana wiadomość text/plain (quoted-printable) z przypomnieniem."""
+
+    def __init__(self, sender, subject=REMINDER_SUBJECT, greeting=REMINDER_GREETING, body=REMINDER_BODY):
+        self.sender = sender
+        self.greeting = greeting
+        self._domain = (sender or "localhost").rpartition("@")[2] or "localhost"
+        self._headers = (
+            f"From: {sender}\r\n"
+            f"Subject: {Header(subject, 'utf-8').encode()}\r\n"
+            "MIME-Version: 1.0\r\n"
+            'Content-Type: text/plain; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: quoted-printable\r\n"
+        ).encode("ascii")
+        self._body = _qp(body)
+        if not self._body.endswith(b"\r\n"):
+            self._body += b"\r\n"
+
+    def render(self, to, username):
+        """
+        Składa wiadomość dla odbiorcy.
+
+        Args:
+            to (str): Adres e-mail odbiorcy
+            username (str): Nazwa użytkownika (do powitania)
+
+        Returns:
+            bytes: Gotowa wiadomość do przekazania w poleceniu DATA
+        """
+        headers = (
+            f"To: {to}\r\n"
+            f"Date: {formatdate(localtime=False)}\r\n"
+            f"Message-ID: {make_msgid(domain=self._domain)}\r\n"
+        ).encode("utf-8")
+        greeting = _qp(self.greeting.format(username=username))
+        return self._headers + headers + b"\r\n" + greeting + b"\r\n" + self._body
+
+
+class SMTPSessionPool:
+    """Pula uwierzytelnionych sesji SMTP współdzielona przez wątki wysyłające."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, username=SMTP_USERNAME, password=SMTP_PASSWORD,
+                 size=SMTP_POOL_SIZE, use_tls=SMTP_USE_TLS, timeout=SMTP_TIMEOUT,
+                 max_messages_per_session=SMTP_MAX_MESSAGES_PER_SESSION):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_messages_per_session = max_messages_per_session
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._ssl_context = ssl.create_default_context() if use_tls else None
+        self._stats_lock = threading.Lock()
+        self.stats = {"connections": 0, "reconnects": 0}
+
+    def _connect(self):
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        except (smtplib.SMTPException, OSError) as e:
+            raise SMTPSessionError(f"Nie można połączyć się z serwerem SMTP: {str(e)}") from e
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls(context=self._ssl_context)
+                smtp.ehlo()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except (smtplib.SMTPException, OSError) as e:
+            self._close(smtp, graceful=False)
+            raise SMTPSessionError(f"Nie można otworzyć sesji SMTP: {str(e)}") from e
+        smtp.messages_sent = 0
+        with self._stats_lock:
+            self.stats["connections"] += 1
+        return smtp
+
+    @staticmethod
+    def _close(smtp, graceful=True):
+        try:
+            if graceful:
+                smtp.quit()
+            else:
+                smtp.close()
+        except Exception:
+            smtp.close()
+
+    @contextmanager
+    def session(self):
+        """
+        Wypożycza sesję z puli (lub otwiera nową, jeśli nie ma wolnej).
+
+        Sesja wraca do puli po wysłaniu wiadomości. Po błędzie połączenia
+        jest porzucana, a przy kolejnym wypożyczeniu otwierana jest nowa.
+        """
+        self._slots.acquire()
+        smtp = None
+        try:
+            try:
+                smtp = self._idle.get_nowait()
+            except queue.Empty:
+                smtp = self._connect()
+            try:
+                yield smtp
+            except Exception as e:
+                if _is_connection_error(e):
+                    self._close(smtp, graceful=False)
+                    smtp = None
+                    with self._stats_lock:
+                        self.stats["reconnects"] += 1
+                raise
+            if smtp.messages_sent >= self.max_messages_per_session:
+                self._close(smtp)
+            else:
+                self._idle.put(smtp)
+            smtp = None
+        finally:
+            if smtp is not None:
+                self._idle.put(smtp)
+            self._slots.release()
+
+    def close(self):
+        """Zamyka wszystkie bezczynne sesje."""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+class BulkEmailSender:
+    """Równoległa wysyłka przypomnień przez pulę sesji SMTP."""
+
+    def __init__(self, pool=None, template=None, max_retries=SMTP_MAX_RETRIES):
+        self.pool = pool or SMTPSessionPool()
+        self.template = template or ReminderEmailTemplate(SENDER_EMAIL)
+        self.max_retries = max_retries
+
+    def deliver(self, to, username):
+        """
+        Wysyła przypomnienie do jednego odbiorcy.
+
+        Args:
+            to (str): Adres e-mail odbiorcy
+            username (str): Nazwa użytkownika
+
+        Returns:
+            dict: success, error, permanent (błąd trwały - ponawianie nie ma sensu),
+                  attempts, latency [s]
+        """
+        result = {"success": False, "error": None, "permanent": False, "attempts": 0, "latency": None}
+        started = time.perf_counter()
+        message = self.template.render(to, username)
+        for attempt in range(self.max_retries + 1):
+            result["attempts"] = attempt + 1
+            try:
+                with self.pool.session() as smtp:
+                    smtp.sendmail(self.template.sender, [to], message)
+                    smtp.messages_sent += 1
+                result["success"], result["error"] = True, None
+                break
+            except SMTPSessionError as e:
+                # Połączenie / logowanie (np. 535 przy błędnym haśle) - dotyczy wszystkich wiadomości,
+                # więc nie jest trwałym błędem tej wiadomości
+                result["error"] = str(e)
+            except smtplib.SMTPSenderRefused as e:
+                # Odrzucony nadawca (MAIL FROM) - konfiguracja konta, a nie wiadomość
+                result["error"] = f"{e.smtp_code} {e.smtp_error!r}"
+            except smtplib.SMTPResponseException as e:
+                result["error"] = f"{e.smtp_code} {e.smtp_error!r}"
+                if e.smtp_code >= 500:
+                    # Odrzucona treść wiadomości (DATA) - ponawianie nie ma sensu
+                    result["permanent"] = True
+                    break
+                # Błąd przejściowy (4xx) - ponów
+            except smtplib.SMTPRecipientsRefused as e:
+                result["error"] = str(e.recipients)
+                result["permanent"] = all(code >= 500 for code, _ in e.recipients.values())
+                break
+            except Exception as e:
+                result["error"] = str(e) or e.__class__.__name__
+                if not _is_connection_error(e):
+                    break
+            if attempt < self.max_retries:
+                time.sleep(min(2.0, 0.1 * 2 ** attempt))
+        result["latency"] = time.perf_counter() - started
+        return result
+
+    def send(self, to, username):
+        """
+        Wysyła przypomnienie do jednego odbiorcy.
+
+        Returns:
+            tuple: (sukces: bool, komunikat błędu: str lub None)
+        """
+        result = self.deliver(to, username)
+        return result["success"], result["error"]
+
+    def send_many(self, recipients):
+        """
+        Wysyła przypomnienia do wielu odbiorców z puli wątków.
+
+        Args:
+            recipients (list): Lista par (adres e-mail, nazwa użytkownika)
+
+        Returns:
+            list: Wyniki deliver() w kolejności odbiorców
+        """
+        if not recipients:
+            return []
+        workers = min(self.pool.size, len(recipients))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp-sender") as executor:
+            return list(executor.map(lambda recipient: self.deliver(*recipient), recipients))
+
+    def close(self):
+        self.pool.close()
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_email_sender():
+    """Zwraca współdzielony BulkEmailSender (tworzony przy pierwszym użyciu)."""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = BulkEmailSender()
+        return _sender
+
+
+def is_email_configured():
+    return bool(SMTP_USERNAME and SMTP_PASSWORD)
@@ -0,0 +1,123 @@
+"""
+Leniwe ładowanie ciężkich, opcjonalnych zależności.
+
+Moduły takie jak matplotlib, numpy, wordcloud, PIL, nltk czy google.cloud
+ładują się od kilkuset milisekund do kilku sekund i zajmują dziesiątki MB
+pamięci, a są potrzebne tylko w nielicznych ścieżkach (wykresy, chmura słów,
+analiza tekstu). Zamiast importować je na początku modułu:
+
+    np = lazy_module("numpy")
+
+Obiekt zachowuje się jak moduł - pierwsze odwołanie do atrybutu (np.array)
+wykonuje właściwy import. Dzięki temu proces roboczy startuje szybciej
+i zużywa mniej pamięci, jeśli nie obsłużył żadnego żądania wymagającego
+danej biblioteki.
+
+Czas i liczba leniwych importów są dostępne w get_lazy_import_stats()
+(endpoint /metrics), a pełny profil startu generuje startup_profile.py.
+"""
+
+import sys
+import time
+import types
+import logging
+import importlib
+import threading
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_import_lock = threading.RLock()
+_stats_lock = threading.Lock()
+
+# Nazwa modułu -> czas importu (w sekundach) przy pierwszym użyciu
+lazy_import_stats = {}
+
+
+class LazyModule(types.ModuleType):
+    """
+    Zastępnik modułu importowanego przy pierwszym odwołaniu do atrybutu.
+
+    Args:
+        name (str): Pełna nazwa modułu (np. "google.cloud.aiplatform")
+        on_load (callable, optional): Funkcja wywoływana raz, z modułem, po imporcie
+                                      (np. matplotlib.use("Agg"))
+    """
+
+    def __init__(self, name, on_load=None):
+        super().__init__(name)
+        self.__dict__["_lazy_on_load"] = on_load
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is not None:
+            return module
+
+        with _import_lock:
+            module = self.__dict__["_lazy_module"]
+            if module is None:
+                name = self.__name__
+                already_loaded = name in sys.modules
+                start = time.perf_counter()
+                module = importlib.import_module(name)
+                on_load = self.__dict__["_lazy_on_load"]
+                if on_load is not None:
+                    on_load(module)
+                elapsed = time.perf_counter() - start
+                self.__dict__["_lazy_module"] = module
+
+                if not already_loaded:
+                    with _stats_lock:
+                        lazy_import_stats[name] = round(elapsed, 4)
+                    logger.info(f"Leniwy import modułu {name}: {elapsed * 1000:.0f} ms")
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "załadowany" if self.__dict__["_lazy_module"] is not None else "niezaładowany"
+        return f"<leniwy moduł '{self.__name__}' ({state})>"
+
+
+def lazy_module(name, on_load=None):
+    """
+    Zwraca moduł ładowany przy pierwszym użyciu.
+
+    Jeśli moduł został już zaimportowany przez inny kod, zwracany jest
+    bezpośrednio (bez pośrednika).
+
+    Args:
+        name (str): Pełna nazwa modułu
+        on_load (callable, optional): Funkcja wywoływana po imporcie z modułem jako argumentem
+
+    Returns:
+        module lub LazyModule: Moduł lub jego leniwy zastępnik
+    """
+    module = sys.modules.get(name)
+    if module is not None and on_load is None:
+        return module
+    return LazyModule(name, on_load)
+
+
+def is_loaded(module):
+    """Sprawdza, czy moduł (lub leniwy zastępnik) został już zaimportowany."""
+    if isinstance(module, LazyModule):
+        return module.__dict__["_lazy_module"] is not None
+    return True
+
+
+def get_lazy_import_stats():
+    """
+    Zwraca czasy leniwych importów.
+
+    Returns:
+        dict: {nazwa_modułu: czas_importu_w_sekundach} dla modułów załadowanych przy pierwszym użyciu
+    """
+    with _stats_lock:
+        return dict(lazy_import_stats)
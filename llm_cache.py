@@ -0,0 +1,321 @@
+"""
+Współdzielony, trwały cache odpowiedzi modeli językowych.
+
+Zastępuje słowniki w pamięci procesu (kluczowane funkcją hash(), która jest
+losowana per proces), dzięki czemu wszystkie procesy robocze oraz kolejne
+uruchomienia aplikacji korzystają z tych samych, raz opłaconych odpowiedzi.
+
+Wpisy są przechowywane w lokalnym pliku SQLite (tryb WAL), kluczowane skrótem
+SHA-256 z modelu, promptu systemowego, parametrów i treści wiadomości.
+Obsługiwane są czasy życia wpisów (TTL), usuwanie najdawniej używanych wpisów
+po przekroczeniu limitu rozmiaru oraz liczniki trafień i chybień. Liczniki
+są zbierane w pamięci procesu i zapisywane do pliku co _STATS_FLUSH_INTERVAL
+sekund, żeby odczyty nie wymagały transakcji zapisu.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from memory_cache import BoundedCache
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lokalizacja pliku cache'a współdzielonego przez wszystkie procesy
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "llm_cache.sqlite3")
+)
+
+# Domyślny czas życia wpisu (w sekundach) - 7 dni
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+
+# Maksymalny łączny rozmiar wartości w cache'u (w bajtach) - 64 MB
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Limity cache'a pierwszego poziomu w pamięci procesu (osobno dla każdej przestrzeni nazw)
+LLM_MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_MEMORY_CACHE_MAX_ENTRIES", 512))
+LLM_MEMORY_CACHE_MAX_BYTES = int(os.environ.get("LLM_MEMORY_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+# Czas odświeżania znacznika ostatniego dostępu - ogranicza liczbę zapisów przy odczytach
+_TOUCH_INTERVAL = 60
+
+# Co ile zapisów (średnio) sprawdzamy limit rozmiaru
+_EVICTION_CHECK_RATE = 0.05
+
+# Co ile sekund liczniki trafień i chybień z pamięci procesu są zapisywane do pliku
+_STATS_FLUSH_INTERVAL = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def make_cache_key(model, system=None, params=None, messages=None):
+    """
+    Tworzy stabilny klucz cache'a dla zapytania do modelu językowego.
+
+    W przeciwieństwie do hash() wynik jest taki sam we wszystkich procesach
+    i po restarcie aplikacji.
+
+    Args:
+        model (str): Nazwa modelu
+        system (str, optional): Prompt systemowy
+        params (dict, optional): Parametry zapytania (np. max_tokens, temperature)
+        messages: Treść wiadomości (lista wiadomości lub tekst)
+
+    Returns:
+        str: Skrót SHA-256 w postaci szesnastkowej
+    """
+    payload = json.dumps({
+        "model": model,
+        "system": system,
+        "params": params or {},
+        "messages": messages,
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Cache odpowiedzi modeli w pliku SQLite, współdzielony między procesami.
+
+    Każdy moduł korzysta z własnej przestrzeni nazw (namespace), a wszystkie
+    przestrzenie dzielą wspólny limit rozmiaru pliku. Przed plikiem działa
+    ograniczony cache w pamięci procesu (BoundedCache), przechowujący wartości
+    w postaci JSON - dzięki temu rozmiar wpisów jest liczony dokładnie, a każdy
+    odczyt zwraca nową kopię wartości.
+    """
+
+    def __init__(self, namespace, path=None, ttl=None, max_bytes=None):
+        self.namespace = namespace
+        self.path = path or LLM_CACHE_PATH
+        self.ttl = LLM_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.memory = BoundedCache(
+            max_entries=LLM_MEMORY_CACHE_MAX_ENTRIES,
+            max_bytes=LLM_MEMORY_CACHE_MAX_BYTES,
+            ttl=self.ttl,
+            sizeof=sys.getsizeof
+        )
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._local_stats = {"hits": 0, "misses": 0, "sets": 0, "errors": 0}
+        # Liczniki współdzielone jeszcze niezapisane do pliku
+        self._pending_stats = {"hits": 0, "misses": 0}
+        self._pending_pid = os.getpid()
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush_stats)
+
+    def _connection(self):
+        # Połączenie SQLite nie może być współdzielone między wątkami ani po fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, counter, shared=True):
+        with self._stats_lock:
+            self._local_stats[counter] += 1
+            if not (shared and counter in self._pending_stats):
+                return
+            if self._pending_pid != os.getpid():
+                # Liczniki odziedziczone po fork() zapisze proces macierzysty
+                self._pending_stats = {name: 0 for name in self._pending_stats}
+                self._pending_pid = os.getpid()
+            self._pending_stats[counter] += 1
+            due = time.monotonic() - self._last_flush >= _STATS_FLUSH_INTERVAL
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Zapisuje zebrane w pamięci liczniki trafień i chybień do pliku (jednym zapytaniem)."""
+        with self._stats_lock:
+            if self._pending_pid != os.getpid():
+                return
+            pending = self._pending_stats
+            self._pending_stats = {name: 0 for name in pending}
+            self._last_flush = time.monotonic()
+        if not any(pending.values()):
+            return
+        try:
+            self._connection().execute(
+                "INSERT INTO cache_stats (namespace, hits, misses) VALUES (?, ?, ?) "
+                "ON CONFLICT(namespace) DO UPDATE SET hits = hits + excluded.hits, "
+                "misses = misses + excluded.misses",
+                (self.namespace, pending["hits"], pending["misses"])
+            )
+        except sqlite3.Error:
+            # Nie gubimy liczników - spróbujemy przy następnym zapisie
+            with self._stats_lock:
+                for name, count in pending.items():
+                    self._pending_stats[name] += count
+
+    def get(self, key, default=None):
+        """
+        Zwraca wartość zapisaną pod kluczem lub `default`, jeśli jej brak lub wygasła.
+
+        Zwracana wartość jest nową kopią - można ją bezpiecznie modyfikować.
+        """
+        data = self.memory.get(key)
+        if data is not None:
+            # Trafienie w pamięci procesu też jest trafieniem cache'a (podział na poziomy: stats()["memory"])
+            self._count("hits")
+            return json.loads(data)
+
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self._count("misses")
+                return default
+
+            if now - row[2] > _TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key)
+                )
+            self._count("hits")
+            value = json.loads(row[0])
+            self.memory.set(key, row[0], ttl=row[1] - now if row[1] is not None else None)
+            return value
+        except (sqlite3.Error, ValueError) as e:
+            self._count("errors", shared=False)
+            logger.warning(f"Błąd odczytu cache'a LLM ({self.namespace}): {str(e)}")
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Zapisuje wartość (serializowalną do JSON) pod kluczem."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            data = json.dumps(value, ensure_ascii=False, default=str)
+            self.memory.set(key, data, ttl=ttl)
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, size, created_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, data, len(data.encode("utf-8")), now, now + ttl if ttl else None, now)
+            )
+            self._count("sets", shared=False)
+            if random.random() < _EVICTION_CHECK_RATE:
+                self.evict()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._count("errors", shared=False)
+            logger.warning(f"Błąd zapisu cache'a LLM ({self.namespace}): {str(e)}")
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def evict(self):
+        """
+        Usuwa wygasłe wpisy, a następnie najdawniej używane, dopóki łączny rozmiar
+        przekracza limit.
+
+        Returns:
+            int: Liczba usuniętych wpisów
+        """
+        conn = self._connection()
+        removed = conn.execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        while total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT namespace, key, size FROM cache_entries ORDER BY accessed_at ASC LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for namespace, key, size in rows:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+                removed += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+        if removed:
+            conn.execute(
+                "INSERT INTO cache_stats (namespace, evictions) VALUES (?, ?) "
+                "ON CONFLICT(namespace) DO UPDATE SET evictions = evictions + excluded.evictions",
+                (self.namespace, removed)
+            )
+        return removed
+
+    def clear(self):
+        """Usuwa wszystkie wpisy z przestrzeni nazw."""
+        self.memory.clear()
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self):
+        """
+        Zwraca statystyki cache'a.
+
+        Returns:
+            dict: Liczba wpisów i bajtów w przestrzeni nazw, liczniki współdzielone
+                  przez wszystkie procesy oraz liczniki bieżącego procesu
+        """
+        self.flush_stats()
+        with self._stats_lock:
+            local_stats = dict(self._local_stats)
+        try:
+            conn = self._connection()
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+            shared = conn.execute(
+                "SELECT hits, misses, evictions FROM cache_stats WHERE namespace = ?", (self.namespace,)
+            ).fetchone() or (0, 0, 0)
+        except sqlite3.Error as e:
+            logger.warning(f"Błąd odczytu statystyk cache'a LLM ({self.namespace}): {str(e)}")
+            entries, size, shared = None, None, (None, None, None)
+
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": shared[0],
+            "misses": shared[1],
+            "evictions": shared[2],
+            "process": local_stats,
+            "memory": self.memory.stats(),
+        }
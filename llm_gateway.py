@@ -0,0 +1,477 @@
+"""
+Wspólna brama do dostawców modeli językowych (Anthropic, OpenAI).
+
+Wszystkie moduły aplikacji (claude_api, psychology, quotes) wysyłają zapytania
+przez jeden obiekt `gateway`, który zapewnia:
+
+- jednego klienta na dostawcę ze współdzieloną pulą połączeń keep-alive (httpx),
+- globalny i per-dostawca limit współbieżności (semafory),
+- limiter typu token bucket, respektujący nagłówek retry-after odpowiedzi 429,
+- wyłącznik obwodu (circuit breaker), który przy awarii dostawcy od razu zgłasza
+  ProviderUnavailable, aby wywołujący mógł natychmiast użyć mechanizmu zastępczego
+  (therapy.generate_question / DEFAULT_ANALYSIS) zamiast blokować wątek.
+
+Adresy API można nadpisać zmiennymi ANTHROPIC_BASE_URL i OPENAI_BASE_URL
+(np. na lokalny serwer tools/fake_llm_server.py).
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Globalny limit równoczesnych zapytań do wszystkich dostawców
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 16))
+
+# Maksymalny czas oczekiwania na wolne miejsce w kolejce (semafor / limiter)
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", 2.0))
+
+# Limit czasu pojedynczego zapytania HTTP
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", 30.0))
+
+# Ponawiamy zapytanie tylko wtedy, gdy retry-after nie przekracza tej wartości
+LLM_MAX_RETRY_WAIT = float(os.environ.get("LLM_MAX_RETRY_WAIT", 2.0))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 1))
+
+# Parametry wyłącznika obwodu
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET = float(os.environ.get("LLM_BREAKER_RESET", 30.0))
+
+
+class ProviderUnavailable(Exception):
+    """Dostawca jest niedostępny (brak konfiguracji, otwarty obwód, przeciążenie lub błąd przejściowy)."""
+
+    def __init__(self, provider, reason):
+        super().__init__(f"{provider}: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class TokenBucket:
+    """Limiter liczby zapytań na sekundę z obsługą blokady po odpowiedzi 429."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """
+        Pobiera jeden token, czekając co najwyżej `timeout` sekund.
+
+        Returns:
+            bool: True, jeśli token został pobrany
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate if self.rate else timeout)
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def block_for(self, seconds):
+        """Wstrzymuje wydawanie tokenów (np. zgodnie z nagłówkiem retry-after)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class CircuitBreaker:
+    """Wyłącznik obwodu: po serii błędów odrzuca zapytania do czasu upływu okresu próbnego."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    # Wartość allow() dla zapytania próbnego w stanie półotwartym
+    PROBE = "probe"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Sprawdza, czy zapytanie może zostać wysłane (w stanie półotwartym - tylko jedno próbne).
+
+        Returns:
+            True, PROBE (zapytanie próbne - wywołujący musi zarejestrować wynik
+            albo wywołać release_probe()) lub False
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return self.PROBE
+            return False
+
+    def release_probe(self):
+        """Zwalnia zapytanie próbne, którego wynik nie rozstrzyga o stanie dostawcy."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def is_open(self):
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Wyłącznik obwodu otwarty - dostawca chwilowo wyłączony")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error):
+    """Odczytuje opóźnienie z nagłówków retry-after-ms / retry-after (sekundy lub data HTTP)."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(error):
+    """Błędy przejściowe: przekroczenie limitu, błędy serwera, przekroczenie czasu i problemy z połączeniem."""
+    status = _status_code(error)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class ProviderGateway:
+    """Dostęp do jednego dostawcy: klient, semafor, limiter, wyłącznik obwodu i statystyki."""
+
+    def __init__(self, name, client_factory, max_concurrency, rate, global_semaphore):
+        self.name = name
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._configured = None
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._global_semaphore = global_semaphore
+        self.bucket = TokenBucket(rate)
+        self.breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+        self._latencies = deque(maxlen=500)
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "successes": 0, "failures": 0, "rate_limited": 0,
+                       "rejected": 0, "retries": 0}
+
+    @property
+    def client(self):
+        """Klient SDK tworzony leniwie przy pierwszym użyciu (None, jeśli brak konfiguracji)."""
+        if self._configured is None:
+            with self._client_lock:
+                if self._configured is None:
+                    try:
+                        self._client = self._client_factory()
+                    except Exception as e:
+                        logger.warning(f"Nie można zainicjalizować klienta {self.name}: {str(e)}")
+                        self._client = None
+                    self._configured = self._client is not None
+        return self._client
+
+    def is_configured(self):
+        return self.client is not None
+
+    def is_available(self):
+        """Dostawca jest skonfigurowany, a jego obwód nie jest otwarty."""
+        return self.is_configured() and not self.breaker.is_open()
+
+    def _count(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    @contextmanager
+    def slot(self):
+        """
+        Rezerwuje miejsce na jedno zapytanie: limiter, semafor globalny i dostawcy, obwód.
+
+        Zapytanie próbne (stan półotwarty) jest przydzielane dopiero po zajęciu
+        limitów, a jeśli jego wynik nie zostanie zarejestrowany (błąd nieprzejściowy,
+        przerwany strumień), jest zwalniane przy wyjściu z bloku.
+        """
+        if self.client is None:
+            raise ProviderUnavailable(self.name, "brak konfiguracji")
+        # Otwarty obwód odrzucamy od razu, bez czekania na limiter i semafory
+        if self.breaker.is_open():
+            self._count("rejected")
+            raise ProviderUnavailable(self.name, "obwód otwarty")
+        if not self.bucket.acquire(LLM_QUEUE_TIMEOUT):
+            self._count("rejected")
+            raise ProviderUnavailable(self.name, "przekroczony limit zapytań")
+        if not self._global_semaphore.acquire(timeout=LLM_QUEUE_TIMEOUT):
+            self._count("rejected")
+            raise ProviderUnavailable(self.name, "przekroczony globalny limit współbieżności")
+        try:
+            if not self._semaphore.acquire(timeout=LLM_QUEUE_TIMEOUT):
+                self._count("rejected")
+                raise ProviderUnavailable(self.name, "przekroczony limit współbieżności")
+            try:
+                allowed = self.breaker.allow()
+                if not allowed:
+                    self._count("rejected")
+                    raise ProviderUnavailable(self.name, "obwód otwarty")
+                try:
+                    self._count("requests")
+                    yield self.client
+                finally:
+                    if allowed == CircuitBreaker.PROBE:
+                        self.breaker.release_probe()
+            finally:
+                self._semaphore.release()
+        finally:
+            self._global_semaphore.release()
+
+    def record_success(self, duration):
+        self.breaker.record_success()
+        with self._stats_lock:
+            self._stats["successes"] += 1
+            self._latencies.append(duration)
+
+    def record_error(self, error):
+        """
+        Rejestruje błąd zapytania.
+
+        Returns:
+            float lub None: Zalecane opóźnienie przed ponowieniem (dla odpowiedzi 429)
+        """
+        if not _is_transient(error):
+            # Błąd po naszej stronie (np. niepoprawne zapytanie) - nie świadczy o awarii dostawcy
+            return None
+
+        self._count("failures")
+        self.breaker.record_failure()
+        if _status_code(error) == 429:
+            self._count("rate_limited")
+            retry_after = _retry_after(error)
+            retry_after = 1.0 if retry_after is None else retry_after
+            self.bucket.block_for(retry_after)
+            return retry_after
+        return None
+
+    def call(self, func):
+        """
+        Wykonuje func(client) w ramach limitów bramy.
+
+        Przy odpowiedzi 429 z krótkim retry-after zapytanie jest ponawiane
+        (limiter wstrzymuje je na wskazany czas), w pozostałych przypadkach błąd
+        przejściowy jest zgłaszany od razu jako ProviderUnavailable.
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            with self.slot() as client:
+                start = time.monotonic()
+                try:
+                    result = func(client)
+                except Exception as e:
+                    retry_after = self.record_error(e)
+                    if retry_after is not None and retry_after <= LLM_MAX_RETRY_WAIT and attempt < LLM_MAX_RETRIES:
+                        self._count("retries")
+                        continue
+                    if _is_transient(e):
+                        raise ProviderUnavailable(self.name, str(e)) from e
+                    raise
+                self.record_success(time.monotonic() - start)
+                return result
+        raise ProviderUnavailable(self.name, "wyczerpano liczbę prób")
+
+    def latency_percentile(self, percentile):
+        """
+        Zwraca percentyl czasu odpowiedzi z ostatnich udanych zapytań.
+
+        Args:
+            percentile (float): Percentyl z zakresu 0-1 (np. 0.9)
+
+        Returns:
+            float lub None: Czas w sekundach lub None przy braku danych
+        """
+        with self._stats_lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile * (len(samples) - 1))))
+        return samples[index]
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["latency_samples"] = len(self._latencies)
+        stats["configured"] = self._configured
+        stats["breaker"] = self.breaker.state
+        stats["latency_p50"] = self.latency_percentile(0.5)
+        stats["latency_p90"] = self.latency_percentile(0.9)
+        return stats
+
+
+def _http_client():
+    """Wspólna pula połączeń keep-alive dla klientów SDK."""
+    import httpx
+
+    return httpx.Client(
+        timeout=LLM_REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONCURRENCY,
+            max_keepalive_connections=LLM_MAX_CONCURRENCY,
+            keepalive_expiry=60
+        )
+    )
+
+
+def _anthropic_client():
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        logger.warning("Brak klucza API Anthropic (ANTHROPIC_API_KEY)")
+        return None
+    from anthropic import Anthropic
+
+    client = Anthropic(
+        api_key=api_key,
+        base_url=os.environ.get("ANTHROPIC_BASE_URL") or None,
+        http_client=_http_client(),
+        max_retries=0  # ponawianiem zarządza brama
+    )
+    logger.info("Zainicjalizowano klienta Anthropic Claude API")
+    return client
+
+
+def _openai_client():
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        logger.warning("Brak klucza API OpenAI (OPENAI_API_KEY)")
+        return None
+    from openai import OpenAI
+
+    client = OpenAI(
+        api_key=api_key,
+        base_url=os.environ.get("OPENAI_BASE_URL") or None,
+        http_client=_http_client(),
+        max_retries=0  # ponawianiem zarządza brama
+    )
+    logger.info("Zainicjalizowano klienta OpenAI API")
+    return client
+
+
+class LLMGateway:
+    """Punkt dostępu do wszystkich dostawców modeli językowych."""
+
+    def __init__(self):
+        global_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self.providers = {
+            "anthropic": ProviderGateway(
+                "anthropic", _anthropic_client,
+                max_concurrency=int(os.environ.get("ANTHROPIC_MAX_CONCURRENCY", 8)),
+                rate=float(os.environ.get("ANTHROPIC_RATE_LIMIT", 5)),
+                global_semaphore=global_semaphore
+            ),
+            "openai": ProviderGateway(
+                "openai", _openai_client,
+                max_concurrency=int(os.environ.get("OPENAI_MAX_CONCURRENCY", 8)),
+                rate=float(os.environ.get("OPENAI_RATE_LIMIT", 5)),
+                global_semaphore=global_semaphore
+            ),
+        }
+
+    def is_available(self, provider):
+        return self.providers[provider].is_available()
+
+    def anthropic_messages(self, **kwargs):
+        """Odpowiednik client.messages.create() dla Anthropic."""
+        return self.providers["anthropic"].call(lambda client: client.messages.create(**kwargs))
+
+    def anthropic_stream_text(self, **kwargs):
+        """
+        Odpowiednik client.messages.stream() dla Anthropic - zwraca kolejne fragmenty tekstu.
+
+        Miejsce w limitach bramy jest zajęte do zamknięcia generatora.
+        """
+        provider = self.providers["anthropic"]
+        with provider.slot() as client:
+            start = time.monotonic()
+            try:
+                with client.messages.stream(**kwargs) as stream:
+                    for text in stream.text_stream:
+                        yield text
+            except GeneratorExit:
+                # Odbiorca zamknął strumień wcześniej - dostawca odpowiadał poprawnie (bez próbki czasu)
+                provider.breaker.record_success()
+                raise
+            except Exception as e:
+                provider.record_error(e)
+                raise
+            provider.record_success(time.monotonic() - start)
+
+    def anthropic_batch_create(self, requests):
+        """Tworzy paczkę zapytań (Message Batches API); requests to lista {custom_id, params}."""
+        return self.providers["anthropic"].call(lambda client: client.messages.batches.create(requests=requests))
+
+    def anthropic_batch_retrieve(self, batch_id):
+        """Zwraca stan paczki zapytań."""
+        return self.providers["anthropic"].call(lambda client: client.messages.batches.retrieve(batch_id))
+
+    def anthropic_batch_results(self, batch_id):
+        """Pobiera wszystkie wyniki zakończonej paczki zapytań."""
+        return self.providers["anthropic"].call(lambda client: list(client.messages.batches.results(batch_id)))
+
+    def openai_chat(self, **kwargs):
+        """Odpowiednik client.chat.completions.create() dla OpenAI."""
+        return self.providers["openai"].call(lambda client: client.chat.completions.create(**kwargs))
+
+    def stats(self):
+        return {name: provider.stats() for name, provider in self.providers.items()}
+
+
+# Wspólna instancja bramy dla całego procesu
+gateway = LLMGateway()
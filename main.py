@@ -1,4 +1,14 @@
-from app import app  # noqa: F401
+import sys
+
+if __name__ == "__main__" and "--profile-startup" in sys.argv[1:]:
+    # Raport czasu startu i pamięci (-X importtime) zamiast uruchamiania serwera
+    from startup_profile import main as profile_startup
+    sys.exit(profile_startup([arg for arg in sys.argv[1:] if arg != "--profile-startup"]))
+
+# Przy ponownym wykonaniu skryptu przez multiprocessing (__mp_main__, procesy puli renderującej)
+# aplikacja nie jest potrzebna - import uruchomiłby db.create_all() i wątki robocze
+if __name__ != "__mp_main__":
+    from app import app  # noqa: F401, E402
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,163 @@
+"""
+Ograniczony cache w pamięci procesu z rozliczaniem zajętej pamięci.
+
+BoundedCache ogranicza zarówno liczbę wpisów, jak i ich łączny rozmiar w bajtach,
+usuwa wpisy najdawniej używane (LRU) oraz wygasłe (TTL). Odczyty nie zakładają
+blokady - pojedyncze operacje na słowniku są atomowe w CPython - a zapisy
+i usuwanie wpisów są serializowane blokadą.
+"""
+
+import sys
+import time
+import itertools
+import threading
+
+# Indeksy pól wpisu (lista zamiast obiektu - mniejszy narzut pamięci)
+_VALUE, _SIZE, _EXPIRES, _TICK = range(4)
+
+
+def estimate_size(value):
+    """
+    Szacuje rozmiar wartości w bajtach (łącznie z zawartością kontenerów).
+
+    Args:
+        value: Wartość do oszacowania
+
+    Returns:
+        int: Przybliżony rozmiar w bajtach
+    """
+    seen = set()
+
+    def _size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            size += sum(_size(k) + _size(v) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            size += sum(_size(item) for item in obj)
+        return size
+
+    return _size(value)
+
+
+class BoundedCache:
+    """
+    Bezpieczny wątkowo cache LRU/TTL z limitem liczby wpisów i rozmiaru.
+
+    Liczniki statystyk są aktualizowane bez blokady i mogą być przybliżone
+    przy bardzo dużej współbieżności.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024, ttl=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof or estimate_size
+        self._data = {}
+        self._bytes = 0
+        self._clock = itertools.count()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key, default=None):
+        """Zwraca wartość zapisaną pod kluczem lub `default` (bez zakładania blokady)."""
+        entry = self._data.get(key)
+        if entry is None:
+            self._misses += 1
+            return default
+        if entry[_EXPIRES] is not None and entry[_EXPIRES] <= time.monotonic():
+            self._misses += 1
+            return default
+        # Znacznik ostatniego użycia dla LRU
+        entry[_TICK] = next(self._clock)
+        self._hits += 1
+        return entry[_VALUE]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._data)
+
+    def set(self, key, value, ttl=None):
+        """
+        Zapisuje wartość pod kluczem, usuwając najdawniej używane wpisy po przekroczeniu limitów.
+
+        Wartości większe niż cały limit rozmiaru nie są zapisywane.
+        """
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        entry = [value, size, expires_at, next(self._clock)]
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[_SIZE]
+            self._data[key] = entry
+            self._bytes += size
+            if len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict_locked()
+
+    def pop(self, key, default=None):
+        """Usuwa wpis i zwraca jego wartość."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[_SIZE]
+            return entry[_VALUE]
+
+    def clear(self):
+        """Usuwa wszystkie wpisy."""
+        with self._lock:
+            self._data = {}
+            self._bytes = 0
+
+    def _evict_locked(self):
+        # Najpierw usuń wygasłe wpisy
+        now = time.monotonic()
+        for key, entry in list(self._data.items()):
+            if entry[_EXPIRES] is not None and entry[_EXPIRES] <= now:
+                del self._data[key]
+                self._bytes -= entry[_SIZE]
+                self._expirations += 1
+
+        if len(self._data) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+
+        # Usuwamy najdawniej używane wpisy do 90% limitów, aby rozłożyć koszt sortowania
+        target_entries = int(self.max_entries * 0.9)
+        target_bytes = int(self.max_bytes * 0.9)
+        for key, entry in sorted(self._data.items(), key=lambda item: item[1][_TICK]):
+            if len(self._data) <= target_entries and self._bytes <= target_bytes:
+                break
+            del self._data[key]
+            self._bytes -= entry[_SIZE]
+            self._evictions += 1
+
+    def stats(self):
+        """
+        Zwraca statystyki cache'a.
+
+        Returns:
+            dict: Liczba wpisów, zajęte bajty, limity oraz liczniki trafień, chybień i usunięć
+        """
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
@@ -2,8 +2,8 @@
 from datetime import datetime, time
 from flask_login import UserMixin
 import json
-import pytz
 from database import db
+from reminder_schedule import compute_next_reminder_at, utc_now
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -19,6 +19,7 @@ class User(UserMixin, db.Model):
     reminder_timezone = db.Column(db.String(50), default='Europe/Warsaw')  # strefa czasowa użytkownika
     reminder_method = db.Column(db.String(10), default='email')  # 'email' lub 'sms'
     last_reminder_sent = db.Column(db.DateTime, nullable=True)  # kiedy ostatnio wysłano przypomnienie
+    next_reminder_at = db.Column(db.DateTime, nullable=True, index=True)  # termin następnego przypomnienia (UTC), NULL gdy wyłączone
     
     # Relacje
     conversations = db.relationship('Conversation', backref='user', lazy=True)
@@ -28,24 +29,20 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
     
+    def schedule_next_reminder(self, now=None):
+        """Przelicza next_reminder_at - po zmianie ustawień przypomnień i po każdej wysyłce."""
+        self.next_reminder_at = compute_next_reminder_at(
+            self.reminder_enabled, self.reminder_time, self.reminder_timezone,
+            self.last_reminder_sent, now
+        )
+        return self.next_reminder_at
+
     def is_reminder_due(self):
-        if not self.reminder_enabled:
-            return False
-            
-        if not self.last_reminder_sent:
-            return True
-            
-        timezone = pytz.timezone(self.reminder_timezone)
-        now = datetime.now(timezone)
-        last_reminder = self.last_reminder_sent.astimezone(timezone)
-        
-        if (now.date() == last_reminder.date()):
-            return False
-            
-        reminder_datetime = datetime.combine(now.date(), self.reminder_time)
-        reminder_datetime = timezone.localize(reminder_datetime)
-        
-        return now >= reminder_datetime
+        next_reminder_at = compute_next_reminder_at(
+            self.reminder_enabled, self.reminder_time, self.reminder_timezone,
+            self.last_reminder_sent
+        )
+        return next_reminder_at is not None and next_reminder_at <= utc_now()
 
 class Conversation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -53,6 +50,8 @@ class Conversation(db.Model):
     question = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.now)
+    # Czas ostatniego zapisu odpowiedzi - odpowiedź można nadpisać (wersja chmury słów)
+    response_updated_at = db.Column(db.DateTime, nullable=True)
 
     def __repr__(self):
         return f'<Conversation {self.id}>'
@@ -83,3 +82,180 @@ class ReminderLog(db.Model):
     
     def __repr__(self):
         return f'<ReminderLog {self.id} User {self.user_id} Method {self.method} Status {self.status}>'
+
+class PendingQuestion(db.Model):
+    """Pytanie wygenerowane w tle, czekające na kolejną wizytę użytkownika."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True, index=True)
+    question = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f'<PendingQuestion {self.id} User {self.user_id}>'
+
+class AnalysisJob(db.Model):
+    """Zadanie wygenerowania analizy psychologicznej, wykonywane przez proces roboczy."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # 'queued', 'running', 'done', 'failed'
+    analysis_id = db.Column(db.Integer, db.ForeignKey('psychological_analysis.id'), nullable=True)
+    error_message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'analysis_id': self.analysis_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<AnalysisJob {self.id} User {self.user_id} Status {self.status}>'
+
+class AnalysisState(db.Model):
+    """Stan przyrostowej analizy użytkownika: podsumowanie kroczące i ostatnia analiza."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True, index=True)
+    rolling_summary = db.Column(db.Text, nullable=False, default='')
+    analysis_data = db.Column(db.Text, nullable=True)
+    watermark_id = db.Column(db.Integer, nullable=False, default=0)  # ID ostatniej uwzględnionej odpowiedzi (Conversation)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def get_analysis(self):
+        return json.loads(self.analysis_data) if self.analysis_data else None
+
+    def set_analysis(self, analysis_dict):
+        self.analysis_data = json.dumps(analysis_dict)
+
+    def __repr__(self):
+        return f'<AnalysisState User {self.user_id} Watermark {self.watermark_id}>'
+
+class QuotePool(db.Model):
+    """Cytat terapeutyczny wygenerowany w tle i przechowywany w puli."""
+    id = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.String(500), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f'<QuotePool {self.id}>'
+
+class QuoteRotation(db.Model):
+    """Pozycja użytkownika w puli cytatów (ID ostatnio wyświetlonego cytatu)."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True, index=True)
+    last_quote_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<QuoteRotation User {self.user_id} Quote {self.last_quote_id}>'
+
+class UserTermFrequency(db.Model):
+    """Liczba wystąpień słowa w odpowiedziach użytkownika (aktualizowana przyrostowo)."""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'term', name='uq_user_term_frequency_user_term'),
+        db.Index('ix_user_term_frequency_user_count', 'user_id', 'count'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    term = db.Column(db.String(64), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UserTermFrequency User {self.user_id} {self.term}={self.count}>'
+
+class UserTermIndex(db.Model):
+    """Znacznik zbudowania tabeli częstotliwości słów użytkownika (UserTermFrequency)."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True, index=True)
+    built_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f'<UserTermIndex User {self.user_id}>'
+
+class TherapyState(db.Model):
+    """
+    Postęp terapii użytkownika: omówione tematy (maska bitowa), bieżący temat
+    i zadane pytania (zbiór ID pytań). Ładowany razem z użytkownikiem (JOIN).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True, index=True)
+    covered_themes_mask = db.Column(db.BigInteger, nullable=False, default=0)  # bit = numer tematu (therapy.THEME_BITS)
+    current_theme = db.Column(db.String(50), nullable=True)
+    current_theme_questions = db.Column(db.Integer, nullable=False, default=0)  # pytania zadane w bieżącym temacie
+    asked_question_ids_data = db.Column(db.Text, nullable=False, default='[]')  # JSON: lista ID pytań (therapy.question_id)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    user = db.relationship('User', backref=db.backref('therapy_state', uselist=False, lazy='joined'))
+
+    def is_theme_covered(self, theme_bit):
+        return bool((self.covered_themes_mask or 0) & theme_bit)
+
+    def reset_covered_themes(self):
+        self.covered_themes_mask = 0
+
+    def start_theme(self, theme, theme_bit):
+        self.current_theme = theme
+        self.current_theme_questions = 0
+        self.covered_themes_mask = (self.covered_themes_mask or 0) | theme_bit
+
+    def get_asked_question_ids(self):
+        # Zbiór budowany raz na obiekt - sprawdzenie przynależności w O(1)
+        asked = self.__dict__.get('_asked_question_ids')
+        if asked is None:
+            asked = set(json.loads(self.asked_question_ids_data or '[]'))
+            self.__dict__['_asked_question_ids'] = asked
+        return asked
+
+    def has_asked(self, question_id):
+        return question_id in self.get_asked_question_ids()
+
+    def record_question(self, question_id):
+        asked = self.get_asked_question_ids()
+        if question_id not in asked:
+            asked.add(question_id)
+            self.asked_question_ids_data = json.dumps(sorted(asked))
+        self.current_theme_questions = (self.current_theme_questions or 0) + 1
+
+    def forget_questions(self, question_ids):
+        # Pytania mogą zostać zadane ponownie (np. po wyczerpaniu wszystkich pytań)
+        asked = self.get_asked_question_ids()
+        asked.difference_update(question_ids)
+        self.asked_question_ids_data = json.dumps(sorted(asked))
+
+    def __repr__(self):
+        return f'<TherapyState User {self.user_id} Theme {self.current_theme}>'
+
+class ReminderOutbox(db.Model):
+    """
+    Przypomnienie do wysłania (transakcyjna skrzynka nadawcza).
+
+    Harmonogram wstawia wiersze jedną operacją, a procesy wysyłające przejmują je
+    przez SELECT ... FOR UPDATE SKIP LOCKED. Para (user_id, scheduled_for) jest
+    unikalna, więc równolegle działające harmonogramy nie zdublują przypomnienia.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    scheduled_for = db.Column(db.DateTime, nullable=False)  # termin przypomnienia (User.next_reminder_at, UTC)
+    method = db.Column(db.String(10), nullable=False)  # 'email' lub 'sms'
+    recipient = db.Column(db.String(120), nullable=True)  # adres e-mail lub numer telefonu
+    username = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'processing', 'sent', 'dead'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False)  # najwcześniejsza (kolejna) próba wysyłki (UTC)
+    claimed_at = db.Column(db.DateTime, nullable=True)  # przejęcie przez proces wysyłający (UTC)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'scheduled_for', name='uq_reminder_outbox_user_slot'),
+        db.Index('ix_reminder_outbox_status_available', 'status', 'available_at'),
+    )
+
+    def __repr__(self):
+        return f'<ReminderOutbox {self.id} User {self.user_id} Method {self.method} Status {self.status}>'
@@ -1,55 +1,21 @@
 import os
 import json
-import time
 import random
 import logging
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
+from llm_cache import LLMCache, make_cache_key
+from llm_gateway import gateway
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Sprawdź dostępność OpenAI API i utwórz klienta jeśli jest dostępne
-HAS_OPENAI = False
-openai_client = None
-
-try:
-    from openai import OpenAI
-    import httpx
-    HAS_OPENAI = True
-
-    # Inicjalizacja klienta OpenAI
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if api_key:
-        openai_client = OpenAI(api_key=api_key)
-        logger.info("Zainicjalizowano klienta OpenAI API")
-    else:
-        logger.warning("Brak klucza API OpenAI (OPENAI_API_KEY)")
-except Exception as e:
-    logger.warning(f"OpenAI API jest niedostępne: {str(e)}")
-
-# Sprawdź dostępność Anthropic API i utwórz klienta jeśli jest dostępne
-HAS_ANTHROPIC = False
-anthropic_client = None
-
-try:
-    from anthropic import Anthropic
-    HAS_ANTHROPIC = True
-
-    # Inicjalizacja klienta Anthropic
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if api_key:
-        anthropic_client = Anthropic(api_key=api_key)
-        logger.info("Zainicjalizowano klienta Anthropic API dla analizy psychologicznej")
-    else:
-        logger.warning("Brak klucza API Anthropic (ANTHROPIC_API_KEY)")
-except ImportError as e:
-    logger.warning(f"Nie można zaimportować pakietu Anthropic: {str(e)}")
-except Exception as e:
-    logger.warning(f"Anthropic API jest niedostępne: {str(e)}")
-
-# Cache na wyniki analizy, aby ograniczyć liczbę zapytań do API
-analysis_cache = {}
+# Cache na wyniki analizy, aby ograniczyć liczbę zapytań do API (współdzielony przez wszystkie procesy)
+analysis_cache = LLMCache("psychology_analysis")
 
 # Standardowe wartości zastępcze dla analizy
 DEFAULT_ANALYSIS = {
@@ -64,9 +30,178 @@ DEFAULT_ANALYSIS = {
     "growth_areas": ["Rozwijanie praktyki codziennej refleksji", "Pogłębianie samoświadomości emocjonalnej"]
 }
 
+# Tryb analizy: 'full' (cała historia w jednym prompcie) lub 'incremental'
+# (podsumowanie kroczące + poprzednia analiza + tylko nowe odpowiedzi)
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "full")
+
+# Maksymalna liczba nowych odpowiedzi wysyłanych w jednym kroku analizy przyrostowej
+INCREMENTAL_CHUNK_SIZE = int(os.environ.get("ANALYSIS_INCREMENTAL_CHUNK_SIZE", 20))
+
+# Zapytania zabezpieczające (hedging): jeśli Claude nie odpowie w czasie równym
+# wskazanemu percentylowi jego dotychczasowych czasów odpowiedzi, równolegle
+# pytamy OpenAI i bierzemy pierwszą poprawną odpowiedź
+ANALYSIS_HEDGING = os.environ.get("ANALYSIS_HEDGING", "0") == "1"
+ANALYSIS_HEDGE_PERCENTILE = float(os.environ.get("ANALYSIS_HEDGE_PERCENTILE", 0.9))
+ANALYSIS_HEDGE_DEFAULT_DELAY = float(os.environ.get("ANALYSIS_HEDGE_DEFAULT_DELAY", 8.0))
+ANALYSIS_HEDGE_MIN_DELAY = float(os.environ.get("ANALYSIS_HEDGE_MIN_DELAY", 0.5))
+
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("ANALYSIS_HEDGE_WORKERS", 8)),
+                                     thread_name_prefix="analysis-hedge")
+_hedge_lock = threading.Lock()
+hedge_stats = {
+    "requests": 0,
+    "fired": {"anthropic": 0, "openai": 0},
+    "won": {"anthropic": 0, "openai": 0},
+    "fallbacks": 0,
+}
+
+# Czasy odpowiedzi Claude na zapytania analizy - osobno od bramy, w której przeważają
+# krótkie zapytania o pytania (150-200 tokenów), znacznie szybsze od analizy (1000 tokenów)
+_analysis_latencies = deque(maxlen=500)
+
 # Komunikat wyświetlany przy błędzie limitu API (pusty, zgodnie z prośbą użytkownika)
 API_LIMIT_MESSAGES = []
 
+# Klucze wymagane w poprawnej odpowiedzi modelu
+ANALYSIS_REQUIRED_KEYS = ["personality_traits", "emotional_patterns", "cognitive_patterns",
+                          "insights", "growth_areas"]
+
+ANALYSIS_MODEL = "claude-3-5-sonnet-20241022"  # the newest Anthropic model is "claude-3-5-sonnet-20241022" which was released October 22, 2024.
+OPENAI_ANALYSIS_MODEL = "gpt-4"  # Aktualny model OpenAI
+
+CLAUDE_ANALYSIS_SYSTEM_PROMPT = """Jesteś psychoterapeutą specjalizującym się w analizie wypowiedzi pacjentów. 
+                Twoim zadaniem jest przeprowadzenie dogłębnej analizy psychologicznej na podstawie 
+                odpowiedzi pacjenta na pytania terapeutyczne.
+
+                Analiza powinna zawierać:
+                1. Dominujące cechy osobowości widoczne w wypowiedziach
+                2. Wzorce emocjonalne (jakie emocje przeważają, jak są wyrażane)
+                3. Wzorce poznawcze (schematy myślenia, przekonania)
+                4. Główne spostrzeżenia terapeutyczne
+                5. Potencjalne obszary rozwoju osobistego
+
+                Unikaj nadmiernych uogólnień. Bazuj wyłącznie na dostarczonych danych.
+                Pamiętaj, że analiza ma być wspierająca i konstruktywna, skupiona na wzroście.
+
+                Odpowiedź sformatuj jako JSON z następującymi kluczami:
+                {
+                    "personality_traits": ["cecha1", "cecha2", ...],
+                    "emotional_patterns": ["wzorzec1", "wzorzec2", ...],
+                    "cognitive_patterns": ["wzorzec1", "wzorzec2", ...],
+                    "insights": ["spostrzeżenie1", "spostrzeżenie2", ...],
+                    "growth_areas": ["obszar1", "obszar2", ...]
+                }
+
+                Upewnij się, że Twoja odpowiedź jest poprawnym i dobrze sformatowanym obiektem JSON.
+"""
+
+OPENAI_ANALYSIS_SYSTEM_PROMPT = """
+                Jesteś psychoterapeutą specjalizującym się w analizie wypowiedzi pacjentów. 
+                Twoim zadaniem jest przeprowadzenie dogłębnej analizy psychologicznej na podstawie 
+                odpowiedzi pacjenta na pytania terapeutyczne.
+
+                Analiza powinna zawierać:
+                1. Dominujące cechy osobowości widoczne w wypowiedziach
+                2. Wzorce emocjonalne (jakie emocje przeważają, jak są wyrażane)
+                3. Wzorce poznawcze (schematy myślenia, przekonania)
+                4. Główne spostrzeżenia terapeutyczne
+                5. Potencjalne obszary rozwoju osobistego
+
+                Unikaj nadmiernych uogólnień. Bazuj wyłącznie na dostarczonych danych.
+                Pamiętaj, że analiza ma być wspierająca i konstruktywna, skupiona na wzroście.
+                Odpowiedź sformatuj jako JSON z następującymi kluczami:
+                {
+                    "personality_traits": ["cecha1", "cecha2", ...],
+                    "emotional_patterns": ["wzorzec1", "wzorzec2", ...],
+                    "cognitive_patterns": ["wzorzec1", "wzorzec2", ...],
+                    "insights": ["spostrzeżenie1", "spostrzeżenie2", ...],
+                    "growth_areas": ["obszar1", "obszar2", ...]
+                }
+"""
+
+def format_responses_for_analysis(responses):
+    """
+    Formatuje odpowiedzi użytkownika jako tekst do analizy.
+
+    Args:
+        responses (list): Lista słowników z kluczami 'question', 'response' i 'timestamp'
+
+    Returns:
+        str: Tekst zawierający pytania, odpowiedzi i daty
+    """
+    analysis_text = ""
+    for item in responses:
+        analysis_text += f"Pytanie: {item['question']}\n"
+        analysis_text += f"Odpowiedź: {item['response']}\n"
+        analysis_text += f"Data: {item['timestamp'].strftime('%Y-%m-%d %H:%M')}\n\n"
+    return analysis_text
+
+def build_analysis_prompt(analysis_text):
+    """Buduje prompt użytkownika dla analizy psychologicznej z Claude."""
+    return f"""Dokonaj analizy psychologicznej następujących odpowiedzi na pytania terapeutyczne:
+
+                {analysis_text}
+
+                Proszę o analizę w formacie JSON zgodnie ze wskazówkami z systemu.
+                """
+
+def build_claude_analysis_request(analysis_text):
+    """
+    Buduje parametry zapytania Claude dla pełnej analizy psychologicznej.
+
+    Te same parametry są używane w zapytaniach synchronicznych i w nocnym
+    przetwarzaniu wsadowym (batch_analysis.py).
+
+    Args:
+        analysis_text (str): Odpowiedzi sformatowane przez format_responses_for_analysis()
+
+    Returns:
+        dict: Parametry dla messages.create()
+    """
+    return {
+        "model": ANALYSIS_MODEL,
+        "max_tokens": 1000,
+        "temperature": 0.2,
+        "system": CLAUDE_ANALYSIS_SYSTEM_PROMPT,
+        "messages": [
+            {"role": "user", "content": build_analysis_prompt(analysis_text)}
+        ]
+    }
+
+def build_analysis_cache_key(analysis_text):
+    """Zwraca klucz cache'a analizy dla podanego tekstu odpowiedzi."""
+    return make_cache_key(ANALYSIS_MODEL, CLAUDE_ANALYSIS_SYSTEM_PROMPT,
+                          {"max_tokens": 1000, "temperature": 0.2},
+                          build_analysis_prompt(analysis_text))
+
+def parse_analysis_response(content):
+    """
+    Parsuje odpowiedź modelu do słownika analizy.
+
+    Args:
+        content (str): Tekst odpowiedzi modelu (JSON, opcjonalnie w bloku ```json```)
+
+    Returns:
+        dict lub None: Analiza, jeśli odpowiedź zawiera poprawny JSON ze wszystkimi wymaganymi kluczami
+    """
+    content = content.strip()
+    # Check if the response is wrapped in ```json ``` and extract it
+    if content.startswith("```json") and content.endswith("```"):
+        content = content[7:-3].strip()
+
+    try:
+        analysis = json.loads(content)
+    except json.JSONDecodeError:
+        logger.warning("Model zwrócił niepoprawny JSON.")
+        return None
+
+    # Validate that expected keys exist
+    if not isinstance(analysis, dict) or not all(key in analysis for key in ANALYSIS_REQUIRED_KEYS):
+        logger.warning("Model zwrócił nieprawidłowy format JSON. Brakujące klucze.")
+        return None
+
+    return analysis
+
 def analyze_user_responses(responses):
     """
     Przeprowadza kompleksową analizę psychologiczną odpowiedzi użytkownika, uwzględniając:
@@ -78,7 +213,7 @@ def analyze_user_responses(responses):
     - Obszary rozwoju osobistego
     """
     # Sprawdź czy mamy dostęp do któregokolwiek API
-    if (not HAS_OPENAI or not openai_client) and (not HAS_ANTHROPIC or not anthropic_client):
+    if not gateway.is_available("anthropic") and not gateway.is_available("openai"):
         logger.warning("Ani OpenAI ani Anthropic API nie są dostępne. Używam domyślnych wartości.")
         return DEFAULT_ANALYSIS.copy()
 
@@ -92,60 +227,192 @@ def analyze_user_responses(responses):
             "growth_areas": []
         }
 
-    # Generuj klucz cache'a na podstawie odpowiedzi
-    cache_key = hash(json.dumps([{
-        'q': item['question'], 
-        'r': item['response'], 
-        't': item['timestamp'].isoformat()
-    } for item in responses], sort_keys=True))
+    # Przygotuj dane do analizy
+    analysis_text = format_responses_for_analysis(responses)
+
+    # Generuj klucz cache'a na podstawie treści zapytania
+    cache_key = build_analysis_cache_key(analysis_text)
 
     # Sprawdź czy mamy analizę w cache'u
-    if cache_key in analysis_cache:
+    cached_analysis = analysis_cache.get(cache_key)
+    if cached_analysis is not None:
         logger.info("Używam zbuforowanej analizy psychologicznej.")
-        return analysis_cache[cache_key]
+        return cached_analysis
 
-    # Przygotuj dane do analizy
-    analysis_text = ""
-    for item in responses:
-        analysis_text += f"Pytanie: {item['question']}\n"
-        analysis_text += f"Odpowiedź: {item['response']}\n"
-        analysis_text += f"Data: {item['timestamp'].strftime('%Y-%m-%d %H:%M')}\n\n"
-
-    # Sprawdźmy dokładnie, które API jest dostępne
-    is_anthropic_available = HAS_ANTHROPIC and anthropic_client is not None
-    is_openai_available = HAS_OPENAI and openai_client is not None
+    # Najpierw Claude, a OpenAI jako backup - szeregowo albo z zapytaniem
+    # zabezpieczającym (hedging), gdy Claude odpowiada wolniej niż zwykle
+    if ANALYSIS_HEDGING:
+        provider, analysis = _hedged_analysis(analysis_text)
+    else:
+        provider, analysis = _serial_analysis(analysis_text)
+
+    if analysis is not None:
+        # Dodaj wynik do cache'a
+        analysis_cache.set(cache_key, analysis)
+        logger.info(f"Pomyślnie wykonano analizę ({provider}).")
+        return analysis
+
+    # Oba API zawiodły - zwróć dane zastępcze
+    logger.error("Żaden z silników AI nie zwrócił analizy. Zwracam dane zastępcze.")
+    fallback = DEFAULT_ANALYSIS.copy()
+    # Zamiast zastępować, dodajemy komunikat o błędzie do insights
+    fallback["insights"] = list(fallback.get("insights", [])) + API_LIMIT_MESSAGES
+    return fallback
+
+def _run_analysis_provider(provider, analyze, analysis_text):
+    """Wywołuje analizę u jednego dostawcy; błędy są logowane, a wynikiem jest wtedy None."""
+    try:
+        return analyze(analysis_text)
+    except Exception as e:
+        logger.error(f"Błąd podczas analizy psychologicznej ({provider}): {str(e)}")
+        return None
+
+def _available_analysis_providers():
+    # Ponawianiem zapytań, limitami i wyłącznikiem obwodu zarządza brama LLM -
+    # dostawca z otwartym obwodem jest od razu pomijany
+    return [(provider, analyze) for provider, analyze in
+            (("anthropic", _analyze_with_claude), ("openai", _analyze_with_openai))
+            if gateway.is_available(provider)]
+
+def _serial_analysis(analysis_text):
+    """
+    Pyta dostawców po kolei (Claude, potem OpenAI).
 
-    logger.info(f"Dostępność API - Anthropic: {is_anthropic_available}, OpenAI: {is_openai_available}")
+    Returns:
+        tuple: (nazwa dostawcy, analiza) lub (None, None)
+    """
+    for provider, analyze in _available_analysis_providers():
+        analysis = _run_analysis_provider(provider, analyze, analysis_text)
+        if analysis is not None:
+            return provider, analysis
+    return None, None
 
-    # Jeśli ani Anthropic, ani OpenAI nie są dostępne, zwróć domyślne wartości
-    if not is_anthropic_available and not is_openai_available:
-        logger.warning("Żaden z potrzebnych silników AI nie jest dostępny. Używam wartości domyślnych.")
-        return DEFAULT_ANALYSIS.copy()
+def get_hedge_delay():
+    """
+    Zwraca czas, po którym wysyłane jest zapytanie zabezpieczające do OpenAI.
 
-    # Mechanizm ponownych prób z wykładniczym opóźnieniem
-    max_retries = 3
-    retry_delay = 1  # początkowe opóźnienie w sekundach
+    Jest to percentyl ANALYSIS_HEDGE_PERCENTILE czasów odpowiedzi Claude
+    na zapytania analizy (lub ANALYSIS_HEDGE_DEFAULT_DELAY, dopóki brak pomiarów).
+    """
+    with _hedge_lock:
+        samples = sorted(_analysis_latencies)
+    if not samples:
+        return ANALYSIS_HEDGE_DEFAULT_DELAY
+    latency = samples[min(len(samples) - 1, int(round(ANALYSIS_HEDGE_PERCENTILE * (len(samples) - 1))))]
+    return max(ANALYSIS_HEDGE_MIN_DELAY, latency)
+
+def _count_hedge(counter, provider=None):
+    with _hedge_lock:
+        if provider is None:
+            hedge_stats[counter] += 1
+        else:
+            hedge_stats[counter][provider] += 1
+
+def _hedged_analysis(analysis_text):
+    """
+    Pyta Claude, a jeśli nie odpowie w czasie get_hedge_delay() (albo zwróci błąd),
+    równolegle wysyła zapytanie do OpenAI. Zwracana jest pierwsza odpowiedź
+    zawierająca wszystkie wymagane klucze; drugie zapytanie jest anulowane
+    (jeśli jeszcze się nie rozpoczęło) lub jego wynik jest pomijany.
 
-    for attempt in range(max_retries):
-        # Najpierw spróbuj użyć Claude
-        if HAS_ANTHROPIC and anthropic_client:
-            try:
-                logger.info(f"Próba analizy psychologicznej z Claude {attempt+1}/{max_retries}")
+    Returns:
+        tuple: (nazwa dostawcy, analiza) lub (None, None)
+    """
+    providers = _available_analysis_providers()
+    if len(providers) < 2:
+        return _serial_analysis(analysis_text)
+
+    _count_hedge("requests")
+    (primary, primary_analyze), (secondary, secondary_analyze) = providers
+    futures = {_hedge_executor.submit(_run_analysis_provider, primary, primary_analyze, analysis_text): primary}
+
+    done, _ = wait(futures, timeout=get_hedge_delay())
+    primary_future = next(iter(futures))
+    if not done:
+        # Claude odpowiada wolniej niż zwykle - wysyłamy zapytanie zabezpieczające
+        _count_hedge("fired", secondary)
+        futures[_hedge_executor.submit(_run_analysis_provider, secondary, secondary_analyze, analysis_text)] = secondary
+    elif primary_future.result() is None:
+        # Claude zawiódł szybko - nie czekamy, tylko od razu pytamy OpenAI
+        _count_hedge("fallbacks")
+        analysis = _run_analysis_provider(secondary, secondary_analyze, analysis_text)
+        return (secondary, analysis) if analysis is not None else (None, None)
+
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            analysis = future.result()
+            if analysis is not None:
+                provider = futures[future]
+                for other in pending:
+                    other.cancel()
+                if len(futures) > 1:
+                    _count_hedge("won", provider)
+                return provider, analysis
+
+    return None, None
+
+def get_hedge_stats():
+    """
+    Zwraca liczniki zapytań zabezpieczających analizy.
 
-                # Prompt dla Claude
-                system_prompt = """Jesteś psychoterapeutą specjalizującym się w analizie wypowiedzi pacjentów. 
-                Twoim zadaniem jest przeprowadzenie dogłębnej analizy psychologicznej na podstawie 
-                odpowiedzi pacjenta na pytania terapeutyczne.
+    Returns:
+        dict: Liczba analiz, wysłanych zapytań zabezpieczających i wygranych
+              (per dostawca), szybkich przejść do OpenAI oraz bieżące opóźnienie
+    """
+    with _hedge_lock:
+        stats = {key: dict(value) if isinstance(value, dict) else value for key, value in hedge_stats.items()}
+        stats["latency_samples"] = len(_analysis_latencies)
+    stats["enabled"] = ANALYSIS_HEDGING
+    stats["delay"] = get_hedge_delay()
+    return stats
+
+def _analyze_with_claude(analysis_text):
+    """
+    Wykonuje analizę psychologiczną z Claude.
 
-                Analiza powinna zawierać:
-                1. Dominujące cechy osobowości widoczne w wypowiedziach
-                2. Wzorce emocjonalne (jakie emocje przeważają, jak są wyrażane)
-                3. Wzorce poznawcze (schematy myślenia, przekonania)
-                4. Główne spostrzeżenia terapeutyczne
-                5. Potencjalne obszary rozwoju osobistego
+    Returns:
+        dict lub None: Analiza lub None, gdy odpowiedź nie jest poprawnym JSON-em
+    """
+    start = time.monotonic()
+    message = gateway.anthropic_messages(**build_claude_analysis_request(analysis_text))
+    # Zapisywane także wtedy, gdy wygrało zapytanie zabezpieczające - inaczej percentyl pomijałby wolne odpowiedzi
+    with _hedge_lock:
+        _analysis_latencies.append(time.monotonic() - start)
+    return parse_analysis_response(message.content[0].text)
+
+def _analyze_with_openai(analysis_text):
+    """
+    Wykonuje analizę psychologiczną z OpenAI.
 
-                Unikaj nadmiernych uogólnień. Bazuj wyłącznie na dostarczonych danych.
-                Pamiętaj, że analiza ma być wspierająca i konstruktywna, skupiona na wzroście.
+    Returns:
+        dict lub None: Analiza lub None, gdy odpowiedź nie jest poprawnym JSON-em
+    """
+    response = gateway.openai_chat(
+        model=OPENAI_ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": OPENAI_ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": analysis_text}
+        ],
+        response_format={"type": "json_object"}
+    )
+    return parse_analysis_response(response.choices[0].message.content)
+
+INCREMENTAL_ANALYSIS_SYSTEM_PROMPT = """Jesteś psychoterapeutą specjalizującym się w analizie wypowiedzi pacjentów.
+                Prowadzisz długoterminową, przyrostową analizę psychologiczną pacjenta.
+
+                Otrzymujesz:
+                1. Podsumowanie kroczące - zwięzły opis dotychczasowych odpowiedzi pacjenta
+                2. Poprzednią analizę psychologiczną w formacie JSON
+                3. Nowe odpowiedzi pacjenta, udzielone od czasu poprzedniej analizy
+
+                Zaktualizuj analizę, łącząc dotychczasowe wnioski z nowymi odpowiedziami.
+                Zachowaj wnioski, które nadal są aktualne, i zmień te, którym przeczą nowe dane.
+                Unikaj nadmiernych uogólnień. Pamiętaj, że analiza ma być wspierająca i konstruktywna.
+
+                Zaktualizuj również podsumowanie kroczące tak, aby obejmowało nowe odpowiedzi.
+                Podsumowanie nie może przekraczać 250 słów.
 
                 Odpowiedź sformatuj jako JSON z następującymi kluczami:
                 {
@@ -153,151 +420,245 @@ def analyze_user_responses(responses):
                     "emotional_patterns": ["wzorzec1", "wzorzec2", ...],
                     "cognitive_patterns": ["wzorzec1", "wzorzec2", ...],
                     "insights": ["spostrzeżenie1", "spostrzeżenie2", ...],
-                    "growth_areas": ["obszar1", "obszar2", ...]
+                    "growth_areas": ["obszar1", "obszar2", ...],
+                    "rolling_summary": "zaktualizowane podsumowanie"
                 }
 
                 Upewnij się, że Twoja odpowiedź jest poprawnym i dobrze sformatowanym obiektem JSON.
-                """
+"""
 
-                user_prompt = f"""Dokonaj analizy psychologicznej następujących odpowiedzi na pytania terapeutyczne:
+def build_incremental_analysis_prompt(rolling_summary, previous_analysis, new_responses_text):
+    """
+    Buduje prompt użytkownika dla analizy przyrostowej.
 
-                {analysis_text}
+    Args:
+        rolling_summary (str): Dotychczasowe podsumowanie kroczące
+        previous_analysis (dict lub None): Poprzednia analiza (tylko wymagane klucze są wysyłane)
+        new_responses_text (str): Nowe odpowiedzi sformatowane przez format_responses_for_analysis()
 
-                Proszę o analizę w formacie JSON zgodnie ze wskazówkami z systemu.
-                """
+    Returns:
+        str: Prompt użytkownika
+    """
+    previous = {key: (previous_analysis or {}).get(key, []) for key in ANALYSIS_REQUIRED_KEYS}
+    return f"""Podsumowanie kroczące:
+                {rolling_summary or "Brak - to pierwsza analiza pacjenta."}
 
-                # Call the Claude API
-                message = anthropic_client.messages.create(
-                    model="claude-3-5-sonnet-20241022", # the newest Anthropic model is "claude-3-5-sonnet-20241022" which was released October 22, 2024.
-                    max_tokens=1000,
-                    temperature=0.2,
-                    system=system_prompt,
-                    messages=[
-                        {"role": "user", "content": user_prompt}
-                    ]
-                )
-
-                # Extract the response content
-                content = message.content[0].text.strip()
-
-                # Try to parse the JSON
-                try:
-                    # Check if the response is wrapped in ```json ``` and extract it
-                    if content.startswith("```json") and content.endswith("```"):
-                        content = content[7:-3].strip()
-
-                    analysis = json.loads(content)
-
-                    # Validate that expected keys exist
-                    required_keys = ["personality_traits", "emotional_patterns", "cognitive_patterns", 
-                                    "insights", "growth_areas"]
-
-                    if all(key in analysis for key in required_keys):
-                        # Dodaj wynik do cache'a
-                        analysis_cache[cache_key] = analysis
-                        logger.info("Pomyślnie wykonano analizę z Claude.")
-                        return analysis
-                    else:
-                        logger.warning("Claude zwrócił nieprawidłowy format JSON. Brakujące klucze.")
-                        # Kontynuuj do OpenAI lub fallbacku
-                except json.JSONDecodeError:
-                    logger.warning("Claude zwrócił niepoprawny JSON. Przechodzę do OpenAI.")
-                    # Kontynuuj do OpenAI lub fallbacku
-
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Błąd podczas analizy psychologicznej z Claude: {error_msg}")
-                # Kontynuuj do OpenAI
-
-        # Spróbuj użyć OpenAI jako backup
-        if HAS_OPENAI and openai_client:
-            try:
-                logger.info(f"Próba analizy psychologicznej z OpenAI {attempt+1}/{max_retries}")
-
-                # Prompt dla modelu GPT
-                system_prompt = """
-                Jesteś psychoterapeutą specjalizującym się w analizie wypowiedzi pacjentów. 
-                Twoim zadaniem jest przeprowadzenie dogłębnej analizy psychologicznej na podstawie 
-                odpowiedzi pacjenta na pytania terapeutyczne.
+                Poprzednia analiza:
+                {json.dumps(previous, ensure_ascii=False)}
 
-                Analiza powinna zawierać:
-                1. Dominujące cechy osobowości widoczne w wypowiedziach
-                2. Wzorce emocjonalne (jakie emocje przeważają, jak są wyrażane)
-                3. Wzorce poznawcze (schematy myślenia, przekonania)
-                4. Główne spostrzeżenia terapeutyczne
-                5. Potencjalne obszary rozwoju osobistego
+                Nowe odpowiedzi:
+                {new_responses_text}
 
-                Unikaj nadmiernych uogólnień. Bazuj wyłącznie na dostarczonych danych.
-                Pamiętaj, że analiza ma być wspierająca i konstruktywna, skupiona na wzroście.
-                Odpowiedź sformatuj jako JSON z następującymi kluczami:
-                {
-                    "personality_traits": ["cecha1", "cecha2", ...],
-                    "emotional_patterns": ["wzorzec1", "wzorzec2", ...],
-                    "cognitive_patterns": ["wzorzec1", "wzorzec2", ...],
-                    "insights": ["spostrzeżenie1", "spostrzeżenie2", ...],
-                    "growth_areas": ["obszar1", "obszar2", ...]
-                }
+                Proszę o zaktualizowaną analizę w formacie JSON zgodnie ze wskazówkami z systemu.
                 """
 
-                response = openai_client.chat.completions.create(
-                    model="gpt-4",  # Aktualny model OpenAI
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": analysis_text}
-                    ],
-                    response_format={"type": "json_object"}
-                )
+def merge_incremental_analysis(previous_analysis, update):
+    """
+    Łączy poprzednią analizę z aktualizacją zwróconą przez model.
 
-                analysis = json.loads(response.choices[0].message.content)
+    Klucze, dla których model zwrócił pustą listę, zachowują poprzednie wartości.
 
-                # Dodaj wynik do cache'a
-                analysis_cache[cache_key] = analysis
-                logger.info("Pomyślnie wykonano analizę z OpenAI.")
-                return analysis
+    Returns:
+        dict: Połączona analiza zawierająca wszystkie wymagane klucze
+    """
+    merged = {}
+    for key in ANALYSIS_REQUIRED_KEYS:
+        value = update.get(key)
+        if not value and previous_analysis:
+            value = previous_analysis.get(key, [])
+        merged[key] = value or []
+    return merged
+
+def analyze_user_responses_incremental(rolling_summary, previous_analysis, new_responses):
+    """
+    Aktualizuje analizę psychologiczną na podstawie wyłącznie nowych odpowiedzi.
+
+    Rozmiar promptu zależy od długości podsumowania i liczby nowych odpowiedzi,
+    a nie od długości całej historii użytkownika.
+
+    Args:
+        rolling_summary (str): Dotychczasowe podsumowanie kroczące
+        previous_analysis (dict lub None): Poprzednia analiza
+        new_responses (list): Nowe odpowiedzi (słowniki z kluczami 'question', 'response' i 'timestamp')
+
+    Returns:
+        tuple lub None: (analiza, nowe podsumowanie kroczące) lub None, gdy żaden model nie odpowiedział poprawnie
+    """
+    user_prompt = build_incremental_analysis_prompt(
+        rolling_summary, previous_analysis, format_responses_for_analysis(new_responses))
+
+    content = None
+    if gateway.is_available("anthropic"):
+        try:
+            message = gateway.anthropic_messages(
+                model=ANALYSIS_MODEL,
+                max_tokens=1500,
+                temperature=0.2,
+                system=INCREMENTAL_ANALYSIS_SYSTEM_PROMPT,
+                messages=[
+                    {"role": "user", "content": user_prompt}
+                ]
+            )
+            content = message.content[0].text
+        except Exception as e:
+            logger.error(f"Błąd podczas przyrostowej analizy z Claude: {str(e)}")
+
+    update = parse_analysis_response(content) if content else None
+
+    if update is None and gateway.is_available("openai"):
+        try:
+            response = gateway.openai_chat(
+                model=OPENAI_ANALYSIS_MODEL,
+                messages=[
+                    {"role": "system", "content": INCREMENTAL_ANALYSIS_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+            update = parse_analysis_response(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Błąd podczas przyrostowej analizy z OpenAI: {str(e)}")
+
+    if update is None:
+        return None
+
+    new_summary = update.get("rolling_summary") or rolling_summary or ""
+    return merge_incremental_analysis(previous_analysis, update), new_summary
+
+def generate_incremental_insight(user_id, db):
+    """
+    Generuje analizę użytkownika w trybie przyrostowym.
+
+    Wysyła do modelu tylko odpowiedzi dodane od ostatniej analizy (powyżej znacznika
+    watermark_id), w porcjach po INCREMENTAL_CHUNK_SIZE, wraz z zapisanym podsumowaniem
+    kroczącym i poprzednią analizą.
+
+    Args:
+        user_id (int): ID użytkownika
+        db: Obiekt bazy danych SQLAlchemy
+
+    Returns:
+        dict lub None: Analiza lub None, gdy nie udało się jej wygenerować
+    """
+    from models import AnalysisState
+
+    state = AnalysisState.query.filter_by(user_id=user_id).first()
+    if state is None:
+        state = AnalysisState(user_id=user_id, rolling_summary='', watermark_id=0)
+        db.session.add(state)
+
+    new_responses = load_user_responses(user_id, after_id=state.watermark_id)
+    previous_analysis = state.get_analysis()
+
+    if not new_responses:
+        return previous_analysis
+
+    analysis = previous_analysis
+    summary = state.rolling_summary
+    updated = False
+    for start in range(0, len(new_responses), INCREMENTAL_CHUNK_SIZE):
+        chunk = new_responses[start:start + INCREMENTAL_CHUNK_SIZE]
+        result = analyze_user_responses_incremental(summary, analysis, chunk)
+        if result is None:
+            break
+        analysis, summary = result
+        updated = True
+
+        # Zapisz postęp po każdej porcji, aby kolejna próba zaczęła od tego miejsca
+        state.set_analysis(analysis)
+        state.rolling_summary = summary
+        state.watermark_id = chunk[-1]["id"]
+        db.session.commit()
+
+    if not updated:
+        # Żadna porcja nie została przeanalizowana - poprzednia analiza nie uwzględnia nowych
+        # odpowiedzi, więc wywołujący przechodzi do pełnej analizy zamiast zapisać nieaktualne dane
+        db.session.rollback()
+        return None
+    return analysis
+
+def load_user_responses(user_id, after_id=None):
+    """
+    Pobiera udzielone odpowiedzi użytkownika w formacie wymaganym przez analizę.
+
+    Args:
+        user_id (int): ID użytkownika
+        after_id (int, optional): Zwróć tylko odpowiedzi o ID większym niż podane
+
+    Returns:
+        list: Lista słowników z kluczami 'id', 'question', 'response' i 'timestamp'
+    """
+    from models import Conversation
+
+    # Pobierz odpowiedzi użytkownika z wypełnionymi odpowiedziami
+    query = Conversation.query.filter_by(user_id=user_id)\
+        .filter(Conversation.response.isnot(None))
+    if after_id is not None:
+        query = query.filter(Conversation.id > after_id)\
+            .order_by(Conversation.id.asc())
+    else:
+        query = query.order_by(Conversation.timestamp.asc())
+    conversations = query.all()
+
+    return [{
+        "id": conv.id,
+        "question": conv.question,
+        "response": conv.response,
+        "timestamp": conv.timestamp
+    } for conv in conversations]
+
+def stream_user_responses_analysis(responses):
+    """
+    Przeprowadza analizę psychologiczną w trybie strumieniowym (Anthropic streaming API).
+
+    Zwraca kolejne fragmenty odpowiedzi Claude w miarę ich otrzymywania. Wywołujący
+    powinien połączyć fragmenty i przekazać je do parse_analysis_response(). Jeśli Claude
+    jest niedostępny, nie zwraca żadnych fragmentów - wtedy należy użyć analyze_user_responses().
+
+    Args:
+        responses (list): Lista słowników z kluczami 'question', 'response' i 'timestamp'
 
-            except Exception as e:
-                error_msg = str(e)
-                error_code = None
-
-                # Spróbuj wyciągnąć kod błędu, ale bez oczekiwania konkretnego typu wyjątku
-                try:
-                    if hasattr(e, 'status_code'):
-                        error_code = e.status_code
-                    # Próbujemy różne ścieżki dla różnych typów wyjątków
-                    elif hasattr(e, 'response') and hasattr(e.response, 'status_code'):
-                        error_code = e.response.status_code
-                except Exception:
-                    # Ignoruj błędy podczas próby wyciągnięcia kodu
-                    pass
-
-                logger.error(f"Błąd podczas analizy psychologicznej z OpenAI: {error_code} - {error_msg}")
-
-                # Sprawdź, czy to błąd limitu (429 lub insufficient_quota)
-                if error_code == 429 or "insufficient_quota" in error_msg.lower():
-                    logger.warning("Przekroczono limit zapytań API OpenAI.")
-                    # Kontynuuj do następnej próby lub fallbacku
-
-        # Jeśli to ostatnia próba i oba API zawiodły, zwróć domyślne wartości
-        if attempt == max_retries - 1:
-            logger.error("Wyczerpano limit prób dla obu API. Zwracam dane zastępcze.")
-            fallback = DEFAULT_ANALYSIS.copy()
-            # Zamiast zastępować, dodajemy komunikat o błędzie do insights
-            insights = fallback.get("insights", [])
-            if isinstance(insights, list):
-                insights.extend(API_LIMIT_MESSAGES)
-                fallback["insights"] = insights
-            else:
-                fallback["insights"] = API_LIMIT_MESSAGES
-            return fallback
-
-        # Dodaj losowe odchylenie do opóźnienia (jitter)
-        jitter = random.uniform(0, 0.5)
-        wait_time = retry_delay * (2 ** attempt) + jitter
-        logger.info(f"Ponawiam próbę za {wait_time:.2f} sekund...")
-        time.sleep(wait_time)
-
-    # Jeśli wszystko zawiedzie, zwróć domyślne wartości
-    return DEFAULT_ANALYSIS.copy()
+    Yields:
+        str: Kolejne fragmenty odpowiedzi modelu (JSON)
+    """
+    if not gateway.is_available("anthropic") or not responses or len(responses) < 2:
+        return
+
+    request = build_claude_analysis_request(format_responses_for_analysis(responses))
+
+    try:
+        for text in gateway.anthropic_stream_text(**request):
+            yield text
+    except Exception as e:
+        logger.error(f"Błąd podczas strumieniowej analizy psychologicznej z Claude: {str(e)}")
+
+def store_psychological_analysis(user_id, analysis_data, db):
+    """
+    Zapisuje analizę psychologiczną użytkownika wraz z wynikiem inteligencji emocjonalnej.
+
+    Args:
+        user_id (int): ID użytkownika
+        analysis_data (dict): Analiza psychologiczna
+        db: Obiekt bazy danych SQLAlchemy
+
+    Returns:
+        PsychologicalAnalysis: Zapisana analiza
+    """
+    from models import PsychologicalAnalysis
+
+    # Oblicz wynik inteligencji emocjonalnej
+    ei_score = get_emotional_intelligence_score(analysis_data)
+
+    new_analysis = PsychologicalAnalysis(
+        user_id=user_id,
+        emotional_intelligence_score=ei_score
+    )
+    new_analysis.set_analysis(analysis_data)
+
+    db.session.add(new_analysis)
+    db.session.commit()
+
+    return new_analysis
 
 def generate_psychological_insight(user_id, db):
     """
@@ -311,15 +672,22 @@ def generate_psychological_insight(user_id, db):
     Returns:
         dict: Analiza psychologiczna użytkownika
     """
-    from models import Conversation
+    if ANALYSIS_MODE == "incremental":
+        from models import Conversation
+
+        # W trybie przyrostowym nie wczytujemy całej historii - wystarczy liczba odpowiedzi
+        answered_count = Conversation.query.filter_by(user_id=user_id)\
+            .filter(Conversation.response.isnot(None))\
+            .count()
+        if answered_count >= 2:
+            analysis = generate_incremental_insight(user_id, db)
+            if analysis is not None:
+                return analysis
+            logger.warning("Analiza przyrostowa nie powiodła się. Przechodzę do pełnej analizy.")
 
-    # Pobierz odpowiedzi użytkownika z wypełnionymi odpowiedziami
-    conversations = Conversation.query.filter_by(user_id=user_id)\
-        .filter(Conversation.response.isnot(None))\
-        .order_by(Conversation.timestamp.asc())\
-        .all()
+    responses = load_user_responses(user_id)
 
-    if not conversations or len(conversations) < 2:
+    if len(responses) < 2:
         return {
             "personality_traits": [],
             "emotional_patterns": [],
@@ -328,15 +696,6 @@ def generate_psychological_insight(user_id, db):
             "growth_areas": []
         }
 
-    # Przekształć odpowiedzi do formatu wymaganego przez analizę
-    responses = []
-    for conv in conversations:
-        responses.append({
-            "question": conv.question,
-            "response": conv.response,
-            "timestamp": conv.timestamp
-        })
-
     # Przeprowadź analizę
     return analyze_user_responses(responses)
 
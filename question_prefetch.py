@@ -0,0 +1,190 @@
+"""
+Moduł wstępnego generowania pytań terapeutycznych w tle.
+
+Po zapisaniu odpowiedzi użytkownika kolejne pytanie jest generowane
+w puli wątków roboczych i zapisywane w tabeli PendingQuestion, dzięki czemu
+następne wyświetlenie strony głównej sprowadza się do odczytu z bazy danych.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Liczba wątków generujących pytania w tle
+PREFETCH_WORKERS = int(os.environ.get("QUESTION_PREFETCH_WORKERS", 4))
+
+# Maksymalny czas (w sekundach) oczekiwania na pytanie, które jest jeszcze generowane
+PREFETCH_DEADLINE = float(os.environ.get("QUESTION_PREFETCH_DEADLINE", 0.5))
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="question-prefetch")
+
+# Zadania w toku, indeksowane ID użytkownika
+_pending_futures = {}
+_lock = threading.Lock()
+
+# Liczniki trafień i chybień wstępnego generowania
+prefetch_stats = {
+    "scheduled": 0,
+    "hit": 0,        # pytanie było gotowe w bazie danych
+    "late_hit": 0,   # pytanie pojawiło się w trakcie oczekiwania
+    "miss": 0,       # trzeba było użyć mechanizmu zastępczego
+    "failed": 0,     # błąd podczas generowania w tle
+}
+
+
+def _increment(counter):
+    with _lock:
+        prefetch_stats[counter] += 1
+
+
+def get_prefetch_stats():
+    """
+    Zwraca migawkę liczników wstępnego generowania pytań.
+
+    Returns:
+        dict: Liczniki oraz współczynnik trafień (hit_rate)
+    """
+    with _lock:
+        stats = dict(prefetch_stats)
+    served = stats["hit"] + stats["late_hit"] + stats["miss"]
+    stats["hit_rate"] = round((stats["hit"] + stats["late_hit"]) / served, 4) if served else None
+    return stats
+
+
+def build_question_context(user_id, limit=5):
+    """
+    Pobiera ostatnie wpisy rozmowy użytkownika w formacie oczekiwanym przez generatory pytań.
+
+    Args:
+        user_id (int): ID użytkownika
+        limit (int): Liczba ostatnich wpisów
+
+    Returns:
+        list: Lista słowników z kluczami 'question', 'response' i 'date'
+    """
+    from models import Conversation
+
+    conversation_history = Conversation.query.filter_by(user_id=user_id)\
+        .order_by(Conversation.timestamp.desc())\
+        .limit(limit)\
+        .all()
+    return [{"question": c.question, "response": c.response, "date": c.timestamp} for c in conversation_history]
+
+
+def _prefetch_question(app, user_id):
+    """Generuje pytanie dla użytkownika i zapisuje je w tabeli PendingQuestion."""
+    from database import db
+    from models import PendingQuestion
+    from claude_api import generate_claude_question
+
+    with app.app_context():
+        try:
+            context = build_question_context(user_id)
+            question = generate_claude_question(context if context else None)
+            if not question or len(question.strip()) == 0:
+                logger.warning(f"Wygenerowano puste pytanie w tle dla użytkownika {user_id}")
+                _increment("failed")
+                return
+
+            pending = PendingQuestion.query.filter_by(user_id=user_id).first()
+            if pending:
+                pending.question = question
+                pending.timestamp = datetime.now()
+            else:
+                db.session.add(PendingQuestion(user_id=user_id, question=question, timestamp=datetime.now()))
+            db.session.commit()
+            logger.info(f"Przygotowano w tle kolejne pytanie dla użytkownika {user_id}")
+        except Exception as e:
+            db.session.rollback()
+            _increment("failed")
+            logger.error(f"Błąd podczas generowania pytania w tle dla użytkownika {user_id}: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def schedule_question_prefetch(app, user_id):
+    """
+    Zleca wygenerowanie kolejnego pytania dla użytkownika w puli wątków.
+
+    Args:
+        app: Obiekt aplikacji Flask (potrzebny do utworzenia kontekstu w wątku)
+        user_id (int): ID użytkownika
+
+    Returns:
+        Future: Zadanie generowania pytania
+    """
+    with _lock:
+        future = _pending_futures.get(user_id)
+        if future is not None and not future.done():
+            return future
+
+        future = _executor.submit(_prefetch_question, app, user_id)
+        _pending_futures[user_id] = future
+        prefetch_stats["scheduled"] += 1
+
+    def _cleanup(done_future, user_id=user_id):
+        with _lock:
+            if _pending_futures.get(user_id) is done_future:
+                del _pending_futures[user_id]
+
+    future.add_done_callback(_cleanup)
+    return future
+
+
+def take_prefetched_question(user_id, deadline=None):
+    """
+    Pobiera (i usuwa) pytanie przygotowane w tle dla użytkownika.
+
+    Jeśli pytanie jest jeszcze generowane, czeka na nie co najwyżej `deadline` sekund.
+
+    Args:
+        user_id (int): ID użytkownika
+        deadline (float, optional): Maksymalny czas oczekiwania w sekundach
+
+    Returns:
+        str lub None: Przygotowane pytanie lub None, gdy nie było gotowe na czas
+    """
+    from database import db
+    from models import PendingQuestion
+
+    if deadline is None:
+        deadline = PREFETCH_DEADLINE
+
+    counter = "hit"
+    pending = PendingQuestion.query.filter_by(user_id=user_id).first()
+
+    if not pending:
+        with _lock:
+            future = _pending_futures.get(user_id)
+        if future is not None:
+            try:
+                future.result(timeout=deadline)
+            except FutureTimeoutError:
+                pass
+            except Exception as e:
+                logger.error(f"Zadanie generowania pytania w tle zakończyło się błędem: {str(e)}")
+            pending = PendingQuestion.query.filter_by(user_id=user_id).first()
+            counter = "late_hit"
+
+    if not pending:
+        _increment("miss")
+        return None
+
+    question = pending.question
+    try:
+        db.session.delete(pending)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Błąd podczas usuwania przygotowanego pytania: {str(e)}")
+        _increment("miss")
+        return None
+
+    _increment(counter)
+    return question
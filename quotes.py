@@ -1,22 +1,16 @@
 
+import os
+import re
 import random
 import logging
-from anthropic import Anthropic
-import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from llm_gateway import gateway
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Inicjalizacja klienta Anthropic
-anthropic_client = None
-try:
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if api_key:
-        anthropic_client = Anthropic(api_key=api_key)
-except Exception as e:
-    logger.warning(f"Nie można zainicjalizować Anthropic API: {str(e)}")
-
 # Domyślna pula cytatów
 DEFAULT_QUOTES = [
     "Każda podróż zaczyna się od pierwszego kroku.",
@@ -51,7 +45,38 @@ DEFAULT_QUOTES = [
     "Twoja wrażliwość to Twoja siła."
 ]
 
-quote_cache = {}
+# Model używany do generowania cytatów
+QUOTE_MODEL = "claude-3-5-haiku-20241022"
+
+# Pula cytatów jest uzupełniana w tle, gdy użytkownikowi zostaje mniej
+# niewyświetlonych cytatów niż QUOTE_POOL_LOW_WATERMARK
+QUOTE_POOL_LOW_WATERMARK = int(os.environ.get("QUOTE_POOL_LOW_WATERMARK", 20))
+QUOTE_POOL_BATCH_SIZE = int(os.environ.get("QUOTE_POOL_BATCH_SIZE", 25))
+QUOTE_POOL_MAX_SIZE = int(os.environ.get("QUOTE_POOL_MAX_SIZE", 1000))
+
+QUOTE_PROMPT = """
+        Wygeneruj jeden krótki, mądry cytat terapeutyczny w języku polskim.
+        Cytat powinien być inspirujący, głęboki i związany z samorozwojem, 
+        ale nie dłuższy niż jedno zdanie.
+        
+        Odpowiedz tylko samym cytatem, bez cudzysłowów czy dodatkowego tekstu.
+        """
+
+QUOTE_BATCH_PROMPT = """
+        Wygeneruj {count} różnych, krótkich, mądrych cytatów terapeutycznych w języku polskim.
+        Każdy cytat powinien być inspirujący, głęboki i związany z samorozwojem,
+        ale nie dłuższy niż jedno zdanie.
+
+        Odpowiedz wyłącznie cytatami, po jednym w każdej linii, bez numeracji,
+        cudzysłowów czy dodatkowego tekstu.
+        """
+
+# Numeracja, myślniki i cudzysłowy, które model czasem dodaje mimo instrukcji
+_QUOTE_DECORATION_RE = re.compile(r'^\s*(?:\d+[.)]\s*|[-*•]\s*)?["„“”\']?(.*?)["„“”\']?\s*$')
+
+_refill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quote-refill")
+_refill_future = None
+_refill_lock = threading.Lock()
 
 def generate_therapeutic_quote(context=None):
     """
@@ -63,24 +88,16 @@ def generate_therapeutic_quote(context=None):
     Returns:
         str: Terapeutyczny cytat
     """
-    if not anthropic_client:
+    if not gateway.is_available("anthropic"):
         return random.choice(DEFAULT_QUOTES)
         
     try:
-        prompt = """
-        Wygeneruj jeden krótki, mądry cytat terapeutyczny w języku polskim.
-        Cytat powinien być inspirujący, głęboki i związany z samorozwojem, 
-        ale nie dłuższy niż jedno zdanie.
-        
-        Odpowiedz tylko samym cytatem, bez cudzysłowów czy dodatkowego tekstu.
-        """
-        
-        message = anthropic_client.messages.create(
-            model="claude-3-sonnet-20240229",
+        message = gateway.anthropic_messages(
+            model=QUOTE_MODEL,
             max_tokens=100,
             temperature=0.7,
             messages=[
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": QUOTE_PROMPT}
             ]
         )
         
@@ -90,3 +107,132 @@ def generate_therapeutic_quote(context=None):
     except Exception as e:
         logger.error(f"Błąd podczas generowania cytatu: {str(e)}")
         return random.choice(DEFAULT_QUOTES)
+
+def generate_quote_batch(count=None):
+    """
+    Generuje wiele cytatów jednym zapytaniem do modelu.
+
+    Args:
+        count (int, optional): Liczba cytatów (domyślnie QUOTE_POOL_BATCH_SIZE)
+
+    Returns:
+        list: Lista cytatów (pusta, gdy model jest niedostępny)
+    """
+    count = count or QUOTE_POOL_BATCH_SIZE
+    if not gateway.is_available("anthropic"):
+        return []
+
+    try:
+        message = gateway.anthropic_messages(
+            model=QUOTE_MODEL,
+            max_tokens=60 * count,
+            temperature=1.0,
+            messages=[
+                {"role": "user", "content": QUOTE_BATCH_PROMPT.format(count=count)}
+            ]
+        )
+    except Exception as e:
+        logger.error(f"Błąd podczas generowania puli cytatów: {str(e)}")
+        return []
+
+    quotes = []
+    for line in message.content[0].text.splitlines():
+        quote = _QUOTE_DECORATION_RE.match(line).group(1).strip()
+        if 10 <= len(quote) <= 500 and quote not in quotes:
+            quotes.append(quote)
+    return quotes
+
+def refill_quote_pool(app, count=None):
+    """
+    Uzupełnia pulę cytatów nową porcją wygenerowanych cytatów.
+
+    Args:
+        app: Obiekt aplikacji Flask (potrzebny do utworzenia kontekstu w wątku)
+        count (int, optional): Liczba cytatów do wygenerowania
+
+    Returns:
+        int: Liczba dodanych cytatów
+    """
+    from database import db
+    from models import QuotePool
+
+    quotes = generate_quote_batch(count)
+    if not quotes:
+        return 0
+
+    with app.app_context():
+        try:
+            existing = {row.text for row in QuotePool.query.filter(QuotePool.text.in_(quotes)).all()}
+            new_quotes = [QuotePool(text=quote) for quote in quotes if quote not in existing]
+            db.session.add_all(new_quotes)
+            db.session.commit()
+            logger.info(f"Dodano {len(new_quotes)} cytatów do puli")
+            return len(new_quotes)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Błąd podczas zapisywania puli cytatów: {str(e)}")
+            return 0
+        finally:
+            db.session.remove()
+
+def schedule_quote_pool_refill(app):
+    """
+    Zleca uzupełnienie puli cytatów w tle (co najwyżej jedno zadanie naraz).
+
+    Returns:
+        Future: Zadanie uzupełniania puli
+    """
+    global _refill_future
+    with _refill_lock:
+        if _refill_future is None or _refill_future.done():
+            _refill_future = _refill_executor.submit(refill_quote_pool, app)
+        return _refill_future
+
+def get_quote_for_user(app, user_id):
+    """
+    Zwraca kolejny cytat z puli dla użytkownika, bez zapytania do modelu.
+
+    Cytaty są wyświetlane po kolei według ID, więc użytkownik zobaczy ten sam
+    cytat ponownie dopiero po obejrzeniu całej puli. Gdy zostaje mu niewiele
+    nowych cytatów, pula jest uzupełniana w tle. Przy pustej puli używane są
+    DEFAULT_QUOTES.
+
+    Args:
+        app: Obiekt aplikacji Flask
+        user_id (int): ID użytkownika
+
+    Returns:
+        str: Terapeutyczny cytat
+    """
+    from sqlalchemy import func
+    from database import db
+    from models import QuotePool, QuoteRotation
+
+    try:
+        rotation = QuoteRotation.query.filter_by(user_id=user_id).first()
+        last_quote_id = rotation.last_quote_id if rotation else 0
+
+        quote = QuotePool.query.filter(QuotePool.id > last_quote_id).order_by(QuotePool.id.asc()).first()
+        if quote is None:
+            # Użytkownik widział już całą pulę - zaczynamy od początku
+            quote = QuotePool.query.order_by(QuotePool.id.asc()).first()
+        if quote is None:
+            schedule_quote_pool_refill(app)
+            return random.choice(DEFAULT_QUOTES)
+
+        # ID cytatów są nadawane kolejno, więc różnica ID przybliża liczbę
+        # niewyświetlonych cytatów i rozmiar puli bez kosztownego COUNT(*)
+        max_quote_id = db.session.query(func.max(QuotePool.id)).scalar() or 0
+        if max_quote_id - quote.id < QUOTE_POOL_LOW_WATERMARK and max_quote_id < QUOTE_POOL_MAX_SIZE:
+            schedule_quote_pool_refill(app)
+
+        if rotation is None:
+            rotation = QuoteRotation(user_id=user_id)
+            db.session.add(rotation)
+        rotation.last_quote_id = quote.id
+        db.session.commit()
+        return quote.text
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Błąd podczas pobierania cytatu z puli: {str(e)}")
+        return random.choice(DEFAULT_QUOTES)
@@ -0,0 +1,328 @@
+"""
+Transakcyjna skrzynka nadawcza przypomnień (tabela ReminderOutbox).
+
+Harmonogram (enqueue_due_reminders) w jednej transakcji na paczkę użytkowników:
+- wybiera zaległych użytkowników (SELECT ... FOR UPDATE SKIP LOCKED),
+- wstawia wszystkie przypomnienia jednym INSERT ... ON CONFLICT DO NOTHING,
+- przesuwa next_reminder_at na kolejny dzień.
+
+Procesy wysyłające (process_outbox) przejmują paczki wierszy przez
+SELECT ... FOR UPDATE SKIP LOCKED, wysyłają je poza transakcją (e-maile przez
+pulę SMTP, SMS-y przez dispatcher Twilio) i zapisują wyniki zbiorczo: statusy
+wierszy, wpisy ReminderLog i last_reminder_sent w jednej transakcji na paczkę.
+Błędy przejściowe są ponawiane z narastającym opóźnieniem, a błędy trwałe
+i wiadomości po wyczerpaniu prób trafiają do stanu 'dead'.
+
+Po awarii w trakcie przebiegu w tabeli zostaje dokładnie to, co jeszcze nie
+zostało wysłane, a kilka harmonogramów może działać równolegle. Limit SMS na
+sekundę (SMS_RATE_LIMIT) obowiązuje w obrębie procesu - przy N równoległych
+procesach wysyłających należy ustawić go na limit konta Twilio podzielony przez N.
+"""
+
+import os
+import random
+import logging
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from reminder_schedule import compute_next_reminder_at, utc_now
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Liczba użytkowników / wiadomości w jednej transakcji
+OUTBOX_BATCH_SIZE = int(os.environ.get("REMINDER_OUTBOX_BATCH_SIZE", 500))
+
+# Maksymalna liczba prób wysyłki, po której wiadomość trafia do stanu 'dead'
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("REMINDER_OUTBOX_MAX_ATTEMPTS", 5))
+
+# Opóźnienie kolejnej próby: OUTBOX_BACKOFF_BASE * 2^(próba - 1), najwyżej OUTBOX_BACKOFF_MAX [s]
+OUTBOX_BACKOFF_BASE = float(os.environ.get("REMINDER_OUTBOX_BACKOFF_BASE", 60))
+OUTBOX_BACKOFF_MAX = float(os.environ.get("REMINDER_OUTBOX_BACKOFF_MAX", 3600))
+
+# Po jakim czasie wiadomość w stanie 'processing' uznajemy za porzuconą (np. po awarii procesu)
+OUTBOX_CLAIM_TIMEOUT = timedelta(seconds=int(os.environ.get("REMINDER_OUTBOX_CLAIM_TIMEOUT", 600)))
+
+# Część OUTBOX_CLAIM_TIMEOUT, którą może zająć wysyłka SMS z jednej paczki (reszta to zapas na
+# wstrzymania po 429 i ponowienia) - inaczej inny proces przejąłby wiadomości w trakcie wysyłki
+OUTBOX_SMS_TIME_BUDGET = 0.5
+
+# Po jakim czasie ponownie próbujemy użytkownika, dla którego nie udało się wyliczyć terminu
+OUTBOX_FAILED_ROW_DELAY = timedelta(hours=1)
+
+
+def _backoff(attempts):
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def enqueue_due_reminders(batch_size=None):
+    """
+    Przenosi zaległe przypomnienia do skrzynki nadawczej.
+
+    Przypomnienie z pominiętego dnia (np. po przerwie w działaniu) nie jest
+    nadrabiane - termin przesuwa się na dzisiejszą godzinę użytkownika.
+
+    Args:
+        batch_size (int, optional): Liczba użytkowników w jednej transakcji
+
+    Returns:
+        int: Liczba wstawionych przypomnień
+    """
+    from sqlalchemy import update
+    from sqlalchemy.dialects.postgresql import insert
+    from database import db
+    from models import User, ReminderOutbox
+
+    batch_size = batch_size or OUTBOX_BATCH_SIZE
+    enqueued = 0
+    while True:
+        now = utc_now()
+        try:
+            users = db.session.query(
+                User.id, User.username, User.email, User.phone_number, User.reminder_method,
+                User.reminder_time, User.reminder_timezone, User.last_reminder_sent, User.next_reminder_at
+            ).filter(User.reminder_enabled.is_(True), User.next_reminder_at <= now)\
+                .order_by(User.next_reminder_at)\
+                .limit(batch_size)\
+                .with_for_update(skip_locked=True)\
+                .all()
+            if not users:
+                db.session.commit()
+                break
+
+            outbox_rows = []
+            user_updates = []
+            for user in users:
+                try:
+                    next_at = compute_next_reminder_at(True, user.reminder_time, user.reminder_timezone,
+                                                       user.last_reminder_sent, now)
+                    if next_at > now:
+                        # Termin z pominiętego dnia
+                        user_updates.append({"id": user.id, "next_reminder_at": next_at})
+                        continue
+
+                    # Kolejny termin liczony tak, jakby przypomnienie zostało wysłane teraz
+                    following_at = compute_next_reminder_at(True, user.reminder_time, user.reminder_timezone,
+                                                            now, now)
+                except Exception as e:
+                    # Błędny wiersz nie może blokować kolejki - odkładamy go, zamiast wycofywać całą paczkę
+                    logger.error(f"Błąd podczas wyliczania terminu przypomnienia dla użytkownika {user.id}: {str(e)}")
+                    user_updates.append({"id": user.id, "next_reminder_at": now + OUTBOX_FAILED_ROW_DELAY})
+                    continue
+
+                method = 'sms' if user.reminder_method == 'sms' else 'email'
+                outbox_rows.append({
+                    "user_id": user.id,
+                    "scheduled_for": user.next_reminder_at,
+                    "method": method,
+                    "recipient": user.phone_number if method == 'sms' else user.email,
+                    "username": user.username,
+                    "status": 'pending',
+                    "attempts": 0,
+                    "available_at": now,
+                })
+                user_updates.append({"id": user.id, "next_reminder_at": following_at})
+
+            if outbox_rows:
+                stmt = insert(ReminderOutbox.__table__).values(outbox_rows)\
+                    .on_conflict_do_nothing(constraint='uq_reminder_outbox_user_slot')
+                enqueued += db.session.execute(stmt).rowcount or 0
+            db.session.execute(update(User), user_updates)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Błąd podczas dodawania przypomnień do skrzynki nadawczej: {str(e)}")
+            break
+
+    if enqueued:
+        logger.info(f"Dodano {enqueued} przypomnień do skrzynki nadawczej")
+    return enqueued
+
+
+def sms_batch_limit():
+    """
+    Maksymalna liczba SMS-ów w paczce: tyle, ile limiter wyśle w OUTBOX_SMS_TIME_BUDGET
+    czasu przejęcia (przy SMS_RATE_LIMIT=1/s i 600 s - 300).
+    """
+    from sms_delivery import SMS_RATE_LIMIT
+
+    if SMS_RATE_LIMIT <= 0:
+        return OUTBOX_BATCH_SIZE
+    return max(1, int(SMS_RATE_LIMIT * OUTBOX_CLAIM_TIMEOUT.total_seconds() * OUTBOX_SMS_TIME_BUDGET))
+
+
+def claim_outbox_batch(batch_size=None):
+    """
+    Przejmuje paczkę wiadomości gotowych do wysyłki (także porzuconych przez inne procesy).
+
+    Wiersze są blokowane przez SELECT ... FOR UPDATE SKIP LOCKED, więc kilka
+    procesów wysyłających nie przejmie tej samej wiadomości. Liczba SMS-ów jest
+    ograniczona przez sms_batch_limit(), aby wysyłka zakończyła się przed
+    upływem OUTBOX_CLAIM_TIMEOUT; resztę paczki uzupełniają e-maile.
+
+    Returns:
+        list: Słowniki z danymi przejętych wiadomości
+    """
+    from sqlalchemy import and_, or_
+    from database import db
+    from models import ReminderOutbox
+
+    now = utc_now()
+    batch_size = batch_size or OUTBOX_BATCH_SIZE
+    ready = or_(
+        and_(ReminderOutbox.status == 'pending', ReminderOutbox.available_at <= now),
+        and_(ReminderOutbox.status == 'processing', ReminderOutbox.claimed_at < now - OUTBOX_CLAIM_TIMEOUT)
+    )
+
+    def claim(method_filter, limit):
+        return ReminderOutbox.query.filter(ready, method_filter)\
+            .order_by(ReminderOutbox.available_at)\
+            .limit(limit)\
+            .with_for_update(skip_locked=True)\
+            .all()
+
+    rows = claim(ReminderOutbox.method == 'sms', min(batch_size, sms_batch_limit()))
+    if len(rows) < batch_size:
+        rows += claim(ReminderOutbox.method != 'sms', batch_size - len(rows))
+
+    items = []
+    for row in rows:
+        row.status = 'processing'
+        row.claimed_at = now
+        row.attempts += 1
+        items.append({"id": row.id, "user_id": row.user_id, "method": row.method, "recipient": row.recipient,
+                      "username": row.username, "attempts": row.attempts})
+    db.session.commit()
+    return items
+
+
+def _failure(error, permanent):
+    return {"success": False, "error": error, "permanent": permanent}
+
+
+def deliver_batch(items):
+    """
+    Wysyła przejęte wiadomości: e-maile przez pulę SMTP, a równolegle SMS-y przez dispatcher Twilio.
+
+    Returns:
+        list: Wyniki (success, error, permanent) w kolejności wiadomości
+    """
+    from email_delivery import get_email_sender, is_email_configured
+    from sms_delivery import SMS_REMINDER_BODY, get_sms_dispatcher, is_sms_configured
+
+    results = [None] * len(items)
+    email_indexes, sms_indexes = [], []
+    for index, item in enumerate(items):
+        if not item["recipient"]:
+            results[index] = _failure("Brak numeru telefonu użytkownika" if item["method"] == 'sms'
+                                      else "Brak adresu e-mail użytkownika", True)
+        elif item["method"] == 'sms':
+            sms_indexes.append(index)
+        else:
+            email_indexes.append(index)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="sms-dispatch") as executor:
+        sms_future = None
+        if sms_indexes and is_sms_configured():
+            sms_future = executor.submit(get_sms_dispatcher().send_batch,
+                                         [(items[i]["recipient"], SMS_REMINDER_BODY) for i in sms_indexes])
+        elif sms_indexes:
+            for i in sms_indexes:
+                results[i] = _failure("Brak konfiguracji Twilio", False)
+
+        if email_indexes and is_email_configured():
+            email_results = get_email_sender().send_many(
+                [(items[i]["recipient"], items[i]["username"]) for i in email_indexes])
+            for i, result in zip(email_indexes, email_results):
+                results[i] = result
+        else:
+            for i in email_indexes:
+                results[i] = _failure("Brak konfiguracji SMTP", False)
+
+        if sms_future is not None:
+            try:
+                for i, result in zip(sms_indexes, sms_future.result()):
+                    results[i] = result
+            except Exception as e:
+                logger.error(f"Błąd podczas wysyłania SMS: {str(e)}")
+                for i in sms_indexes:
+                    results[i] = _failure(str(e), False)
+
+    return results
+
+
+def record_outbox_results(items, results):
+    """
+    Zapisuje wyniki wysyłki paczki w jednej transakcji: statusy wiadomości,
+    wpisy ReminderLog (dla wysłanych i ostatecznie nieudanych) i last_reminder_sent.
+
+    Returns:
+        tuple: (liczba wysłanych, liczba ostatecznie nieudanych)
+    """
+    from sqlalchemy import insert, update
+    from database import db
+    from models import ReminderLog, ReminderOutbox, User
+
+    now = utc_now()
+    outbox_updates, logs, user_updates = [], [], []
+    sent = dead = 0
+    for item, result in zip(items, results):
+        update_row = {"id": item["id"], "status": 'sent', "available_at": now, "claimed_at": None,
+                      "sent_at": None, "last_error": result["error"]}
+        if result["success"]:
+            update_row["sent_at"] = now
+            user_updates.append({"id": item["user_id"], "last_reminder_sent": now})
+            logs.append({"user_id": item["user_id"], "method": item["method"], "status": 'success',
+                         "error_message": None})
+            sent += 1
+        elif result.get("permanent") or item["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+            update_row["status"] = 'dead'
+            logs.append({"user_id": item["user_id"], "method": item["method"], "status": 'failed',
+                         "error_message": result["error"]})
+            logger.error(f"Nie udało się wysłać przypomnienia {item['method']} do {item['username']} "
+                         f"(próba {item['attempts']}): {result['error']}")
+            dead += 1
+        else:
+            update_row["status"] = 'pending'
+            update_row["available_at"] = now + _backoff(item["attempts"])
+        outbox_updates.append(update_row)
+
+    try:
+        if outbox_updates:
+            db.session.execute(update(ReminderOutbox), outbox_updates)
+        if logs:
+            db.session.execute(insert(ReminderLog), logs)
+        if user_updates:
+            db.session.execute(update(User), user_updates)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        # Wiadomości pozostają w stanie 'processing' i zostaną przejęte ponownie po OUTBOX_CLAIM_TIMEOUT
+        logger.error(f"Błąd podczas zapisywania wyników wysyłki przypomnień: {str(e)}")
+        raise
+    return sent, dead
+
+
+def process_outbox(batch_size=None, max_batches=None):
+    """
+    Wysyła wiadomości ze skrzynki nadawczej paczkami, dopóki są gotowe do wysyłki.
+
+    Args:
+        batch_size (int, optional): Liczba wiadomości w paczce
+        max_batches (int, optional): Maksymalna liczba paczek w jednym wywołaniu
+
+    Returns:
+        tuple: (liczba wysłanych, liczba ostatecznie nieudanych)
+    """
+    sent = dead = batches = 0
+    while max_batches is None or batches < max_batches:
+        items = claim_outbox_batch(batch_size)
+        if not items:
+            break
+        batch_sent, batch_dead = record_outbox_results(items, deliver_batch(items))
+        sent += batch_sent
+        dead += batch_dead
+        batches += 1
+    return sent, dead
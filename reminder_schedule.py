@@ -0,0 +1,67 @@
+"""
+Wyliczanie terminu następnego przypomnienia (User.next_reminder_at).
+
+Termin jest zapisywany w bazie jako czas UTC (bez strefy) i przeliczany
+tylko przy zmianie ustawień przypomnień oraz po wysłaniu przypomnienia,
+dzięki czemu harmonogram wybiera użytkowników jednym zapytaniem
+zakresowym po indeksie zamiast sprawdzać każdego w Pythonie.
+"""
+
+from datetime import datetime, time, timedelta
+import pytz
+
+# Godzina przypomnienia, gdy kolumna reminder_time jest pusta (jak domyślna wartość kolumny)
+DEFAULT_REMINDER_TIME = time(20, 0)
+
+
+def utc_now():
+    """Bieżący czas UTC bez informacji o strefie (format kolumn DateTime)."""
+    return datetime.now(pytz.utc).replace(tzinfo=None)
+
+
+def _as_utc(moment):
+    # Kolumny DateTime nie przechowują strefy - wartości bez strefy traktujemy jako UTC
+    if moment.tzinfo is None:
+        return pytz.utc.localize(moment)
+    return moment.astimezone(pytz.utc)
+
+
+def compute_next_reminder_at(reminder_enabled, reminder_time, reminder_timezone, last_reminder_sent, now=None):
+    """
+    Wylicza termin następnego przypomnienia.
+
+    Użytkownik, który nie dostał jeszcze przypomnienia, dostaje je od razu.
+    Kolejne przypomnienie przypada na godzinę reminder_time następnego dnia
+    (w strefie użytkownika) po dniu ostatniej wysyłki. Jeśli ten dzień już
+    minął, przypomnienie nie jest nadrabiane - termin przesuwa się na
+    reminder_time dnia dzisiejszego (tak jak dotąd w User.is_reminder_due()).
+
+    Args:
+        reminder_enabled (bool): Czy przypomnienia są włączone
+        reminder_time (datetime.time): Godzina przypomnienia w strefie użytkownika
+            (None - DEFAULT_REMINDER_TIME)
+        reminder_timezone (str): Nazwa strefy czasowej użytkownika
+        last_reminder_sent (datetime): Czas ostatniej wysyłki (lub None)
+        now (datetime, optional): Bieżący czas UTC bez strefy
+
+    Returns:
+        datetime: Termin w UTC bez strefy lub None, jeśli przypomnienia są wyłączone
+    """
+    if not reminder_enabled:
+        return None
+
+    if now is None:
+        now = utc_now()
+
+    if not last_reminder_sent:
+        return now
+
+    try:
+        timezone = pytz.timezone(reminder_timezone or 'Europe/Warsaw')
+    except pytz.UnknownTimeZoneError:
+        timezone = pytz.utc
+
+    next_date = _as_utc(last_reminder_sent).astimezone(timezone).date() + timedelta(days=1)
+    today = pytz.utc.localize(now).astimezone(timezone).date()
+    next_local = timezone.localize(datetime.combine(max(next_date, today), reminder_time or DEFAULT_REMINDER_TIME))
+    return next_local.astimezone(pytz.utc).replace(tzinfo=None)
@@ -0,0 +1,86 @@
+"""
+Lekki proces wysyłki przypomnień (np. uruchamiany z crona co kilka minut).
+
+W przeciwieństwie do `from app import app` nie importuje widoków, modułów
+analizy (matplotlib, wordcloud, NLP) ani klientów modeli językowych i nie
+wykonuje db.create_all() - inicjalizuje tylko SQLAlchemy z modelami oraz
+kanały wysyłki (pula SMTP, dispatcher SMS).
+
+Użycie:
+    python reminder_worker.py              # jeden przebieg
+    python reminder_worker.py --loop 60    # przebieg co 60 s
+"""
+
+import sys
+import time
+import logging
+import argparse
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def create_worker_app():
+    """
+    Tworzy minimalną aplikację Flask z samą konfiguracją bazy danych (kontekst dla db.session).
+
+    Returns:
+        Flask: Aplikacja bez widoków i rozszerzeń poza SQLAlchemy
+    """
+    from flask import Flask
+    from database import configure_database
+
+    app = Flask("reminder_worker")
+    configure_database(app)
+
+    # Rejestracja modeli w metadanych SQLAlchemy
+    import models  # noqa: F401
+    return app
+
+
+def run_once(app):
+    """
+    Wykonuje jeden przebieg: uzupełnienie terminów, skrzynka nadawcza i wysyłka.
+
+    Returns:
+        int: Liczba wysłanych przypomnień
+    """
+    from database import db
+    from reminders import check_and_send_due_reminders
+
+    with app.app_context():
+        try:
+            return check_and_send_due_reminders()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Błąd podczas wysyłania przypomnień: {str(e)}")
+            return 0
+        finally:
+            db.session.remove()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loop", type=float, default=None, metavar="SEKUNDY",
+                        help="powtarzaj przebieg co tyle sekund zamiast jednego przebiegu")
+    args = parser.parse_args(argv)
+
+    app = create_worker_app()
+    if args.loop is None:
+        run_once(app)
+        return 0
+
+    logger.info(f"Uruchomiono proces przypomnień (co {args.loop:g} s)")
+    try:
+        while True:
+            started = time.monotonic()
+            run_once(app)
+            time.sleep(max(0.0, args.loop - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,9 +7,6 @@ oraz zarządzania harmonogramem przypomnień.
 
 import os
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 import pytz
 
@@ -17,39 +14,19 @@ import pytz
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Sprawdź Twilio API
-HAS_TWILIO = False
-twilio_client = None
+# Konfiguracja Twilio (wysyłka przez REST API w sms_delivery)
+from sms_delivery import SMS_REMINDER_BODY, get_sms_dispatcher, is_sms_configured
 
-try:
-    from twilio.rest import Client
-    HAS_TWILIO = True
-    
-    # Inicjalizacja klienta Twilio
-    account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
-    auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
-    twilio_phone = os.environ.get("TWILIO_PHONE_NUMBER")
-    
-    if account_sid and auth_token and twilio_phone:
-        twilio_client = Client(account_sid, auth_token)
-        logger.info("Zainicjalizowano klienta Twilio dla powiadomień SMS")
-    else:
-        missing = []
-        if not account_sid: missing.append("TWILIO_ACCOUNT_SID")
-        if not auth_token: missing.append("TWILIO_AUTH_TOKEN")
-        if not twilio_phone: missing.append("TWILIO_PHONE_NUMBER")
-        logger.warning(f"Brak kluczy Twilio API: {', '.join(missing)}")
-except ImportError:
-    logger.warning("Nie można zaimportować Twilio. Powiadomienia SMS są niedostępne.")
-except Exception as e:
-    logger.warning(f"Problem z inicjalizacją Twilio: {str(e)}")
-
-# Konfiguracja SMTP dla powiadomień email
-SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
-SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
-SMTP_USERNAME = os.environ.get("SMTP_USERNAME")
-SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
-SENDER_EMAIL = os.environ.get("SENDER_EMAIL", SMTP_USERNAME)
+HAS_TWILIO = is_sms_configured()
+if not HAS_TWILIO:
+    logger.warning("Brak konfiguracji Twilio (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER). "
+                   "Powiadomienia SMS są niedostępne.")
+
+# Konfiguracja SMTP dla powiadomień email (pula sesji w email_delivery)
+from email_delivery import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SENDER_EMAIL, get_email_sender
+
+# Liczba użytkowników uzupełnianych w jednej transakcji przez backfill_next_reminder_at()
+BACKFILL_BATCH_SIZE = int(os.environ.get("REMINDER_BACKFILL_BATCH_SIZE", 1000))
 
 def send_email_reminder(user):
     """
@@ -64,46 +41,13 @@ def send_email_reminder(user):
     if not SMTP_USERNAME or not SMTP_PASSWORD:
         return False, "Brak konfiguracji SMTP"
         
-    try:
-        # Utwórz wiadomość
-        msg = MIMEMultipart()
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = user.email
-        msg['Subject'] = "Przypomnienie o codziennej refleksji"
-        
-        # Treść wiadomości
-        body = f"""
-        Cześć {user.username}!
-        
-        To Twoje codzienne przypomnienie o refleksji terapeutycznej.
-        Poświęć kilka minut, aby odpowiedzieć na pytanie dnia i zbliżyć się do lepszego zrozumienia siebie.
-        
-        Przejdź do aplikacji: https://terapia.replit.app
-        
-        Pozdrawiamy,
-        Zespół RefleksjaApp
-        
-        ---
-        To jest wiadomość automatyczna. Możesz wyłączyć lub zmodyfikować powiadomienia w ustawieniach swojego konta.
-        """
-        
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Połącz z serwerem i wyślij
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(SENDER_EMAIL, user.email, text)
-        server.quit()
-        
+    # Wiadomość jest składana z gotowego szablonu i wysyłana przez współdzieloną sesję SMTP
+    success, error_msg = get_email_sender().send(user.email, user.username)
+    if success:
         logger.info(f"Wysłano przypomnienie e-mail do użytkownika {user.username}")
-        return True, None
-        
-    except Exception as e:
-        error_msg = str(e)
+    else:
         logger.error(f"Błąd podczas wysyłania e-mail do {user.username}: {error_msg}")
-        return False, error_msg
+    return success, error_msg
 
 def send_sms_reminder(user):
     """
@@ -115,50 +59,31 @@ def send_sms_reminder(user):
     Returns:
         tuple: (sukces: bool, komunikat błędu: str lub None)
     """
-    if not HAS_TWILIO or not twilio_client:
+    if not HAS_TWILIO:
         return False, "Brak konfiguracji Twilio"
         
     if not user.phone_number:
         return False, "Brak numeru telefonu użytkownika"
     
-    try:
-        # Treść wiadomości SMS
-        message_body = f"Refleksja: Przypominamy o codziennej refleksji terapeutycznej. Poświęć chwilę na odpowiedź w aplikacji."
-        
-        # Wyślij wiadomość
-        message = twilio_client.messages.create(
-            body=message_body,
-            from_=os.environ.get("TWILIO_PHONE_NUMBER"),
-            to=user.phone_number
-        )
-        
-        logger.info(f"Wysłano przypomnienie SMS do użytkownika {user.username} (SID: {message.sid})")
-        return True, None
-        
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Błąd podczas wysyłania SMS do {user.username}: {error_msg}")
-        return False, error_msg
+    result = get_sms_dispatcher().send_batch([(user.phone_number, SMS_REMINDER_BODY)])[0]
+    if result["success"]:
+        logger.info(f"Wysłano przypomnienie SMS do użytkownika {user.username} (SID: {result['sid']})")
+    else:
+        logger.error(f"Błąd podczas wysyłania SMS do {user.username}: {result['error']}")
+    return result["success"], result["error"]
 
-def send_reminder(user):
+def record_reminder_result(user, success, error):
     """
-    Wysyła przypomnienie do użytkownika wybraną przez niego metodą.
-    
+    Zapisuje wynik wysyłki przypomnienia (ReminderLog, czas ostatniej wysyłki i termin następnej).
+
     Args:
         user: Obiekt User z modelu danych
-        
-    Returns:
-        tuple: (sukces: bool, komunikat błędu: str lub None)
+        success (bool): Czy przypomnienie zostało wysłane
+        error (str): Komunikat błędu lub None
     """
     from models import ReminderLog
-    from app import db
-    
-    # Wybierz metodę wysyłki
-    if user.reminder_method == 'sms':
-        success, error = send_sms_reminder(user)
-    else:  # domyślnie email
-        success, error = send_email_reminder(user)
-    
+    from database import db
+
     # Zapisz log
     log = ReminderLog(
         user_id=user.id,
@@ -166,44 +91,86 @@ def send_reminder(user):
         status='success' if success else 'failed',
         error_message=error
     )
-    
-    # Aktualizuj czas ostatniego przypomnienia
+
+    # Aktualizuj czas ostatniego przypomnienia i termin następnego
     if success:
         user.last_reminder_sent = datetime.now(pytz.utc)
-    
+        user.schedule_next_reminder()
+
     # Zapisz zmiany w bazie
     db.session.add(log)
     db.session.commit()
+
+def send_reminder(user):
+    """
+    Wysyła przypomnienie do użytkownika wybraną przez niego metodą.
     
+    Args:
+        user: Obiekt User z modelu danych
+        
+    Returns:
+        tuple: (sukces: bool, komunikat błędu: str lub None)
+    """
+    # Wybierz metodę wysyłki
+    if user.reminder_method == 'sms':
+        success, error = send_sms_reminder(user)
+    else:  # domyślnie email
+        success, error = send_email_reminder(user)
+
+    record_reminder_result(user, success, error)
     return success, error
 
+def backfill_next_reminder_at():
+    """
+    Wylicza next_reminder_at dla użytkowników z włączonymi przypomnieniami,
+    którzy go jeszcze nie mają (np. zaraz po dodaniu kolumny).
+
+    Returns:
+        int: Liczba uzupełnionych użytkowników
+    """
+    from models import User
+    from database import db
+
+    filled = 0
+    while True:
+        users = User.query.filter(User.reminder_enabled.is_(True), User.next_reminder_at.is_(None))\
+            .limit(BACKFILL_BATCH_SIZE).all()
+        if not users:
+            break
+        for user in users:
+            user.schedule_next_reminder()
+        db.session.commit()
+        filled += len(users)
+
+    if filled:
+        logger.info(f"Uzupełniono termin następnego przypomnienia dla {filled} użytkowników")
+    return filled
+
 def check_and_send_due_reminders():
     """
     Sprawdza i wysyła zaplanowane przypomnienia dla wszystkich użytkowników.
-    
+
+    Zaległe przypomnienia (zapytanie zakresowe po indeksie next_reminder_at)
+    są wstawiane zbiorczo do skrzynki nadawczej ReminderOutbox, a następnie
+    wysyłane paczkami z zapisem wyników w jednej transakcji na paczkę.
+    Kilka procesów może wykonywać tę funkcję równolegle.
+
     Returns:
         int: Liczba wysłanych przypomnień
     """
-    from models import User
-    from app import db
-    
+    from reminder_outbox import enqueue_due_reminders, process_outbox
+
     logger.info("Sprawdzanie przypomnień do wysłania...")
-    users = User.query.filter_by(reminder_enabled=True).all()
-    sent_count = 0
-    
-    for user in users:
-        if user.is_reminder_due():
-            logger.info(f"Wysyłanie przypomnienia do {user.username}")
-            success, error = send_reminder(user)
-            
-            if success:
-                sent_count += 1
-    
-    logger.info(f"Wysłano {sent_count} przypomnień spośród {len(users)} aktywnych użytkowników")
+    backfill_next_reminder_at()
+
+    enqueued = enqueue_due_reminders()
+    sent_count, failed_count = process_outbox()
+
+    logger.info(f"Wysłano {sent_count} przypomnień (nowych w skrzynce nadawczej: {enqueued}, "
+                f"nieudanych: {failed_count})")
     return sent_count
 
-# Jeśli ten plik jest uruchamiany bezpośrednio, sprawdź i wyślij przypomnienia
+# Jeśli ten plik jest uruchamiany bezpośrednio, sprawdź i wyślij przypomnienia (lekki proces, bez aplikacji webowej)
 if __name__ == "__main__":
-    from app import app
-    with app.app_context():
-        check_and_send_due_reminders()
\ No newline at end of file
+    from reminder_worker import main
+    main()
@@ -0,0 +1,176 @@
+"""
+Renderowanie wykresów i chmur słów w puli procesów.
+
+Rysowanie w matplotlib jest intensywne obliczeniowo i trzyma GIL, a globalny
+stan pyplot nie jest bezpieczny wątkowo. Wątki obsługujące żądania przekazują
+więc do osobnych procesów wyłącznie proste dane (daty, wyniki, słowniki
+częstotliwości) i otrzymują gotowe bajty PNG. Każde renderowanie ma limit czasu -
+po jego przekroczeniu procesy puli są zatrzymywane, a pula tworzona od nowa.
+
+Procesy robocze są kopiami serwera 'forkserver' z wczytanymi modułami
+rysującymi, a nie procesu aplikacji (z jej wątkami i połączeniami z bazą).
+multiprocessing wykonuje w każdym z nich ponownie skrypt główny jako
+'__mp_main__' - app.py i main.py pomijają wtedy operacje na bazie danych
+i wątki robocze (MULTIPROCESSING_HELPER w app.py).
+
+Dostępne rodzaje: 'emotion', 'ei-progress', 'wordcloud' (payloady budują
+visualization.build_*_payload i wordcloud_analyzer.build_wordcloud_payload).
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Liczba procesów renderujących
+RENDER_POOL_WORKERS = int(os.environ.get("RENDER_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Maksymalny czas pojedynczego renderowania (w sekundach)
+RENDER_TIMEOUT = float(os.environ.get("RENDER_TIMEOUT", 10))
+
+# Nazwy funkcji rysujących: rodzaj -> (moduł, funkcja)
+RENDERERS = {
+    "emotion": ("visualization", "draw_emotion_chart"),
+    "ei-progress": ("visualization", "draw_ei_progress_chart"),
+    "wordcloud": ("wordcloud_analyzer", "draw_wordcloud"),
+}
+
+# Moduły wczytywane raz w serwerze forkserver (dziedziczone przez procesy robocze)
+FORKSERVER_PRELOAD = ["render_service", "visualization", "wordcloud_analyzer"]
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+render_stats = {"renders": 0, "timeouts": 0, "errors": 0, "pool_restarts": 0, "render_seconds": 0.0}
+
+
+def _init_worker():
+    # Backend bez interfejsu graficznego, ustawiony przed pierwszym importem modułów rysujących
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_in_worker(kind, payload):
+    """Wykonywane w procesie roboczym: rysuje wykres i zwraca bajty PNG."""
+    import importlib
+
+    module_name, function_name = RENDERERS[kind]
+    return getattr(importlib.import_module(module_name), function_name)(payload)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'forkserver' - proces aplikacji ma już wątki i połączenia z bazą, których nie wolno
+            # kopiować przez fork(); procesy robocze są kopiami serwera z modułami rysującymi
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(FORKSERVER_PRELOAD)
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_POOL_WORKERS,
+                mp_context=context,
+                initializer=_init_worker
+            )
+        return _pool
+
+
+def _restart_pool(old_pool, terminate=False):
+    """
+    Zastępuje pulę nową (przy następnym renderowaniu).
+
+    Args:
+        old_pool: Pula do zamknięcia
+        terminate (bool): Zatrzymaj procesy robocze (np. zawieszone renderowanie po
+                          przekroczeniu czasu); trwające w nich renderowania kończą się błędem
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is old_pool:
+            _pool = None
+            with _stats_lock:
+                render_stats["pool_restarts"] += 1
+    if terminate:
+        # ProcessPoolExecutor nie udostępnia zatrzymania procesów (przed Pythonem 3.14)
+        for process in list((getattr(old_pool, "_processes", None) or {}).values()):
+            if process.is_alive():
+                process.terminate()
+    old_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _count(counter, seconds=None):
+    with _stats_lock:
+        render_stats[counter] += 1
+        if seconds is not None:
+            render_stats["render_seconds"] += seconds
+
+
+def render(kind, payload, timeout=None):
+    """
+    Renderuje obraz w puli procesów.
+
+    Args:
+        kind (str): Rodzaj obrazu (klucz RENDERERS)
+        payload (dict): Dane obrazu (tylko proste typy)
+        timeout (float, optional): Limit czasu w sekundach (domyślnie RENDER_TIMEOUT)
+
+    Returns:
+        bytes lub None: Obraz PNG lub None po przekroczeniu limitu czasu albo błędzie
+    """
+    if kind not in RENDERERS:
+        raise ValueError(f"Nieznany rodzaj obrazu: {kind}")
+
+    timeout = RENDER_TIMEOUT if timeout is None else timeout
+    pool = _get_pool()
+    start = time.monotonic()
+    try:
+        future = pool.submit(_render_in_worker, kind, payload)
+        png = future.result(timeout=timeout)
+        _count("renders", time.monotonic() - start)
+        return png
+    except FutureTimeoutError:
+        _count("timeouts")
+        if future.cancel():
+            # Zadanie czekało w kolejce (pula zajęta) - procesy pracują, nie ma czego zatrzymywać
+            logger.error(f"Przekroczono limit czasu renderowania '{kind}' ({timeout} s) w kolejce")
+        else:
+            # Zawieszone renderowanie blokowałoby proces roboczy - zatrzymujemy pulę i tworzymy nową
+            logger.error(f"Przekroczono limit czasu renderowania '{kind}' ({timeout} s) - tworzę nową pulę")
+            _restart_pool(pool, terminate=True)
+    except BrokenProcessPool:
+        _count("errors")
+        logger.error("Proces renderujący uległ awarii - tworzę nową pulę")
+        _restart_pool(pool)
+    except Exception as e:
+        _count("errors")
+        logger.error(f"Błąd podczas renderowania '{kind}': {str(e)}")
+    return None
+
+
+def get_render_stats():
+    """
+    Zwraca liczniki usługi renderowania.
+
+    Returns:
+        dict: Liczba renderowań, przekroczeń czasu, błędów, restartów puli i średni czas
+    """
+    with _stats_lock:
+        stats = dict(render_stats)
+    stats["workers"] = RENDER_POOL_WORKERS
+    stats["avg_render_seconds"] = round(stats["render_seconds"] / stats["renders"], 4) if stats["renders"] else None
+    return stats
+
+
+def shutdown():
+    """Zamyka pulę procesów (np. na końcu benchmarku)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
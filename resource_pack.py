@@ -0,0 +1,234 @@
+"""
+Wersjonowany pakiet zasobów językowych dla języka polskiego, działający bez dostępu do sieci.
+
+Zawiera:
+- polskie stop words (analiza słów kluczowych, chmura słów),
+- słownik emocji EMOTION_WORDS (text_emotion_analyzer.py),
+- słowa kluczowe tematów KEYWORDS (therapy.py),
+- skróty dla podziału tekstu na zdania (split_sentences zastępuje nltk.sent_tokenize).
+
+Źródła są plikami tekstowymi w resources/pl/. Polecenie
+`python resource_pack.py build` kompiluje je do jednego pliku pickle
+(zbiory frozenset, krotki i indeks słowo -> emocja), który ładuje się
+w ułamku milisekundy. Plik zawiera wersję formatu i skrót źródeł - gdy
+nie pasują (albo pliku brak), pakiet jest kompilowany w pamięci ze źródeł.
+
+Użycie:
+    python resource_pack.py build
+    python resource_pack.py check
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import hashlib
+import logging
+import functools
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Wersja formatu pakietu - zmiana wymusza ponowne zbudowanie pliku
+PACK_VERSION = 1
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Katalog plików źródłowych
+RESOURCE_DIR = os.path.join(_BASE_DIR, "resources", "pl")
+
+# Skompilowany pakiet (dołączany do repozytorium i obrazu aplikacji)
+RESOURCE_PACK_PATH = os.environ.get(
+    "RESOURCE_PACK_PATH",
+    os.path.join(_BASE_DIR, "resources", f"pl_pack.v{PACK_VERSION}.pickle")
+)
+
+SOURCE_FILES = ("stopwords.txt", "abbreviations.txt", "emotion_words.json", "theme_keywords.json")
+
+# Skróty, po których zdanie zwykle się kończy, jeśli następne słowo zaczyna się wielką literą
+_SENTENCE_FINAL_ABBREVIATIONS = frozenset({"itd", "itp"})
+
+# Znaki kończące zdanie (z ewentualnym cudzysłowem lub nawiasem) i odstęp po nich
+_BOUNDARY_RE = re.compile(r'[.!?…]+["”»)\']*\s+')
+
+
+class ResourcePack:
+    """Skompilowane zasoby językowe (tylko do odczytu)."""
+
+    def __init__(self, data):
+        self.version = data["version"]
+        self.source_digest = data["source_digest"]
+        self.stopwords = data["stopwords"]
+        self.abbreviations = data["abbreviations"]
+        self.emotion_words = data["emotion_words"]
+        self.emotion_index = data["emotion_index"]
+        self.theme_keywords = data["theme_keywords"]
+
+
+def _read_lines(name):
+    with open(os.path.join(RESOURCE_DIR, name), encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _read_json(name):
+    with open(os.path.join(RESOURCE_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def source_digest():
+    """
+    Oblicza skrót plików źródłowych pakietu.
+
+    Returns:
+        str: Skrót szesnastkowy
+    """
+    digest = hashlib.sha256(str(PACK_VERSION).encode("utf-8"))
+    for name in SOURCE_FILES:
+        with open(os.path.join(RESOURCE_DIR, name), "rb") as f:
+            digest.update(name.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()[:32]
+
+
+def compile_pack():
+    """
+    Kompiluje pliki źródłowe do struktur gotowych do użycia.
+
+    Returns:
+        dict: Dane pakietu (wyłącznie typy wbudowane - bezpieczne do serializacji)
+    """
+    emotion_words = {emotion: tuple(words) for emotion, words in _read_json("emotion_words.json").items()}
+
+    # Indeks odwrotny: słowo -> emocja (sprawdzenie w O(1) zamiast przeszukiwania list)
+    emotion_index = {}
+    for emotion, words in emotion_words.items():
+        for word in words:
+            emotion_index.setdefault(word, emotion)
+
+    return {
+        "version": PACK_VERSION,
+        "source_digest": source_digest(),
+        "stopwords": frozenset(word.lower() for word in _read_lines("stopwords.txt")),
+        "abbreviations": frozenset(abbr.lower() for abbr in _read_lines("abbreviations.txt")),
+        "emotion_words": emotion_words,
+        "emotion_index": emotion_index,
+        "theme_keywords": {theme: tuple(words) for theme, words in _read_json("theme_keywords.json").items()},
+    }
+
+
+def build_pack(path=None):
+    """
+    Buduje plik pakietu (zapis atomowy).
+
+    Args:
+        path (str, optional): Ścieżka pliku (domyślnie RESOURCE_PACK_PATH)
+
+    Returns:
+        str: Ścieżka zapisanego pliku
+    """
+    path = path or RESOURCE_PACK_PATH
+    data = compile_pack()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+@functools.lru_cache(maxsize=1)
+def get_resource_pack():
+    """
+    Zwraca pakiet zasobów, ładowany raz na proces.
+
+    Returns:
+        ResourcePack: Zasoby językowe
+    """
+    try:
+        # Plik pochodzi z repozytorium aplikacji (zaufane źródło)
+        with open(RESOURCE_PACK_PATH, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") == PACK_VERSION and data.get("source_digest") == source_digest():
+            return ResourcePack(data)
+        logger.warning("Pakiet zasobów jest nieaktualny - kompiluję ze źródeł (uruchom: python resource_pack.py build)")
+    except FileNotFoundError:
+        logger.warning(f"Brak pakietu zasobów {RESOURCE_PACK_PATH} - kompiluję ze źródeł")
+    except Exception as e:
+        logger.error(f"Błąd podczas ładowania pakietu zasobów: {str(e)}")
+
+    return ResourcePack(compile_pack())
+
+
+def split_sentences(text):
+    """
+    Dzieli tekst na zdania (zastępuje nltk.sent_tokenize, nie wymaga danych punkt).
+
+    Kropka nie kończy zdania po znanym skrócie (np., tzn., dr), inicjale
+    (J. Kowalski) ani po liczbie, po której tekst jest kontynuowany małą literą (5. maja).
+
+    Args:
+        text (str): Tekst do podziału
+
+    Returns:
+        list: Lista zdań
+    """
+    if not text:
+        return []
+
+    abbreviations = get_resource_pack().abbreviations
+    sentences = []
+    start = 0
+
+    for match in _BOUNDARY_RE.finditer(text):
+        punctuation = match.group().rstrip().rstrip('"”»)\'')
+        if punctuation == ".":
+            words = text[start:match.start()].split()
+            last_word = words[-1] if words else ""
+            next_char = text[match.end():match.end() + 1]
+            if last_word.lower() in abbreviations:
+                if not (last_word.lower() in _SENTENCE_FINAL_ABBREVIATIONS and next_char.isupper()):
+                    continue
+            elif len(last_word) == 1 and last_word.isupper():
+                continue
+            elif last_word.isdigit() and next_char.islower():
+                continue
+
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "check"
+
+    if command == "build":
+        path = build_pack()
+        print(f"Zapisano pakiet zasobów: {path} ({os.path.getsize(path)} B)")
+        return 0
+
+    if command == "check":
+        start = time.perf_counter()
+        with open(RESOURCE_PACK_PATH, "rb") as f:
+            data = pickle.load(f)
+        elapsed = time.perf_counter() - start
+        current = data.get("version") == PACK_VERSION and data.get("source_digest") == source_digest()
+        print(f"Pakiet: {RESOURCE_PACK_PATH} (wersja {data.get('version')}, ładowanie {elapsed * 1000:.2f} ms)")
+        print(f"Stop words: {len(data['stopwords'])}, skróty: {len(data['abbreviations'])}, "
+              f"emocje: {len(data['emotion_words'])}, tematy: {len(data['theme_keywords'])}")
+        print("Aktualny" if current else "NIEAKTUALNY - uruchom: python resource_pack.py build")
+        return 0 if current else 1
+
+    print(f"Nieznane polecenie: {command} (dostępne: build, check)", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Równoległa wysyłka przypomnień SMS przez REST API Twilio (httpx, asyncio).
+
+SmsDispatcher wysyła wiadomości bezpośrednio do endpointu
+/2010-04-01/Accounts/<SID>/Messages.json:
+
+- limit liczby wiadomości na sekundę (SMS_RATE_LIMIT) odpowiadający
+  przepustowości konta Twilio - kolejne wiadomości dostają równomiernie
+  rozłożone terminy wysyłki,
+- ograniczona liczba równoczesnych zapytań (SMS_MAX_CONCURRENCY) na jednym
+  kliencie httpx z pulą połączeń keep-alive,
+- odpowiedź 429 wstrzymuje limiter na czas z nagłówka Retry-After, a wiadomość
+  jest ponawiana (także po błędach 5xx i błędach połączenia, z narastającym
+  opóźnieniem); pozostałe błędy 4xx (np. nieprawidłowy numer) są trwałe,
+- dla każdej wiadomości zapisywany jest czas oczekiwania w kolejce i czas wysyłki.
+
+Adres API można nadpisać zmienną TWILIO_API_BASE_URL (np. na lokalny serwer
+tools/fake_twilio_server.py).
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# httpx loguje każde zapytanie na poziomie INFO - przy wysyłce wsadowej to jeden wpis na SMS
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Konfiguracja Twilio
+TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
+TWILIO_PHONE_NUMBER = os.environ.get("TWILIO_PHONE_NUMBER")
+TWILIO_API_BASE_URL = os.environ.get("TWILIO_API_BASE_URL", "https://api.twilio.com").rstrip("/")
+
+# Limit wiadomości na sekundę (zgodnie z przepustowością numeru / konta Twilio). Limit dotyczy
+# jednego procesu - przy N procesach wysyłających ustaw limit konta podzielony przez N
+SMS_RATE_LIMIT = float(os.environ.get("SMS_RATE_LIMIT", 1.0))
+
+# Maksymalna liczba równoczesnych zapytań do API
+SMS_MAX_CONCURRENCY = int(os.environ.get("SMS_MAX_CONCURRENCY", 10))
+
+# Ponowienia po 429, błędach 5xx i błędach połączenia
+SMS_MAX_RETRIES = int(os.environ.get("SMS_MAX_RETRIES", 3))
+
+# Dłuższe wstrzymanie niż to (z nagłówka Retry-After) kończy wysyłkę wiadomości błędem
+SMS_MAX_RETRY_WAIT = float(os.environ.get("SMS_MAX_RETRY_WAIT", 30.0))
+
+SMS_REQUEST_TIMEOUT = float(os.environ.get("SMS_REQUEST_TIMEOUT", 15.0))
+
+# Liczba zapamiętanych czasów wysyłki (do percentyli w stats())
+SMS_LATENCY_SAMPLES = 1000
+
+SMS_REMINDER_BODY = ("Refleksja: Przypominamy o codziennej refleksji terapeutycznej. "
+                     "Poświęć chwilę na odpowiedź w aplikacji.")
+
+
+def is_sms_configured():
+    return bool(TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER)
+
+
+def _retry_after(headers):
+    """Odczytuje opóźnienie z nagłówka Retry-After (sekundy lub data HTTP)."""
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+class AsyncRateLimiter:
+    """Równomierne rozkładanie wysyłek w czasie (rate na sekundę), z wstrzymaniem po 429."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Czeka na termin wysyłki kolejnej wiadomości."""
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._lock:
+                now = loop.time()
+                slot = max(now, self._next_slot, self._blocked_until)
+                self._next_slot = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            # Wstrzymanie po 429 mogło nastąpić w trakcie oczekiwania
+            if loop.time() >= self._blocked_until:
+                return
+
+    def block_for(self, seconds):
+        """Wstrzymuje wysyłkę (np. zgodnie z nagłówkiem Retry-After)."""
+        loop = asyncio.get_running_loop()
+        self._blocked_until = max(self._blocked_until, loop.time() + seconds)
+        self._next_slot = max(self._next_slot, self._blocked_until)
+
+
+class SmsDispatcher:
+    """Asynchroniczna wysyłka SMS przez Twilio z limitem przepustowości i współbieżności."""
+
+    def __init__(self, account_sid=TWILIO_ACCOUNT_SID, auth_token=TWILIO_AUTH_TOKEN,
+                 from_number=TWILIO_PHONE_NUMBER, base_url=TWILIO_API_BASE_URL, rate=SMS_RATE_LIMIT,
+                 max_concurrency=SMS_MAX_CONCURRENCY, max_retries=SMS_MAX_RETRIES,
+                 max_retry_wait=SMS_MAX_RETRY_WAIT, timeout=SMS_REQUEST_TIMEOUT):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.timeout = timeout
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"sent": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+        self._latencies = deque(maxlen=SMS_LATENCY_SAMPLES)
+
+    def _count(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    async def _send_one(self, client, limiter, semaphore, to, body):
+        """
+        Wysyła jedną wiadomość (z ponowieniami).
+
+        Returns:
+            dict: success, error, permanent (błąd trwały - ponawianie nie ma sensu), sid,
+                  attempts, wait (czas w kolejce limitera [s]),
+                  latency (od pierwszego zapytania do ostatecznej odpowiedzi [s])
+        """
+        import httpx
+
+        result = {"success": False, "error": None, "permanent": False, "sid": None, "attempts": 0,
+                  "wait": 0.0, "latency": None}
+        queued = time.perf_counter()
+        started = None
+        data = {"To": to, "From": self.from_number, "Body": body}
+
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                wait_start = time.perf_counter()
+                await limiter.acquire()
+                result["wait"] += time.perf_counter() - wait_start
+                if started is None:
+                    started = time.perf_counter()
+                result["attempts"] = attempt + 1
+
+                delay = None
+                try:
+                    response = await client.post(self.url, data=data)
+                except httpx.HTTPError as e:
+                    result["error"] = f"{e.__class__.__name__}: {str(e)}"
+                else:
+                    # Treść bywa inna niż JSON (np. strona błędu pośrednika)
+                    try:
+                        payload = response.json()
+                    except ValueError:
+                        payload = {}
+                    if not isinstance(payload, dict):
+                        payload = {}
+                    if response.status_code in (200, 201):
+                        # Wiadomość przyjęta - brak sid w odpowiedzi nie jest błędem
+                        result["success"] = True
+                        result["error"] = None
+                        result["sid"] = payload.get("sid")
+                        break
+                    result["error"] = f"{response.status_code} {payload.get('code', '')} {payload.get('message', response.text[:200])}".strip()
+                    if response.status_code == 429:
+                        self._count("rate_limited")
+                        delay = _retry_after(response.headers)
+                        delay = 1.0 if delay is None else delay
+                        if delay > self.max_retry_wait:
+                            break
+                        limiter.block_for(delay)
+                    elif response.status_code < 500:
+                        # Błąd trwały (np. 400 / 21211 - nieprawidłowy numer) - bez ponawiania
+                        result["permanent"] = True
+                        break
+
+                if attempt < self.max_retries:
+                    self._count("retries")
+                    if delay is None:
+                        await asyncio.sleep(min(5.0, 0.25 * 2 ** attempt) * random.uniform(0.8, 1.2))
+
+        result["latency"] = time.perf_counter() - (started or queued)
+        if result["success"]:
+            self._count("sent")
+            with self._stats_lock:
+                self._latencies.append(result["latency"])
+        else:
+            self._count("failed")
+        return result
+
+    async def send_many(self, messages):
+        """
+        Wysyła wiele wiadomości równolegle (z limitem na sekundę i limitem współbieżności).
+
+        Args:
+            messages (list): Lista par (numer telefonu, treść)
+
+        Returns:
+            list: Wyniki (słowniki z _send_one) w kolejności wiadomości
+        """
+        import httpx
+
+        if not messages:
+            return []
+
+        limiter = AsyncRateLimiter(self.rate)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limits = httpx.Limits(max_connections=self.max_concurrency,
+                              max_keepalive_connections=self.max_concurrency)
+        async with httpx.AsyncClient(auth=(self.account_sid, self.auth_token), timeout=self.timeout,
+                                     limits=limits) as client:
+            return await asyncio.gather(*(
+                self._send_one(client, limiter, semaphore, to, body) for to, body in messages
+            ))
+
+    def send_batch(self, messages):
+        """Synchroniczna wersja send_many() (dla harmonogramu i widoków Flask)."""
+        return asyncio.run(self.send_many(messages))
+
+    def latency_percentile(self, percentile):
+        with self._stats_lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile * (len(samples) - 1))))
+        return samples[index]
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["latency_p50"] = self.latency_percentile(0.5)
+        stats["latency_p95"] = self.latency_percentile(0.95)
+        return stats
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_sms_dispatcher():
+    """Zwraca współdzielony SmsDispatcher (tworzony przy pierwszym użyciu)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = SmsDispatcher()
+        return _dispatcher
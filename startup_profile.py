@@ -0,0 +1,154 @@
+"""
+Profil startu procesu aplikacji na podstawie danych `python -X importtime`.
+
+Importuje wskazane moduły (domyślnie `app`) w osobnym, czystym interpreterze
+i raportuje:
+- łączny czas do zakończenia importu (czyli do gotowości na pierwsze żądanie),
+- maksymalne zużycie pamięci (RSS) procesu,
+- najcięższe pakiety (suma czasów własnych wszystkich ich modułów),
+- które z ciężkich, opcjonalnych bibliotek zostały załadowane przy starcie.
+
+Użycie:
+    python main.py --profile-startup
+    python startup_profile.py --module app --top 30
+    python startup_profile.py --module reminders --module app
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+# Biblioteki, które powinny ładować się dopiero przy pierwszym użyciu (lazy_import.py)
+HEAVY_MODULES = (
+    "matplotlib", "numpy", "wordcloud", "PIL", "nltk", "anthropic", "openai",
+    "httpx", "google.cloud.aiplatform", "tensorflow", "librosa", "scipy", "twilio"
+)
+
+# Kod wykonywany w procesie potomnym: import modułów i pomiar czasu oraz pamięci
+# (json i resource importujemy po pomiarze, żeby nie zaciemniały wyników)
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+import json, resource
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = [name for name in {heavy!r} if name in sys.modules]
+sys.stdout.write(json.dumps({{"seconds": elapsed, "max_rss_kb": rss_kb, "heavy_loaded": heavy}}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parsuje wynik `-X importtime` (linie "import time: self [us] | cumulative | moduł").
+
+    Returns:
+        list: Krotki (moduł, czas_własny_us, czas_skumulowany_us, poziom_zagnieżdżenia)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def group_by_package(rows):
+    """Sumuje czasy własne modułów według pakietu najwyższego poziomu (w mikrosekundach)."""
+    totals = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def profile_startup(modules, env=None):
+    """
+    Uruchamia import modułów w nowym interpreterze z `-X importtime`.
+
+    Args:
+        modules (list): Nazwy modułów do zaimportowania
+        env (dict, optional): Zmienne środowiskowe procesu potomnego
+
+    Returns:
+        dict: Czas importu, maksymalny RSS, załadowane ciężkie biblioteki i wiersze importtime
+    """
+    probe = _PROBE.format(modules=list(modules), heavy=list(HEAVY_MODULES))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        tail = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"Import {', '.join(modules)} nie powiódł się:\n{tail[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["imports"] = parse_importtime(result.stderr)
+    return report
+
+
+def print_report(modules, report, top=20):
+    """Wypisuje czytelny raport startu."""
+    rows = report["imports"]
+    print(f"Moduły: {', '.join(modules)}")
+    print(f"Czas importu: {report['seconds'] * 1000:.0f} ms")
+    print(f"Maksymalny RSS: {report['max_rss_kb'] / 1024:.1f} MB")
+    print(f"Zaimportowane moduły: {len(rows)}")
+    heavy = report["heavy_loaded"]
+    print(f"Ciężkie biblioteki załadowane przy starcie: {', '.join(heavy) if heavy else 'brak'}")
+    print()
+
+    print(f"{'pakiet':<32} {'czas własny [ms]':>18}")
+    print("-" * 51)
+    for package, self_us in group_by_package(rows)[:top]:
+        print(f"{package:<32} {self_us / 1000:>18.1f}")
+    print()
+
+    # Importy bezpośrednio z kodu aplikacji (poziom 0) - skąd bierze się czas startu
+    print(f"{'import najwyższego poziomu':<40} {'skumulowany [ms]':>18}")
+    print("-" * 59)
+    direct = sorted((row for row in rows if row[3] == 0), key=lambda row: row[2], reverse=True)
+    for name, _, cumulative_us, _ in direct[:top]:
+        print(f"{name:<40} {cumulative_us / 1000:>18.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", dest="modules",
+                        help="moduł do zaimportowania (można podać wiele razy, domyślnie: app)")
+    parser.add_argument("--top", type=int, default=20, help="liczba wierszy w tabelach")
+    parser.add_argument("--json", action="store_true", help="wynik w formacie JSON (bez wierszy importtime)")
+    args = parser.parse_args(argv)
+    modules = args.modules or ["app"]
+
+    env = dict(os.environ)
+    # app.py wymaga klucza sesji - do profilowania wystarczy dowolna wartość
+    env.setdefault("SESSION_SECRET", "startup-profile")
+
+    try:
+        report = profile_startup(modules, env)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    if args.json:
+        report.pop("imports")
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(modules, report, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
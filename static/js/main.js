@@ -38,7 +38,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 document.getElementById('submit-response').disabled = true;
             } else {
                 charCounter.classList.remove('text-danger');
-                document.getElementById('submit-response').disabled = false;
+                // Nie odblokowuj formularza, dopóki pytanie jest jeszcze generowane
+                document.getElementById('submit-response').disabled = this.form.dataset.awaitingQuestion === 'true';
             }
         });
         
@@ -60,4 +61,300 @@ document.addEventListener('DOMContentLoaded', function() {
     // Enable tooltips
     const tooltipTriggerList = document.querySelectorAll('[data-bs-toggle="tooltip"]');
     const tooltipList = [...tooltipTriggerList].map(tooltipTriggerEl => new bootstrap.Tooltip(tooltipTriggerEl));
+
+    // Strumieniowe generowanie pytania (Server-Sent Events)
+    const streamedQuestion = document.getElementById('streamed-question');
+    if (streamedQuestion && window.EventSource) {
+        const source = new EventSource(streamedQuestion.dataset.streamSrc);
+        source.addEventListener('token', function(e) {
+            streamedQuestion.textContent += JSON.parse(e.data).text;
+        });
+        source.addEventListener('done', function(e) {
+            const data = JSON.parse(e.data);
+            source.close();
+            streamedQuestion.textContent = data.question;
+            document.getElementById('conversation-id').value = data.conversation_id;
+            const form = streamedQuestion.closest('.card-body').querySelector('.response-form');
+            if (form) {
+                delete form.dataset.awaitingQuestion;
+                document.getElementById('submit-response').disabled = false;
+            }
+        });
+        source.addEventListener('error', function() {
+            source.close();
+            if (!document.getElementById('conversation-id').value) {
+                window.location.reload();
+            }
+        });
+    }
+
+    // Strumieniowe generowanie analizy psychologicznej (Server-Sent Events)
+    const analysisStream = document.getElementById('analysis-stream');
+    if (analysisStream && window.EventSource) {
+        const output = analysisStream.querySelector('.analysis-stream-output');
+        const source = new EventSource(analysisStream.dataset.streamSrc);
+        source.addEventListener('token', function(e) {
+            output.textContent += JSON.parse(e.data).text;
+            output.scrollTop = output.scrollHeight;
+        });
+        source.addEventListener('done', function() {
+            source.close();
+            window.location.href = analysisStream.dataset.reloadUrl;
+        });
+        source.addEventListener('error', function() {
+            source.close();
+            analysisStream.remove();
+        });
+    }
+
+    // Odświeżanie analizy w tle - sprawdzaj stan zadania i podmień stronę po zakończeniu
+    const analysisRefresh = document.getElementById('analysis-refresh');
+    if (analysisRefresh) {
+        const pollStatus = function() {
+            fetch(analysisRefresh.dataset.statusUrl, { credentials: 'same-origin' })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.status === 'done') {
+                        window.location.href = analysisRefresh.dataset.reloadUrl;
+                    } else if (data.status === 'failed' || data.error) {
+                        analysisRefresh.remove();
+                    } else {
+                        setTimeout(pollStatus, 2000);
+                    }
+                })
+                .catch(() => setTimeout(pollStatus, 5000));
+        };
+        setTimeout(pollStatus, 2000);
+    }
+
+    // Wykresy analizy rysowane w przeglądarce na podstawie danych JSON
+    // (obrazy PNG z /charts/ są używane tylko bez JavaScriptu lub po błędzie)
+    const clientCharts = document.querySelectorAll('canvas.client-chart');
+    if (clientCharts.length) {
+        const chartData = {};
+        const fetchChartData = function(src) {
+            if (!chartData[src]) {
+                chartData[src] = fetch(src, { credentials: 'same-origin' }).then(response => {
+                    if (!response.ok) {
+                        throw new Error('HTTP ' + response.status);
+                    }
+                    return response.json();
+                });
+            }
+            return chartData[src];
+        };
+        clientCharts.forEach(function(canvas) {
+            fetchChartData(canvas.dataset.src)
+                .then(data => {
+                    if (!drawClientChart(canvas, data)) {
+                        showChartFallback(canvas);
+                    }
+                })
+                .catch(() => showChartFallback(canvas));
+        });
+    }
 });
+
+// Kolory linii poszczególnych emocji (jak w visualization.EMOTION_COLORS)
+const EMOTION_COLORS = {
+    'Radość': '#28a745',
+    'Smutek': '#0d6efd',
+    'Lęk': '#fd7e14',
+    'Gniew': '#dc3545',
+    'Zaskoczenie': '#0dcaf0'
+};
+const EI_COLOR = '#a855f7';
+const WORDCLOUD_COLORS = ['#fde725', '#90d743', '#35b779', '#21918c', '#31688e', '#443983'];
+
+function drawClientChart(canvas, data) {
+    if (canvas.dataset.chart === 'emotion' && data.emotion) {
+        const series = [{ label: 'Inteligencja Emocjonalna', color: EI_COLOR, points: zipPoints(data.emotion.dates, data.emotion.ei_scores) }];
+        Object.keys(data.emotion.emotions).forEach(function(emotion) {
+            const points = data.emotion.emotions[emotion];
+            if (points.length > 1) {
+                series.push({ label: emotion, color: EMOTION_COLORS[emotion] || '#adb5bd', dashed: true, axis: 'right',
+                              points: points.map(p => [Date.parse(p[0]), p[1]]) });
+            }
+        });
+        // Wynik EI (0-100) na lewej osi, intensywność emocji (1-5) na prawej
+        drawLineChart(canvas, series, { yMin: 0, yMax: 100, y2Min: 0, y2Max: 5 });
+        return true;
+    }
+    if (canvas.dataset.chart === 'ei-progress' && data.ei_progress) {
+        const points = zipPoints(data.ei_progress.dates, data.ei_progress.ei_scores);
+        const series = [{ label: 'Wynik', color: EI_COLOR, points: points }];
+        if (points.length > 2) {
+            series.push({ label: 'Trend', color: '#dc3545', dashed: true, markers: false, points: trendLine(points) });
+        }
+        drawLineChart(canvas, series, { yMin: 0, yMax: 100 });
+        return true;
+    }
+    if (canvas.dataset.chart === 'wordcloud' && data.keywords && data.keywords.length) {
+        drawWordCloud(canvas, data.keywords);
+        return true;
+    }
+    return false;
+}
+
+function showChartFallback(canvas) {
+    const img = document.createElement('img');
+    img.src = canvas.dataset.fallbackSrc;
+    img.className = 'img-fluid rounded';
+    img.alt = canvas.getAttribute('aria-label') || '';
+    canvas.replaceWith(img);
+}
+
+function zipPoints(dates, values) {
+    return dates.map((d, i) => [Date.parse(d), values[i]]);
+}
+
+function trendLine(points) {
+    // Regresja liniowa metodą najmniejszych kwadratów (jak np.polyfit(x, y, 1) na serwerze)
+    const n = points.length;
+    const meanX = points.reduce((sum, p) => sum + p[0], 0) / n;
+    const meanY = points.reduce((sum, p) => sum + p[1], 0) / n;
+    let num = 0, den = 0;
+    points.forEach(function(p) {
+        num += (p[0] - meanX) * (p[1] - meanY);
+        den += (p[0] - meanX) * (p[0] - meanX);
+    });
+    const slope = den ? num / den : 0;
+    const first = points[0][0], last = points[n - 1][0];
+    return [[first, meanY + slope * (first - meanX)], [last, meanY + slope * (last - meanX)]];
+}
+
+function prepareCanvas(canvas) {
+    // Ostry obraz na ekranach o wysokiej gęstości pikseli
+    const ratio = window.devicePixelRatio || 1;
+    const width = canvas.clientWidth;
+    const height = Number(canvas.getAttribute('height'));
+    canvas.style.height = height + 'px';
+    canvas.width = width * ratio;
+    canvas.height = height * ratio;
+    const ctx = canvas.getContext('2d');
+    ctx.scale(ratio, ratio);
+    ctx.font = '12px sans-serif';
+    return { ctx: ctx, width: width, height: height };
+}
+
+function drawLineChart(canvas, series, options) {
+    const { ctx, width, height } = prepareCanvas(canvas);
+    // Druga oś (po prawej) dla serii z axis: 'right', jeśli podano options.y2Max
+    const secondAxis = options.y2Max !== undefined;
+    const pad = { left: 40, right: secondAxis ? 32 : 12, top: 32, bottom: 32 };
+    const times = [].concat.apply([], series.map(s => s.points.map(p => p[0])));
+    let tMin = Math.min.apply(null, times), tMax = Math.max.apply(null, times);
+    if (tMin === tMax) {
+        tMin -= 86400000;
+        tMax += 86400000;
+    }
+    const x = t => pad.left + (t - tMin) / (tMax - tMin) * (width - pad.left - pad.right);
+    const scaleY = (min, max) => v => height - pad.bottom - (v - min) / (max - min) * (height - pad.top - pad.bottom);
+    const y = scaleY(options.yMin, options.yMax);
+    const y2 = secondAxis ? scaleY(options.y2Min, options.y2Max) : y;
+
+    // Siatka i opisy osi
+    ctx.strokeStyle = 'rgba(255, 255, 255, 0.15)';
+    ctx.fillStyle = '#adb5bd';
+    ctx.lineWidth = 1;
+    ctx.setLineDash([4, 4]);
+    for (let i = 0; i <= 5; i++) {
+        const value = options.yMin + (options.yMax - options.yMin) * i / 5;
+        ctx.beginPath();
+        ctx.moveTo(pad.left, y(value));
+        ctx.lineTo(width - pad.right, y(value));
+        ctx.stroke();
+        ctx.textAlign = 'right';
+        ctx.fillText(Number.isInteger(value) ? value : value.toFixed(1), pad.left - 6, y(value) + 4);
+        if (secondAxis) {
+            const value2 = options.y2Min + (options.y2Max - options.y2Min) * i / 5;
+            ctx.textAlign = 'left';
+            ctx.fillText(Number.isInteger(value2) ? value2 : value2.toFixed(1), width - pad.right + 6, y2(value2) + 4);
+        }
+    }
+    const ticks = Math.max(2, Math.min(6, Math.floor((width - pad.left - pad.right) / 80)));
+    ctx.textAlign = 'center';
+    for (let i = 0; i < ticks; i++) {
+        const t = tMin + (tMax - tMin) * i / (ticks - 1);
+        const label = new Date(t).toLocaleDateString('pl-PL', { day: '2-digit', month: '2-digit' });
+        ctx.fillText(label, x(t), height - pad.bottom + 18);
+    }
+
+    // Serie danych
+    series.forEach(function(s) {
+        const sy = s.axis === 'right' ? y2 : y;
+        ctx.setLineDash(s.dashed ? [6, 4] : []);
+        ctx.strokeStyle = s.color;
+        ctx.fillStyle = s.color;
+        ctx.lineWidth = s.dashed ? 1.5 : 2;
+        ctx.beginPath();
+        s.points.forEach((p, i) => i ? ctx.lineTo(x(p[0]), sy(p[1])) : ctx.moveTo(x(p[0]), sy(p[1])));
+        ctx.stroke();
+        if (s.markers !== false) {
+            s.points.forEach(function(p) {
+                ctx.beginPath();
+                ctx.arc(x(p[0]), sy(p[1]), 3, 0, 2 * Math.PI);
+                ctx.fill();
+            });
+        }
+    });
+
+    // Legenda
+    ctx.setLineDash([]);
+    ctx.textAlign = 'left';
+    let legendX = pad.left;
+    series.forEach(function(s) {
+        ctx.fillStyle = s.color;
+        ctx.fillRect(legendX, 10, 12, 12);
+        ctx.fillStyle = '#dee2e6';
+        ctx.fillText(s.label, legendX + 16, 20);
+        legendX += ctx.measureText(s.label).width + 32;
+    });
+}
+
+function drawWordCloud(canvas, keywords) {
+    // Prosty układ wierszowy: słowa od najczęstszych, rozmiar czcionki zależny od liczby wystąpień
+    const { ctx, width, height } = prepareCanvas(canvas);
+    const maxCount = keywords[0][1];
+    const gap = 12;
+    const lines = [];
+    let line = { words: [], width: 0, height: 0 };
+    let usedHeight = 0;
+
+    for (const [word, count] of keywords) {
+        const size = Math.round(14 + 42 * Math.sqrt(count / maxCount));
+        ctx.font = 'bold ' + size + 'px sans-serif';
+        const wordWidth = ctx.measureText(word).width;
+        if (line.words.length && line.width + gap + wordWidth > width - 2 * gap) {
+            lines.push(line);
+            usedHeight += line.height;
+            line = { words: [], width: 0, height: 0 };
+        }
+        if (usedHeight + size * 1.2 > height) {
+            break;
+        }
+        line.words.push({ word: word, size: size, width: wordWidth });
+        line.width += (line.words.length > 1 ? gap : 0) + wordWidth;
+        line.height = Math.max(line.height, size * 1.2);
+    }
+    if (line.words.length) {
+        lines.push(line);
+        usedHeight += line.height;
+    }
+
+    ctx.fillStyle = '#0d1117';
+    ctx.fillRect(0, 0, width, height);
+    ctx.textBaseline = 'middle';
+    let top = (height - usedHeight) / 2;
+    let colorIndex = 0;
+    lines.forEach(function(l) {
+        let left = (width - l.width) / 2;
+        l.words.forEach(function(w) {
+            ctx.font = 'bold ' + w.size + 'px sans-serif';
+            ctx.fillStyle = WORDCLOUD_COLORS[colorIndex++ % WORDCLOUD_COLORS.length];
+            ctx.fillText(w.word, left, top + l.height / 2);
+            left += w.width + gap;
+        });
+        top += l.height;
+    });
+}
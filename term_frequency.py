@@ -0,0 +1,203 @@
+"""
+Przyrostowo utrzymywana tabela częstotliwości słów użytkownika (UserTermFrequency).
+
+submit_response() dolicza słowa z nowej odpowiedzi (i odlicza słowa
+z poprzedniej, jeśli odpowiedź została zmieniona) w tej samej transakcji,
+w której zapisuje odpowiedź. Koszt zależy od długości odpowiedzi, a nie od
+całej historii, a analiza słów kluczowych staje się zapytaniem top-N po
+indeksie (user_id, count).
+
+Tabela użytkownika jest budowana jednorazowo z historii przy pierwszym
+odczycie (build_user_terms). Obie ścieżki biorą blokadę doradczą PostgreSQL
+dla użytkownika, więc odpowiedź zapisana w trakcie budowania nie zostanie
+ani pominięta, ani policzona dwa razy. Na SQLite (np. lokalna baza przez
+DATABASE_URL) blokada nie jest potrzebna - zapisy są szeregowane przez bazę.
+"""
+
+import logging
+from collections import Counter
+
+# Konfiguracja logowania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Maksymalna długość słowa (kolumna UserTermFrequency.term)
+TERM_MAX_LENGTH = 64
+
+# Liczba wierszy w jednym poleceniu INSERT ... ON CONFLICT
+UPSERT_CHUNK_SIZE = 1000
+
+# Przestrzeń nazw blokad doradczych (pg_advisory_xact_lock(przestrzeń, user_id))
+_ADVISORY_LOCK_NAMESPACE = 7316
+
+
+def _lock_user(user_id):
+    """Blokada doradcza użytkownika, zwalniana automatycznie na końcu transakcji (tylko PostgreSQL)."""
+    from sqlalchemy import text
+    from database import db
+
+    if db.engine.dialect.name != "postgresql":
+        return
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:namespace, :user_id)"),
+                       {"namespace": _ADVISORY_LOCK_NAMESPACE, "user_id": user_id})
+
+
+def _insert(table):
+    """INSERT z obsługą ON CONFLICT dla bieżącej bazy (PostgreSQL lub SQLite)."""
+    from database import db
+
+    if db.engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
+
+
+def _is_indexed(user_id):
+    from database import db
+    from models import UserTermIndex
+
+    return db.session.query(UserTermIndex.id).filter_by(user_id=user_id).first() is not None
+
+
+def _upsert_counts(user_id, counts):
+    """
+    Dodaje liczniki słów jednym poleceniem INSERT ... ON CONFLICT DO UPDATE na paczkę wierszy.
+
+    Args:
+        user_id (int): ID użytkownika
+        counts (dict): {słowo: zmiana_liczby_wystąpień} (wartości mogą być ujemne)
+    """
+    from sqlalchemy import delete
+    from database import db
+    from models import UserTermFrequency
+
+    table = UserTermFrequency.__table__
+    rows = [{"user_id": user_id, "term": term, "count": count}
+            for term, count in counts.items() if count and len(term) <= TERM_MAX_LENGTH]
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = _insert(table).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        # Kolumny ograniczenia uq_user_term_frequency_user_term (SQLite nie przyjmuje nazwy ograniczenia)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "term"],
+            set_={"count": table.c.count + stmt.excluded.count}
+        )
+        db.session.execute(stmt)
+
+    if any(row["count"] < 0 for row in rows):
+        db.session.execute(delete(table).where(table.c.user_id == user_id, table.c.count <= 0))
+
+
+def _invalidate(user_id):
+    """Usuwa znacznik zbudowania - tabela zostanie odbudowana z historii przy następnym odczycie."""
+    from database import db
+    from models import UserTermIndex
+
+    try:
+        UserTermIndex.query.filter_by(user_id=user_id).delete()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Błąd podczas unieważniania częstotliwości słów użytkownika {user_id}: {str(e)}")
+
+
+def record_response_terms(user_id, old_response, new_response):
+    """
+    Aktualizuje częstotliwości słów po zapisaniu odpowiedzi.
+
+    Działa w bieżącej transakcji (wywołujący wykonuje commit razem z zapisem
+    odpowiedzi). Błąd nie przerywa zapisu odpowiedzi - tabela użytkownika
+    zostaje wtedy oznaczona do odbudowania.
+
+    Args:
+        user_id (int): ID użytkownika
+        old_response (str): Poprzednia treść odpowiedzi (lub None)
+        new_response (str): Nowa treść odpowiedzi
+    """
+    from database import db
+    from wordcloud_analyzer import count_terms
+
+    delta = count_terms(new_response)
+    delta.subtract(count_terms(old_response))
+    delta = {term: count for term, count in delta.items() if count}
+    if not delta:
+        return
+
+    try:
+        with db.session.begin_nested():
+            _lock_user(user_id)
+            # Jeśli tabela nie jest jeszcze zbudowana, odpowiedź zostanie uwzględniona przy budowaniu
+            if _is_indexed(user_id):
+                _upsert_counts(user_id, delta)
+    except Exception as e:
+        logger.error(f"Błąd podczas aktualizacji częstotliwości słów użytkownika {user_id}: {str(e)}")
+        _invalidate(user_id)
+
+
+def build_user_terms(user_id):
+    """
+    Buduje tabelę częstotliwości słów użytkownika z całej historii odpowiedzi (jednorazowo).
+
+    Args:
+        user_id (int): ID użytkownika
+
+    Returns:
+        bool: True, jeśli tabela jest zbudowana (przez to lub inne wywołanie)
+    """
+    from sqlalchemy import delete
+    from database import db
+    from models import Conversation, UserTermFrequency, UserTermIndex
+    from wordcloud_analyzer import count_terms
+
+    try:
+        _lock_user(user_id)
+        if _is_indexed(user_id):
+            # Inny proces zbudował tabelę, gdy czekaliśmy na blokadę
+            db.session.commit()
+            return True
+
+        counts = Counter()
+        responses = db.session.query(Conversation.response)\
+            .filter(Conversation.user_id == user_id, Conversation.response.isnot(None))\
+            .yield_per(500)
+        for (response,) in responses:
+            counts.update(count_terms(response))
+
+        db.session.execute(delete(UserTermFrequency).where(UserTermFrequency.user_id == user_id))
+        _upsert_counts(user_id, counts)
+        db.session.add(UserTermIndex(user_id=user_id))
+        db.session.commit()
+        logger.info(f"Zbudowano tabelę częstotliwości słów użytkownika {user_id} ({len(counts)} słów)")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Błąd podczas budowania częstotliwości słów użytkownika {user_id}: {str(e)}")
+        return False
+
+
+def get_top_terms(user_id, limit=100):
+    """
+    Zwraca najczęściej używane słowa użytkownika (zapytanie top-N po indeksie).
+
+    Args:
+        user_id (int): ID użytkownika
+        limit (int): Maksymalna liczba słów
+
+    Returns:
+        dict: Słownik {słowo: liczba_wystąpień}, od najczęstszych
+    """
+    from database import db
+    from models import UserTermFrequency
+
+    if not _is_indexed(user_id) and not build_user_terms(user_id):
+        # Awaryjnie: liczenie z pełnej historii
+        from psychology import load_user_responses
+        from wordcloud_analyzer import extract_keywords
+        return extract_keywords(load_user_responses(user_id), max_words=limit)
+
+    rows = db.session.query(UserTermFrequency.term, UserTermFrequency.count)\
+        .filter(UserTermFrequency.user_id == user_id, UserTermFrequency.count > 0)\
+        .order_by(UserTermFrequency.count.desc(), UserTermFrequency.term.asc())\
+        .limit(limit)\
+        .all()
+    return {term: count for term, count in rows}
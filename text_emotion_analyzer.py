@@ -1,93 +1,178 @@
 
-import nltk
 import re
-from collections import defaultdict
 import logging
+from lazy_import import lazy_module
+from resource_pack import get_resource_pack, split_sentences
+
+# NumPy ładowane przy pierwszej analizie wsadowej
+np = lazy_module("numpy")
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Słownik emocji i powiązanych słów (w języku polskim)
-EMOTION_WORDS = {
-    'radość': ['szczęśliwy', 'radosny', 'wesoły', 'zadowolony', 'uśmiechnięty', 'entuzjastyczny'],
-    'smutek': ['smutny', 'przygnębiony', 'zmartwiony', 'zrozpaczony', 'załamany'],
-    'złość': ['zły', 'wściekły', 'zirytowany', 'poirytowany', 'rozzłoszczony'],
-    'strach': ['przestraszony', 'przerażony', 'zaniepokojony', 'wystraszony'],
-    'zaskoczenie': ['zaskoczony', 'zdziwiony', 'zdumiony', 'oszołomiony'],
-    'spokój': ['spokojny', 'zrelaksowany', 'wyciszony', 'opanowany']
-}
+# Słownik emocji i powiązanych słów (w języku polskim) - resources/pl/emotion_words.json
+EMOTION_WORDS = get_resource_pack().emotion_words
+
+# Końcówki fleksyjne przymiotników i imiesłowów (od najdłuższych), np. smutny/smutna/smutnego/smutnymi
+POLISH_INFLECTION_SUFFIXES = ('ymi', 'imi', 'ego', 'emu', 'ych', 'ich', 'ej', 'ym', 'im', 'ą', 'y', 'i', 'a', 'e')
+
+# Minimalna długość rdzenia po odcięciu końcówki
+MIN_STEM_LENGTH = 2
+
+# Słowa: litery (w tym polskie znaki); interpunkcja nie przykleja się do słów
+_WORD_RE = re.compile(r'[a-ząćęłńóśźż]+')
+
+# Separator tekstów w analizie wsadowej i jego kod w indeksie
+_TEXT_SEPARATOR = '\x00'
+_SEPARATOR_ID = -2
+_TOKEN_RE = re.compile(r'[a-ząćęłńóśźż]+|\x00')
+
+# Maksymalna liczba zapamiętanych słów (poza słownikiem emocji)
+LOOKUP_CACHE_MAX_WORDS = 200000
+
+def stem_word(word):
+    """
+    Odcina końcówkę fleksyjną słowa (uproszczony stemming dla przymiotników).
+
+    Args:
+        word (str): Słowo zapisane małymi literami
+
+    Returns:
+        str: Rdzeń słowa
+    """
+    for suffix in POLISH_INFLECTION_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
 
 class TextEmotionAnalyzer:
     def __init__(self):
         self.emotion_words = EMOTION_WORDS
-        
+        self.emotions = list(self.emotion_words.keys())
+
+        # Indeks odwrotny: słowo (lub jego rdzeń) -> numer emocji
+        self._exact_index = {}
+        self._stem_index = {}
+        for emotion_id, emotion in enumerate(self.emotions):
+            for word in self.emotion_words[emotion]:
+                self._exact_index.setdefault(word, emotion_id)
+                self._stem_index.setdefault(stem_word(word), emotion_id)
+
+        # Zapamiętane wyniki wyszukiwania słów (słownictwo użytkowników jest ograniczone)
+        self._lookup_cache = {}
+
+    def _resolve(self, word):
+        """Zwraca numer emocji dla słowa (z uwzględnieniem odmiany) lub -1."""
+        emotion_id = self._exact_index.get(word)
+        if emotion_id is None:
+            emotion_id = self._stem_index.get(stem_word(word), -1)
+        return emotion_id
+
+    def _lookup(self, word):
+        emotion_id = self._lookup_cache.get(word)
+        if emotion_id is None:
+            emotion_id = self._lookup_cache[word] = self._resolve(word)
+        return emotion_id
+
+    def _empty_result(self):
+        return {
+            'dominant_emotion': None,
+            'emotion_scores': {},
+            'emotion_intensity': 0.0
+        }
+
     def analyze_text(self, text):
         """Analizuje tekst pod kątem wyrażanych emocji"""
         if not text:
-            return {
-                'dominant_emotion': None,
-                'emotion_scores': {},
-                'emotion_intensity': 0.0
-            }
-            
-        # Normalizacja tekstu
-        text = text.lower()
-        
-        # Liczenie wystąpień słów związanych z emocjami
-        emotion_counts = defaultdict(int)
-        words = text.split()
-        
-        for word in words:
-            for emotion, emotion_words in self.emotion_words.items():
-                if word in emotion_words:
-                    emotion_counts[emotion] += 1
-                    
-        # Obliczanie wyników
-        total_emotional_words = sum(emotion_counts.values())
-        emotion_scores = {}
-        
-        for emotion in self.emotion_words.keys():
-            count = emotion_counts[emotion]
-            score = count / len(words) if len(words) > 0 else 0
-            emotion_scores[emotion] = round(score * 100, 2)
-            
-        # Określanie dominującej emocji
-        dominant_emotion = max(emotion_scores.items(), key=lambda x: x[1])[0] if emotion_scores else None
-        
-        # Obliczanie intensywności emocjonalnej
-        emotion_intensity = (total_emotional_words / len(words)) * 100 if len(words) > 0 else 0
-        
-        return {
-            'dominant_emotion': dominant_emotion,
-            'emotion_scores': emotion_scores,
-            'emotion_intensity': round(emotion_intensity, 2)
-        }
-        
+            return self._empty_result()
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        """
+        Analizuje wiele tekstów naraz.
+
+        Wszystkie teksty są tokenizowane jednym przebiegiem wyrażenia regularnego,
+        słowa są zamieniane na numery emocji przez indeks odwrotny, a wystąpienia
+        zliczane wektorowo (np.bincount) do macierzy liczba tekstów x liczba emocji.
+
+        Args:
+            texts (list): Lista tekstów
+
+        Returns:
+            list: Wyniki w formacie analyze_text() dla kolejnych tekstów
+        """
+        n_texts = len(texts)
+        n_emotions = len(self.emotions)
+        if not n_texts:
+            return []
+
+        # Jeden przebieg po wszystkich tekstach; separator wyznacza granice tekstów
+        tokens = _TOKEN_RE.findall(_TEXT_SEPARATOR.join(text or '' for text in texts).lower())
+
+        cache = self._lookup_cache
+        if len(cache) > LOOKUP_CACHE_MAX_WORDS:
+            cache.clear()
+        cache[_TEXT_SEPARATOR] = _SEPARATOR_ID
+        for word in set(tokens).difference(cache):
+            cache[word] = self._resolve(word)
+
+        codes = np.fromiter(map(cache.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        separators = codes == _SEPARATOR_ID
+        rows = np.cumsum(separators)
+        words = ~separators
+        hits = codes >= 0
+
+        lengths = np.bincount(rows[words], minlength=n_texts).astype(np.float64)
+        counts = np.bincount(rows[hits] * n_emotions + codes[hits], minlength=n_texts * n_emotions)\
+            .reshape(n_texts, n_emotions)
+
+        # Odsetek słów emocjonalnych (w procentach) dla każdej emocji i łącznie
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(lengths[:, None] > 0, counts / lengths[:, None] * 100, 0.0)
+            intensities = np.where(lengths > 0, counts.sum(axis=1) / lengths * 100, 0.0)
+        scores = np.round(scores, 2)
+        dominant = scores.argmax(axis=1).tolist()
+        scores = scores.tolist()
+        intensities = np.round(intensities, 2).tolist()
+
+        results = []
+        for row, text in enumerate(texts):
+            if not text:
+                results.append(self._empty_result())
+                continue
+            results.append({
+                'dominant_emotion': self.emotions[dominant[row]],
+                'emotion_scores': dict(zip(self.emotions, scores[row])),
+                'emotion_intensity': intensities[row]
+            })
+        return results
+
     def get_emotional_phrases(self, text):
         """Wyodrębnia frazy zawierające wyrażenia emocjonalne"""
         emotional_phrases = []
-        sentences = nltk.sent_tokenize(text)
-        
+        sentences = split_sentences(text)
+
         for sentence in sentences:
-            for emotion, words in self.emotion_words.items():
-                if any(word in sentence.lower() for word in words):
+            emotion_ids = {self._lookup(word) for word in _WORD_RE.findall(sentence.lower())}
+            for emotion_id, emotion in enumerate(self.emotions):
+                if emotion_id in emotion_ids:
                     emotional_phrases.append({
                         'phrase': sentence,
                         'emotion': emotion
                     })
-                    
+
         return emotional_phrases
 
     def analyze_emotional_changes(self, texts):
         """Analizuje zmiany emocjonalne w serii tekstów"""
-        analyses = [self.analyze_text(text) for text in texts]
-        
+        analyses = self.analyze_batch(texts)
+
         emotional_progression = {
             'emotion_changes': [],
             'overall_trend': None
         }
-        
+
         # Śledź zmiany dominujących emocji
         prev_emotion = None
         for analysis in analyses:
@@ -97,17 +182,17 @@ class TextEmotionAnalyzer:
                     f"Zmiana z {prev_emotion} na {current_emotion}"
                 )
             prev_emotion = current_emotion
-            
+
         # Określ ogólny trend
         if len(analyses) >= 2:
             first_intensity = analyses[0]['emotion_intensity']
             last_intensity = analyses[-1]['emotion_intensity']
-            
+
             if last_intensity > first_intensity:
                 emotional_progression['overall_trend'] = 'wzrastający'
             elif last_intensity < first_intensity:
                 emotional_progression['overall_trend'] = 'malejący'
             else:
                 emotional_progression['overall_trend'] = 'stabilny'
-                
+
         return emotional_progression
@@ -1,6 +1,10 @@
+import zlib
 import random
+import hashlib
 from datetime import datetime
 from typing import Dict, Any, Optional
+from memory_cache import BoundedCache
+from resource_pack import get_resource_pack
 
 # List of default first questions for new users (in Polish)
 DEFAULT_FIRST_QUESTIONS = [
@@ -230,23 +234,166 @@ CONTEXTUAL_QUESTIONS = {
     ],
 }
 
-# Words that might indicate specific emotions or themes (in Polish)
-KEYWORDS = {
-    'samotność': ['samotny', 'samotna', 'sam', 'sama', 'odizolowany', 'odizolowana', 'opuszczony', 'opuszczona', 'brak związku', 'brak relacji', 'nikt', 'odrzucony', 'odrzucona'],
-    'stres': ['stres', 'napięcie', 'presja', 'przytłoczony', 'przytłoczona', 'zestresowany', 'zestresowana', 'deadline', 'termin', 'obciążenie', 'przeciążony', 'przeciążona'],
-    'lęk': ['lęk', 'strach', 'niepokój', 'obawa', 'martwię się', 'zmartwiony', 'zmartwiona', 'zaniepokojony', 'zaniepokojona', 'panika', 'niepewność'],
-    'smutek': ['smutek', 'smutny', 'smutna', 'przygnębiony', 'przygnębiona', 'płacz', 'żal', 'strata', 'rozczarowanie', 'melancholia', 'depresja'],
-    'radość': ['radość', 'szczęście', 'zadowolony', 'zadowolona', 'uciecha', 'szczęśliwy', 'szczęśliwa', 'śmiech', 'entuzjazm', 'duma', 'spełnienie'],
-    'złość': ['złość', 'wściekłość', 'gniew', 'irytacja', 'zdenerwowany', 'zdenerwowana', 'poirytowany', 'poirytowana', 'frustracja', 'wkurzony', 'wkurzona'],
-    'praca': ['praca', 'zawód', 'kariera', 'stanowisko', 'szef', 'przełożony', 'współpracownik', 'awans', 'wynagrodzenie', 'pensja', 'firma', 'korporacja', 'biznes'],
-    'relacje': ['relacja', 'związek', 'partner', 'partnerka', 'mąż', 'żona', 'przyjaciel', 'przyjaciółka', 'rodzina', 'rodzice', 'dzieci', 'bliskość', 'intymność'],
-    'samorozwój': ['rozwój', 'doskonalenie', 'zmiana', 'poprawa', 'cel', 'realizacja', 'ambicja', 'aspiracja', 'lepszy', 'lepsza', 'wyzwanie', 'nauka', 'wzrost'],
-    'zdrowie': ['zdrowie', 'choroba', 'ból', 'ciało', 'samopoczucie', 'kondycja', 'lekarz', 'leki', 'terapia', 'dieta', 'ćwiczenia', 'sen', 'odpoczynek', 'energia'],
-    'przeszłość': ['przeszłość', 'historia', 'kiedyś', 'dawniej', 'wspomnienie', 'pamięć', 'dzieciństwo', 'młodość', 'doświadczenie', 'błąd', 'żal', 'tęsknota', 'trauma'],
-    'przyszłość': ['przyszłość', 'plan', 'cel', 'marzenie', 'nadzieja', 'wizja', 'perspektywa', 'zmiana', 'rozwój', 'obawy', 'niepewność', 'oczekiwania'],
-    'wartości': ['wartość', 'sens', 'znaczenie', 'przekonanie', 'ideał', 'priorytet', 'zasada', 'etyka', 'moralność', 'dobro', 'uczciwość', 'odpowiedzialność', 'szacunek'],
+# Words that might indicate specific emotions or themes (in Polish) - resources/pl/theme_keywords.json
+KEYWORDS = get_resource_pack().theme_keywords
+
+class ThemeMatcher:
+    """
+    Aho–Corasick automaton over all theme keywords.
+
+    Built once from KEYWORDS; match() finds every keyword occurring in the text
+    (as a substring, like `keyword in text`) in a single pass, instead of one
+    full-text scan per keyword. Transitions are precomputed for every state and
+    character of the keyword alphabet, so matching is one dict lookup per character.
+
+    Responses never change once saved, so match_texts() remembers the keywords
+    found in each response and only scans responses it has not seen before.
+    """
+
+    def __init__(self, keywords, cache_entries=50000):
+        self.themes = list(keywords.keys())
+        self.patterns = sorted({keyword.lower() for words in keywords.values() for keyword in words})
+        pattern_ids = {pattern: i for i, pattern in enumerate(self.patterns)}
+
+        # Keyword id -> themes it belongs to (e.g. 'żal' counts for 'smutek' and 'przeszłość')
+        self.pattern_themes = [[] for _ in self.patterns]
+        for theme, words in keywords.items():
+            for pattern_id in sorted({pattern_ids[word.lower()] for word in words}):
+                self.pattern_themes[pattern_id].append(theme)
+
+        # Trie (goto function) with the keywords ending in each state
+        goto = [{}]
+        output = [set()]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    output.append(set())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            output[state].add(pattern_id)
+
+        # Breadth-first: failure links, merged outputs and a complete transition table
+        alphabet = {char for pattern in self.patterns for char in pattern}
+        delta = [dict() for _ in goto]
+        failure = [0] * len(goto)
+        queue = []
+        for char in alphabet:
+            next_state = goto[0].get(char, 0)
+            delta[0][char] = next_state
+            if next_state:
+                queue.append(next_state)
+
+        for state in queue:
+            for char in alphabet:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    delta[state][char] = delta[failure[state]][char]
+                else:
+                    failure[next_state] = delta[failure[state]][char]
+                    output[next_state] |= output[failure[next_state]]
+                    delta[state][char] = next_state
+                    queue.append(next_state)
+
+        # Only keep transitions that leave the root - missing characters fall back to state 0
+        self._delta = [{char: target for char, target in transitions.items() if target}
+                       for transitions in delta]
+        self._output = [frozenset(ids) for ids in output]
+
+        # Response digest -> keyword ids found in it
+        self._cache = BoundedCache(max_entries=cache_entries, max_bytes=64 * 1024 * 1024)
+
+    def find_keywords(self, text):
+        """
+        Returns the ids of all keywords occurring in `text` (already lowercased).
+        """
+        delta = self._delta
+        output = self._output
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def match(self, text):
+        """
+        Counts, for each theme, how many distinct keywords of the theme occur in the text.
+
+        Args:
+            text (str): Lowercased text
+
+        Returns:
+            dict: {theme: number of matched keywords} for themes with at least one hit
+        """
+        return self._count_themes(self.find_keywords(text))
+
+    def match_texts(self, texts):
+        """
+        Like match(), for keywords found in any of the texts (each scanned once and remembered).
+
+        Args:
+            texts (list): Lowercased texts (e.g. all responses of a user)
+
+        Returns:
+            dict: {theme: number of matched keywords} for themes with at least one hit
+        """
+        found = set()
+        for text in texts:
+            key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+            keyword_ids = self._cache.get(key)
+            if keyword_ids is None:
+                keyword_ids = frozenset(self.find_keywords(text))
+                self._cache.set(key, keyword_ids)
+            found |= keyword_ids
+        return self._count_themes(found)
+
+    def _count_themes(self, keyword_ids):
+        counts = {}
+        for pattern_id in keyword_ids:
+            for theme in self.pattern_themes[pattern_id]:
+                counts[theme] = counts.get(theme, 0) + 1
+        return counts
+
+# Compiled once at import
+theme_matcher = ThemeMatcher(KEYWORDS)
+
+# Bit of each theme in TherapyState.covered_themes_mask (new themes must be appended, not inserted)
+THEME_BITS = {theme: 1 << i for i, theme in enumerate(KEYWORDS)}
+
+# How many contextual questions to ask before moving on to another theme
+QUESTIONS_PER_THEME = 5
+
+def question_id(question):
+    """Stable numeric ID of a question (CRC32 of its text), stored in TherapyState."""
+    return zlib.crc32(question.encode("utf-8")) & 0x7fffffff
+
+# Contextual questions with precomputed IDs: {theme: [(id, question), ...]}
+CONTEXTUAL_QUESTION_IDS = {
+    theme: [(question_id(question), question) for question in questions]
+    for theme, questions in CONTEXTUAL_QUESTIONS.items()
 }
 
+def get_therapy_state(user):
+    """
+    Returns the persisted therapy state of the user (loaded together with the user),
+    creating it on first use. The caller commits it with the rest of the request.
+    """
+    state = user.therapy_state
+    if state is None:
+        from database import db
+        from models import TherapyState
+
+        state = TherapyState(user=user, covered_themes_mask=0, current_theme_questions=0, asked_question_ids_data='[]')
+        db.session.add(state)
+    return state
+
+def _unasked_questions(theme, state):
+    # Filtruj pytania, które już zostały zadane (zbiór ID - sprawdzenie w O(1))
+    return [(qid, q) for qid, q in CONTEXTUAL_QUESTION_IDS[theme] if not (state and state.has_asked(qid))]
+
 def analyze_context(context, user=None):
     """
     Analyze the conversation context to identify emotional themes
@@ -255,24 +402,27 @@ def analyze_context(context, user=None):
     if not context or len(context) == 0:
         return random.choice(DEFAULT_FIRST_QUESTIONS)
 
-    # Extract text and track used themes
-    all_text = " ".join([entry.get("response", "") for entry in context if entry.get("response")])
-    all_text = all_text.lower()
+    # Persisted progress (covered themes, current theme, asked questions)
+    state = get_therapy_state(user) if user else None
+
+    # Extract responses and track used themes
+    responses = [entry["response"].lower() for entry in context if entry.get("response")]
 
     all_themes = list(KEYWORDS.keys())
 
-    # Identify themes based on keywords with weights
+    # Identify themes based on keywords with weights (one pass per response not seen before)
+    theme_counts = theme_matcher.match_texts(responses)
     themes = {}
-    for theme, keywords in KEYWORDS.items():
+    for theme in KEYWORDS:
         # Calculate theme relevance
-        count = sum(1 for keyword in keywords if keyword.lower() in all_text)
+        count = theme_counts.get(theme, 0)
         if count > 0:
             # Add randomization factor to prevent getting stuck in one theme
             randomization = random.uniform(0.8, 1.2)
             themes[theme] = count * randomization
 
             # Boost underutilized themes
-            if user and theme not in user.therapy_progress["covered_themes"]:
+            if state and not state.is_theme_covered(THEME_BITS[theme]):
                 themes[theme] *= 1.5
 
     # Simulate additional contextual information (replace with actual data if available)
@@ -287,31 +437,39 @@ def analyze_context(context, user=None):
         sorted_themes = sorted(themes.items(), key=lambda x: x[1], reverse=True)
 
         # Wybierz nowy temat jeśli nie ma aktualnego lub poprzedni został wyczerpany
-        if user and (not user.therapy_progress["current_theme"] or 
-                    len([q for q in user.therapy_progress["questions_asked"] if user.therapy_progress["current_theme"] in q]) >= 5):
+        if state and (not state.current_theme or state.current_theme_questions >= QUESTIONS_PER_THEME):
             # Znajdź tematy, które nie były jeszcze omawiane
-            unused_themes = [t for t in all_themes if t not in user.therapy_progress["covered_themes"]]
+            unused_themes = [t for t in all_themes if not state.is_theme_covered(THEME_BITS[t])]
 
             if not unused_themes:  # Jeśli wszystkie tematy były już omawiane
-                user.therapy_progress["covered_themes"] = []  # Zresetuj listę
+                state.reset_covered_themes()  # Zresetuj listę
                 unused_themes = all_themes
 
             # Wybierz nowy temat z nieużywanych
-            user.therapy_progress["current_theme"] = random.choice(unused_themes)
-            user.therapy_progress["covered_themes"].append(user.therapy_progress["current_theme"])
+            new_theme = random.choice(unused_themes)
+            state.start_theme(new_theme, THEME_BITS[new_theme])
+
+        selected_theme = state.current_theme if state else random.choice(all_themes)
 
-        selected_theme = user.therapy_progress["current_theme"] if user else random.choice(all_themes)
+        if selected_theme in CONTEXTUAL_QUESTION_IDS:
+            available_questions = _unasked_questions(selected_theme, state)
 
-        if selected_theme in CONTEXTUAL_QUESTIONS:
-            # Filtruj pytania, które już zostały zadane
-            asked_questions = user.therapy_progress["questions_asked"] if user else []
-            available_questions = [q for q in CONTEXTUAL_QUESTIONS[selected_theme] 
-                                if q not in asked_questions]
+            if not available_questions and state:
+                # Wszystkie pytania tematu zostały już zadane - przejdź do tematu z niezadanymi pytaniami
+                candidates = [t for t in all_themes if t != selected_theme and _unasked_questions(t, state)]
+                if candidates:
+                    uncovered = [t for t in candidates if not state.is_theme_covered(THEME_BITS[t])]
+                    selected_theme = random.choice(uncovered or candidates)
+                    state.start_theme(selected_theme, THEME_BITS[selected_theme])
+                else:
+                    # Zadano już wszystkie pytania kontekstowe - pytania bieżącego tematu od nowa
+                    state.forget_questions(qid for qid, _ in CONTEXTUAL_QUESTION_IDS[selected_theme])
+                available_questions = _unasked_questions(selected_theme, state)
 
             if available_questions:
-                selected_question = random.choice(available_questions)
-                if user:
-                    user.therapy_progress["questions_asked"].append(selected_question)
+                selected_id, selected_question = random.choice(available_questions)
+                if state:
+                    state.record_question(selected_id)
                 return selected_question
 
     # Ensure variety when falling back to follow-up questions
@@ -327,6 +485,7 @@ def generate_question(context=None, user=None):
     Args:
         context (list): A list of previous conversation entries
                        Each entry is a dict with 'question', 'response', and 'date'
+        user (User, optional): User whose therapy progress (TherapyState) is used and updated
 
     Returns:
         str: A therapeutic question in Polish
@@ -0,0 +1,276 @@
+"""
+Lokalny serwer imitujący API Anthropic i OpenAI (do testów bramy LLM i benchmarków).
+
+Obsługuje:
+- POST /v1/messages (Anthropic, także "stream": true w formacie SSE),
+- POST /v1/chat/completions (OpenAI),
+- Message Batches API: POST /v1/messages/batches, GET /v1/messages/batches/<id>
+  oraz GET /v1/messages/batches/<id>/results (paczka kończy się po --batch-delay s).
+
+Opóźnienie, odsetek błędów 500 i odpowiedzi 429 (z nagłówkiem retry-after)
+można ustawić parametrami wywołania.
+
+Użycie:
+    python tools/fake_llm_server.py --port 8089 --latency 0.3 --rate-limit-rate 0.1
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8089 ANTHROPIC_API_KEY=fake \\
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python main.py
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_QUESTION = "Co dziś najbardziej zajmowało Twoje myśli i jak się z tym czujesz?"
+FAKE_QUOTE = "Małe kroki też prowadzą do wielkich zmian."
+FAKE_ANALYSIS = {
+    "personality_traits": ["Refleksyjność", "Wrażliwość"],
+    "emotional_patterns": ["Niepokój wieczorem", "Ulga po rozmowie"],
+    "cognitive_patterns": ["Wysokie wymagania wobec siebie"],
+    "insights": ["Regularny odpoczynek poprawia samopoczucie."],
+    "growth_areas": ["Życzliwość wobec siebie"],
+    "rolling_summary": "Użytkownik opisuje napięcie związane z pracą i ulgę po rozmowach z bliskimi.",
+}
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+    stats_lock = threading.Lock()
+    batches = {}
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _count(self, counter):
+        with self.stats_lock:
+            self.stats[counter] += 1
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply_text(self, payload):
+        text = json.dumps(payload.get("messages", []), ensure_ascii=False) + str(payload.get("system", ""))
+        if "JSON" in text:
+            return json.dumps(FAKE_ANALYSIS, ensure_ascii=False)
+        if "cytat" in text:
+            return FAKE_QUOTE
+        return FAKE_QUESTION
+
+    def _simulate(self):
+        """Opóźnienie i losowe błędy. Zwraca True, jeśli odpowiedź błędu została już wysłana."""
+        self._count("requests")
+        config = self.config
+        if random.random() < config.rate_limit_rate:
+            self._count("rate_limited")
+            self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "rate limited"}},
+                            headers={"retry-after": str(config.retry_after)})
+            return True
+        time.sleep(max(0.0, random.gauss(config.latency, config.jitter)))
+        if random.random() < config.error_rate:
+            self._count("errors")
+            self._send_json(500, {"type": "error", "error": {"type": "api_error", "message": "internal error"}})
+            return True
+        return False
+
+    def do_GET(self):
+        parts = self.path.rstrip("/").split("/")
+        if self.path == "/stats":
+            with self.stats_lock:
+                self._send_json(200, dict(self.stats))
+        elif self.path.startswith("/v1/messages/batches/") and parts[-1] == "results":
+            self._batch_results(parts[-2])
+        elif self.path.startswith("/v1/messages/batches/"):
+            batch = self.batches.get(parts[-1])
+            if batch is None:
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "batch"}})
+            else:
+                self._send_json(200, self._batch_object(batch))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.endswith("/v1/messages/batches"):
+            if self._simulate():
+                return
+            self._send_json(200, self._create_batch(payload))
+        elif self.path.endswith("/v1/messages"):
+            if self._simulate():
+                return
+            if payload.get("stream"):
+                self._stream_message(payload)
+            else:
+                self._send_json(200, self._message(payload, self._reply_text(payload)))
+        elif self.path.endswith("/chat/completions"):
+            if self._simulate():
+                return
+            self._send_json(200, self._chat_completion(payload))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _message(self, payload, text):
+        return {
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "fake"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(json.dumps(payload)) // 4, "output_tokens": len(text) // 4},
+        }
+
+    def _stream_message(self, payload):
+        text = self._reply_text(payload)
+        message = self._message(payload, "")
+        message["content"] = []
+        message["stop_reason"] = None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(name, data):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            event("message_start", {"type": "message_start", "message": message})
+            event("content_block_start", {"type": "content_block_start", "index": 0,
+                                          "content_block": {"type": "text", "text": ""}})
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                chunk = word if i == 0 else " " + word
+                event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                              "delta": {"type": "text_delta", "text": chunk}})
+                time.sleep(self.config.token_delay)
+            event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            event("message_delta", {"type": "message_delta",
+                                    "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                    "usage": {"output_tokens": len(text) // 4}})
+            event("message_stop", {"type": "message_stop"})
+        except (BrokenPipeError, ConnectionResetError):
+            # Klient przerwał strumień (np. po pierwszym pełnym pytaniu)
+            pass
+        self.close_connection = True
+
+    def _create_batch(self, payload):
+        results = []
+        for request in payload.get("requests", []):
+            params = request.get("params", {})
+            if random.random() < self.config.error_rate:
+                result = {"type": "errored", "error": {"type": "error",
+                                                       "error": {"type": "api_error", "message": "internal error"}}}
+            else:
+                result = {"type": "succeeded", "message": self._message(params, self._reply_text(params))}
+            results.append({"custom_id": request.get("custom_id"), "result": result})
+
+        batch = {
+            "id": f"msgbatch_{uuid.uuid4().hex}",
+            "created": time.time(),
+            "results": results,
+            "host": self.headers.get("Host", f"{self.config.host}:{self.config.port}"),
+        }
+        self.batches[batch["id"]] = batch
+        return self._batch_object(batch)
+
+    def _batch_object(self, batch):
+        ended = time.time() - batch["created"] >= self.config.batch_delay
+        succeeded = sum(1 for item in batch["results"] if item["result"]["type"] == "succeeded")
+
+        def iso(ts):
+            return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else len(batch["results"]),
+                "succeeded": succeeded if ended else 0,
+                "errored": len(batch["results"]) - succeeded if ended else 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": iso(batch["created"]),
+            "expires_at": iso(batch["created"] + 24 * 3600),
+            "ended_at": iso(batch["created"] + self.config.batch_delay) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"http://{batch['host']}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def _batch_results(self, batch_id):
+        batch = self.batches.get(batch_id)
+        if batch is None or time.time() - batch["created"] < self.config.batch_delay:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "results"}})
+            return
+        body = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in batch["results"]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/binary")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chat_completion(self, payload):
+        text = self._reply_text(payload)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(json.dumps(payload)) // 4, "completion_tokens": len(text) // 4,
+                      "total_tokens": (len(json.dumps(payload)) + len(text)) // 4},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="średnie opóźnienie odpowiedzi [s]")
+    parser.add_argument("--jitter", type=float, default=0.05, help="odchylenie standardowe opóźnienia [s]")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="odstęp między fragmentami strumienia [s]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="odsetek odpowiedzi 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="odsetek odpowiedzi 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="wartość nagłówka retry-after [s]")
+    parser.add_argument("--batch-delay", type=float, default=2.0, help="czas przetwarzania paczki zapytań [s]")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    FakeLLMHandler.config = args
+    server = ThreadingHTTPServer((args.host, args.port), FakeLLMHandler)
+    server.daemon_threads = True
+    print(f"Fałszywy serwer LLM nasłuchuje na http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
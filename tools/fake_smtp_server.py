@@ -0,0 +1,132 @@
+"""
+Lokalny serwer SMTP (asyncio) do testów i benchmarków wysyłki przypomnień e-mail.
+
+Zastępuje aiosmtpd bez dodatkowych zależności. Obsługuje EHLO/HELO, AUTH
+PLAIN/LOGIN (każde hasło jest akceptowane), MAIL, RCPT, DATA, RSET, NOOP
+i QUIT; nie obsługuje STARTTLS (klient musi działać z SMTP_USE_TLS=0).
+
+Opóźnienie każdej odpowiedzi (czas obiegu w sieci), koszt nawiązania
+połączenia (TCP + TLS), odrzucanie odbiorców i zrywanie połączeń po
+określonej liczbie wiadomości można ustawić parametrami wywołania.
+
+Użycie:
+    python tools/fake_smtp_server.py --port 8025 --latency 0.005 --connect-latency 0.05
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=8025 SMTP_USE_TLS=0 SMTP_USERNAME=fake SMTP_PASSWORD=fake \\
+    python reminders.py
+"""
+
+import sys
+import random
+import asyncio
+import argparse
+
+
+class FakeSMTPServer:
+    def __init__(self, config):
+        self.config = config
+        self.stats = {"connections": 0, "messages": 0, "rejected": 0, "dropped": 0}
+
+    async def _reply(self, writer, line):
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        writer.write(line.encode("ascii") + b"\r\n")
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        self.stats["connections"] += 1
+        if self.config.connect_latency:
+            await asyncio.sleep(self.config.connect_latency)
+        session_messages = 0
+        try:
+            await self._reply(writer, "220 fake-smtp ESMTP ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    await self._reply(writer, "250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 10485760")
+                elif verb == "HELO":
+                    await self._reply(writer, "250 fake-smtp")
+                elif verb == "AUTH":
+                    parts = command.split()
+                    if len(parts) >= 2 and parts[1].upper() == "LOGIN":
+                        await self._reply(writer, "334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await self._reply(writer, "334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    elif len(parts) == 2:
+                        await self._reply(writer, "334 ")
+                        await reader.readline()
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    await self._reply(writer, "250 2.1.0 OK")
+                elif verb == "RCPT":
+                    if random.random() < self.config.reject_rate:
+                        self.stats["rejected"] += 1
+                        await self._reply(writer, "550 5.1.1 Mailbox unavailable")
+                    else:
+                        await self._reply(writer, "250 2.1.5 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    while True:
+                        data_line = await reader.readline()
+                        if not data_line or data_line == b".\r\n":
+                            break
+                    if not data_line:
+                        break
+                    self.stats["messages"] += 1
+                    session_messages += 1
+                    if self.config.drop_after and session_messages >= self.config.drop_after:
+                        # Serwer zrywa połączenie bez potwierdzenia wiadomości
+                        self.stats["dropped"] += 1
+                        self.stats["messages"] -= 1
+                        break
+                    await self._reply(writer, "250 2.0.0 Queued")
+                elif verb == "RSET" or verb == "NOOP":
+                    await self._reply(writer, "250 2.0.0 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 2.0.0 Bye")
+                    break
+                else:
+                    await self._reply(writer, "502 5.5.2 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(config):
+    server = FakeSMTPServer(config)
+    listener = await asyncio.start_server(server.handle, config.host, config.port)
+    port = listener.sockets[0].getsockname()[1]
+    print(f"Fałszywy serwer SMTP nasłuchuje na {config.host}:{port}", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        print(f"Statystyki: {server.stats}", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025, help="port (0 - dowolny wolny)")
+    parser.add_argument("--latency", type=float, default=0.0, help="opóźnienie każdej odpowiedzi [s]")
+    parser.add_argument("--connect-latency", type=float, default=0.0,
+                        help="dodatkowy koszt nawiązania połączenia (TCP + TLS) [s]")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="odsetek odrzuconych odbiorców (550)")
+    parser.add_argument("--drop-after", type=int, default=0,
+                        help="zerwij połączenie po tylu wiadomościach w sesji (0 - nigdy)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
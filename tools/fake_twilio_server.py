@@ -0,0 +1,150 @@
+"""
+Lokalny serwer imitujący REST API Twilio (do testów i benchmarków wysyłki SMS).
+
+Obsługuje:
+- POST /2010-04-01/Accounts/<SID>/Messages.json (formularz To, From, Body),
+  odpowiedź 201 z identyfikatorem wiadomości (sid),
+- GET /stats - liczniki zapytań i najwyższa zaobserwowana liczba wiadomości na sekundę.
+
+Serwer pilnuje limitu wiadomości na sekundę konta (--mps): nadmiarowe
+zapytania dostają 429 (kod 20429) z nagłówkiem Retry-After. Numery bez
+znaku "+" są odrzucane błędem 400 (kod 21211). Opóźnienie odpowiedzi i odsetek
+błędów 500 można ustawić parametrami wywołania.
+
+Użycie:
+    python tools/fake_twilio_server.py --port 8090 --mps 10 --latency 0.15
+    TWILIO_API_BASE_URL=http://127.0.0.1:8090 TWILIO_ACCOUNT_SID=ACfake TWILIO_AUTH_TOKEN=fake \\
+    TWILIO_PHONE_NUMBER=+48100000000 SMS_RATE_LIMIT=10 python reminders.py
+"""
+
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import Counter
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+    stats = {"requests": 0, "accepted": 0, "rate_limited": 0, "invalid": 0, "errors": 0}
+    accepted_per_second = Counter()
+    lock = threading.Lock()
+    tokens = None
+    updated = None
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, code, message, headers=None):
+        self._send_json(status, {"code": code, "message": message, "status": status,
+                                 "more_info": f"https://www.twilio.com/docs/errors/{code}"}, headers)
+
+    def _take_token(self):
+        """Limit wiadomości na sekundę konta (token bucket bez zapasu ponad 1 s)."""
+        cls = FakeTwilioHandler
+        now = time.monotonic()
+        if cls.tokens is None:
+            cls.tokens, cls.updated = float(self.config.mps), now
+        cls.tokens = min(float(self.config.mps), cls.tokens + (now - cls.updated) * self.config.mps)
+        cls.updated = now
+        if cls.tokens >= 1:
+            cls.tokens -= 1
+            return 0.0
+        return (1 - cls.tokens) / self.config.mps
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self._error(404, 20404, "The requested resource was not found")
+            return
+        with self.lock:
+            stats = dict(self.stats)
+            stats["max_accepted_per_second"] = max(self.accepted_per_second.values(), default=0)
+        self._send_json(200, stats)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 4 or parts[0] != "2010-04-01" or parts[1] != "Accounts" or parts[3] != "Messages.json":
+            self._error(404, 20404, "The requested resource was not found")
+            return
+
+        if self.config.latency:
+            time.sleep(max(0.0, random.gauss(self.config.latency, self.config.jitter)))
+
+        with self.lock:
+            self.stats["requests"] += 1
+            wait = self._take_token()
+            if wait:
+                outcome = "rate_limited"
+            elif not form.get("To", "").startswith("+"):
+                outcome = "invalid"
+            elif random.random() < self.config.error_rate:
+                outcome = "errors"
+            else:
+                outcome = "accepted"
+                self.accepted_per_second[int(time.time())] += 1
+            self.stats[outcome] += 1
+
+        if outcome == "rate_limited":
+            retry_after = self.config.retry_after if self.config.retry_after is not None else max(1, math.ceil(wait))
+            self._error(429, 20429, "Too Many Requests", {"Retry-After": str(retry_after)})
+        elif outcome == "invalid":
+            self._error(400, 21211, f"The 'To' number {form.get('To')} is not a valid phone number.")
+        elif outcome == "errors":
+            self._error(500, 20500, "Internal Server Error")
+        else:
+            self._send_json(201, {
+                "sid": "SM" + uuid.uuid4().hex,
+                "account_sid": parts[2],
+                "to": form.get("To"),
+                "from": form.get("From"),
+                "body": form.get("Body"),
+                "status": "queued",
+            })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090, help="port (0 - dowolny wolny)")
+    parser.add_argument("--mps", type=float, default=10.0, help="limit wiadomości na sekundę konta")
+    parser.add_argument("--latency", type=float, default=0.15, help="średnie opóźnienie odpowiedzi [s]")
+    parser.add_argument("--jitter", type=float, default=0.03, help="odchylenie standardowe opóźnienia [s]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="odsetek odpowiedzi 500")
+    parser.add_argument("--retry-after", type=int, default=None,
+                        help="stała wartość nagłówka Retry-After [s] (domyślnie: czas do wolnego miejsca)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    FakeTwilioHandler.config = args
+    server = ThreadingHTTPServer((args.host, args.port), FakeTwilioHandler)
+    server.daemon_threads = True
+    print(f"Fałszywy serwer Twilio nasłuchuje na http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,173 +1,221 @@
-import matplotlib.pyplot as plt
 import matplotlib
 import base64
 import io
-import json
+import re
 from datetime import datetime, timedelta
 import numpy as np
+from matplotlib.figure import Figure
 
 # Ustawienie nieinteraktywnego backendu
 matplotlib.use('Agg')
 
+# Kolory linii poszczególnych emocji
+EMOTION_COLORS = {'Radość': 'green', 'Smutek': 'blue', 'Lęk': 'orange', 'Gniew': 'red', 'Zaskoczenie': 'cyan'}
+
+def _encode_png(png):
+    """Koduje obraz PNG do base64 (do osadzenia w HTML)."""
+    return base64.b64encode(png).decode('utf-8') if png else None
+
+def _figure_to_png(fig, **kwargs):
+    """Zapisuje figurę do PNG. Używamy obiektowego API Figure - bez globalnego stanu pyplot."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', **kwargs)
+    return buf.getvalue()
+
 def generate_emotion_chart(psychological_analyses, days=30):
     """
-    Generuje zaawansowane wykresy pokazujące:
+    Generuje wykres zmian emocjonalnych jako obraz zakodowany w base64.
+
+    Returns:
+        str: Zakodowany w base64 obraz wykresu
+    """
+    return _encode_png(render_emotion_chart(psychological_analyses, days))
+
+def generate_emotional_intelligence_progress(psychological_analyses):
+    """
+    Generuje wykres postępu inteligencji emocjonalnej jako obraz zakodowany w base64.
+
+    Returns:
+        str: Zakodowany w base64 obraz wykresu
+    """
+    return _encode_png(render_emotional_intelligence_progress(psychological_analyses))
+
+def render_emotion_chart(psychological_analyses, days=30):
+    """
+    Generuje wykres zmian emocjonalnych w bieżącym procesie.
+
+    Returns:
+        bytes: Obraz wykresu w formacie PNG
+    """
+    payload = build_emotion_chart_payload(psychological_analyses, days)
+    return draw_emotion_chart(payload) if payload else None
+
+def render_emotional_intelligence_progress(psychological_analyses):
+    """
+    Generuje wykres postępu inteligencji emocjonalnej w bieżącym procesie.
+
+    Returns:
+        bytes: Obraz wykresu w formacie PNG
+    """
+    payload = build_ei_progress_payload(psychological_analyses)
+    return draw_ei_progress_chart(payload) if payload else None
+
+def build_emotion_chart_payload(psychological_analyses, days=30):
+    """
+    Przygotowuje dane wykresu pokazującego:
     - Trendy emocjonalne w czasie
     - Korelacje między różnymi stanami emocjonalnymi
     - Wzorce dobowe/tygodniowe
     - Punkty przełomowe w rozwoju emocjonalnym
     - Porównanie z poprzednimi okresami
-    """
-    """
-    Generuje wykres zmian emocjonalnych na podstawie analizy psychologicznej.
-    
+
+    Wynik zawiera wyłącznie proste typy (daty jako ISO 8601), więc może zostać
+    przekazany do procesu renderującego (render_service.py).
+
     Args:
         psychological_analyses: Lista obiektów PsychologicalAnalysis
         days: Liczba dni do uwzględnienia w wykresie
-    
+
     Returns:
-        str: Zakodowany w base64 obraz wykresu
+        dict lub None: {'dates', 'ei_scores', 'emotions': {emocja: [[data, intensywność], ...]}}
     """
     # Sprawdź czy mamy wystarczająco danych
     if not psychological_analyses or len(psychological_analyses) < 2:
         return None
-    
+
     # Filtruj analizy z ostatnich X dni
     cutoff_date = datetime.now() - timedelta(days=days)
     recent_analyses = [a for a in psychological_analyses if a.timestamp >= cutoff_date]
-    
+
     if not recent_analyses:
         recent_analyses = psychological_analyses[-5:]  # Ostatnie 5 analiz, jeśli nie ma z ostatnich X dni
-    
+
     # Sortuj analizy chronologicznie
     recent_analyses.sort(key=lambda x: x.timestamp)
-    
-    # Przygotuj dane
-    dates = [a.timestamp for a in recent_analyses]
-    ei_scores = [a.emotional_intelligence_score for a in recent_analyses]
-    
+
     # Zbierz dane o emocjach
-    emotions = {'Radość': [], 'Smutek': [], 'Lęk': [], 'Gniew': [], 'Zaskoczenie': []}
-    
+    emotions = {emotion: [] for emotion in EMOTION_COLORS}
+
     for analysis in recent_analyses:
         data = analysis.get_analysis()
         if not data or 'emotional_patterns' not in data:
             continue
-            
+
         # Szukamy wzorców emocjonalnych w danych
         for pattern in data['emotional_patterns']:
             for emotion in emotions.keys():
                 if emotion.lower() in pattern.lower():
                     # Dodajemy szacunkową intensywność emocji (1-5)
                     intensity = 3  # Domyślna wartość
-                    
+
                     # Próbujemy wyodrębnić liczbę z tekstu (np. "Wysoki poziom lęku (4/5)")
-                    import re
                     match = re.search(r'(\d+)[/](\d+)', pattern)
                     if match:
-                        try:
-                            numerator = int(match.group(1))
-                            denominator = int(match.group(2))
-                            intensity = numerator
-                        except ValueError:
-                            pass
-                            
-                    emotions[emotion].append((analysis.timestamp, intensity))
-    
-    # Inicjalizuj wykres
-    plt.figure(figsize=(10, 6))
-    
-    # Wykres inteligencji emocjonalnej
-    plt.plot(dates, ei_scores, 'o-', label='Inteligencja Emocjonalna', color='purple', linewidth=2)
-    
-    # Dodaj wykresy dla emocji, dla których mamy dane
-    colors = {'Radość': 'green', 'Smutek': 'blue', 'Lęk': 'orange', 'Gniew': 'red', 'Zaskoczenie': 'cyan'}
-    
-    for emotion, data_points in emotions.items():
-        if data_points:
-            emotion_dates = [d[0] for d in data_points]
-            emotion_values = [d[1] for d in data_points]
-            if len(emotion_dates) > 1:  # Tylko jeśli mamy więcej niż jeden punkt danych
-                plt.plot(emotion_dates, emotion_values, 'o--', label=emotion, color=colors[emotion], alpha=0.7)
-    
-    # Formatowanie wykresu
-    plt.title('Rozwój Emocjonalny w Czasie', fontsize=16)
-    plt.xlabel('Data', fontsize=12)
-    plt.ylabel('Intensywność / Wynik', fontsize=12)
-    plt.ylim(0, 5.5)  # Skala od 0 do 5, z małym marginesem na górze
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend(loc='best')
-    
-    # Formatowanie osi x
-    plt.gcf().autofmt_xdate()
-    
-    # Zapisz wykres do bufora
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    buf.seek(0)
-    
-    # Koduj obraz do base64
-    img_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    plt.close()
-    
-    return img_base64
+                        intensity = int(match.group(1))
 
-def generate_emotional_intelligence_progress(psychological_analyses):
+                    emotions[emotion].append([analysis.timestamp.isoformat(), intensity])
+
+    return {
+        'dates': [a.timestamp.isoformat() for a in recent_analyses],
+        'ei_scores': [a.emotional_intelligence_score for a in recent_analyses],
+        'emotions': emotions
+    }
+
+def build_ei_progress_payload(psychological_analyses):
     """
-    Generuje wykres postępu inteligencji emocjonalnej.
-    
+    Przygotowuje dane wykresu postępu inteligencji emocjonalnej.
+
     Args:
         psychological_analyses: Lista obiektów PsychologicalAnalysis
-    
+
     Returns:
-        str: Zakodowany w base64 obraz wykresu
+        dict lub None: {'dates', 'ei_scores'}
     """
     if not psychological_analyses or len(psychological_analyses) < 2:
         return None
-    
+
     # Sortuj analizy chronologicznie
     analyses = sorted(psychological_analyses, key=lambda x: x.timestamp)
-    
-    # Przygotuj dane
-    dates = [a.timestamp for a in analyses]
-    ei_scores = [a.emotional_intelligence_score for a in analyses]
-    
+    return {
+        'dates': [a.timestamp.isoformat() for a in analyses],
+        'ei_scores': [a.emotional_intelligence_score for a in analyses]
+    }
+
+def draw_emotion_chart(payload):
+    """
+    Rysuje wykres zmian emocjonalnych na podstawie danych z build_emotion_chart_payload().
+
+    Returns:
+        bytes: Obraz wykresu w formacie PNG
+    """
+    dates = [datetime.fromisoformat(d) for d in payload['dates']]
+
+    # Inicjalizuj wykres
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+
+    # Wykres inteligencji emocjonalnej
+    ax.plot(dates, payload['ei_scores'], 'o-', label='Inteligencja Emocjonalna', color='purple', linewidth=2)
+
+    # Dodaj wykresy dla emocji, dla których mamy dane
+    for emotion, data_points in payload['emotions'].items():
+        if len(data_points) > 1:  # Tylko jeśli mamy więcej niż jeden punkt danych
+            emotion_dates = [datetime.fromisoformat(d[0]) for d in data_points]
+            emotion_values = [d[1] for d in data_points]
+            ax.plot(emotion_dates, emotion_values, 'o--', label=emotion,
+                    color=EMOTION_COLORS.get(emotion, 'gray'), alpha=0.7)
+
+    # Formatowanie wykresu
+    ax.set_title('Rozwój Emocjonalny w Czasie', fontsize=16)
+    ax.set_xlabel('Data', fontsize=12)
+    ax.set_ylabel('Intensywność / Wynik', fontsize=12)
+    ax.set_ylim(0, 5.5)  # Skala od 0 do 5, z małym marginesem na górze
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(loc='best')
+
+    # Formatowanie osi x
+    fig.autofmt_xdate()
+
+    return _figure_to_png(fig, dpi=100, bbox_inches='tight')
+
+def draw_ei_progress_chart(payload):
+    """
+    Rysuje wykres postępu inteligencji emocjonalnej na podstawie danych z build_ei_progress_payload().
+
+    Returns:
+        bytes: Obraz wykresu w formacie PNG
+    """
+    dates = [datetime.fromisoformat(d) for d in payload['dates']]
+    ei_scores = payload['ei_scores']
+
     # Inicjalizuj wykres
-    plt.figure(figsize=(10, 6))
-    
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+
     # Wykres inteligencji emocjonalnej
-    plt.plot(dates, ei_scores, 'o-', color='purple', linewidth=2)
-    
+    ax.plot(dates, ei_scores, 'o-', color='purple', linewidth=2)
+
     # Dodaj linię trendu
     if len(dates) > 2:
         x = np.array([(d - dates[0]).total_seconds() for d in dates])
         y = np.array(ei_scores)
         z = np.polyfit(x, y, 1)
         p = np.poly1d(z)
-        
+
         trend_x = np.array([min(x), max(x)])
         trend_dates = [dates[0] + timedelta(seconds=float(val)) for val in trend_x]
-        plt.plot(trend_dates, p(trend_x), "r--", alpha=0.8, label='Trend')
-    
+        ax.plot(trend_dates, p(trend_x), "r--", alpha=0.8, label='Trend')
+
     # Formatowanie wykresu
-    plt.title('Postęp Inteligencji Emocjonalnej', fontsize=16)
-    plt.xlabel('Data', fontsize=12)
-    plt.ylabel('Wynik Inteligencji Emocjonalnej', fontsize=12)
-    plt.ylim(0, 100)  # Skala od 0 do 100
-    plt.grid(True, linestyle='--', alpha=0.7)
+    ax.set_title('Postęp Inteligencji Emocjonalnej', fontsize=16)
+    ax.set_xlabel('Data', fontsize=12)
+    ax.set_ylabel('Wynik Inteligencji Emocjonalnej', fontsize=12)
+    ax.set_ylim(0, 100)  # Skala od 0 do 100
+    ax.grid(True, linestyle='--', alpha=0.7)
     if len(dates) > 2:
-        plt.legend()
-    
+        ax.legend()
+
     # Formatowanie osi x
-    plt.gcf().autofmt_xdate()
-    
-    # Zapisz wykres do bufora
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    buf.seek(0)
-    
-    # Koduj obraz do base64
-    img_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    plt.close()
-    
-    return img_base64
\ No newline at end of file
+    fig.autofmt_xdate()
+
+    return _figure_to_png(fig, dpi=100, bbox_inches='tight')
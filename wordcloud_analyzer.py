@@ -1,36 +1,35 @@
 import io
 import base64
+import os
 import re
 import json
+import hashlib
 from collections import Counter
-import nltk
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import numpy as np
-from PIL import Image
+from lazy_import import lazy_module
+from memory_cache import BoundedCache
+from resource_pack import get_resource_pack
 
-# Download NLTK stopwords
-nltk.download('stopwords', quiet=True)
+# Ciężka biblioteka ładowana przy pierwszym użyciu (nie przy starcie aplikacji)
+wordcloud_lib = lazy_module("wordcloud")
 
-# Polskie stop words (i angielskie jako fallback)
-from nltk.corpus import stopwords
-try:
-    STOPWORDS = set(stopwords.words('polish'))
-except:
-    # Fallback na angielskie stopwords, jeśli polskie nie są dostępne
-    STOPWORDS = set(stopwords.words('english'))
+# Zmiana wersji unieważnia zapamiętane obrazy (np. po zmianie wyglądu)
+WORDCLOUD_RENDER_VERSION = "2"
 
-# Dodatkowe stop words dla języka polskiego
-ADDITIONAL_STOPWORDS = {
-    'aby', 'ale', 'być', 'czy', 'dla', 'gdy', 'jak', 'jest', 'mieć',
-    'nie', 'się', 'że', 'bardzo', 'dzisiaj', 'dziś', 'kiedy', 'mój',
-    'też', 'tak', 'tego', 'tym', 'tego', 'tej', 'ten', 'ta', 'to', 'mi', 'mnie',
-    'oraz', 'może', 'której', 'którym', 'których', 'który', 'która', 'które',
-    'z', 'w', 'na', 'o', 'za', 'pod', 'nad', 'przy', 'po', 'od', 'do', 'przez'
-}
+# Obrazy chmur tagów zapamiętane według skrótu słownika częstotliwości
+wordcloud_image_cache = BoundedCache(
+    max_entries=int(os.environ.get("WORDCLOUD_CACHE_MAX_ENTRIES", 256)),
+    max_bytes=int(os.environ.get("WORDCLOUD_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    sizeof=len
+)
 
-# Łączymy wszystkie stop words
-ALL_STOPWORDS = STOPWORDS.union(ADDITIONAL_STOPWORDS)
+def get_stopwords():
+    """
+    Zwraca polskie stop words z dołączonego pakietu zasobów (bez pobierania danych z sieci).
+
+    Returns:
+        frozenset: Wszystkie stop words
+    """
+    return get_resource_pack().stopwords
 
 def preprocess_text(text):
     """
@@ -53,10 +52,30 @@ def preprocess_text(text):
     
     return text
 
+def count_terms(text):
+    """
+    Zlicza słowa kluczowe w tekście (bez stop words i słów krótszych niż 3 litery).
+    
+    Args:
+        text (str): Tekst do przetworzenia
+    
+    Returns:
+        Counter: Licznik {słowo: liczba_wystąpień}
+    """
+    # Przetwórz tekst i podziel na słowa
+    words = preprocess_text(text).split() if text else []
+    
+    # Odfiltruj stop words i zlicz wystąpienia słów
+    all_stopwords = get_stopwords()
+    return Counter(word for word in words if word not in all_stopwords and len(word) > 2)
+
 def extract_keywords(responses, max_words=100):
     """
     Analizuje odpowiedzi użytkownika, aby zidentyfikować najczęściej używane słowa.
     
+    Dla zapisanych odpowiedzi użytkownika szybsze jest term_frequency.get_top_terms(),
+    które odczytuje przyrostowo utrzymywaną tabelę częstotliwości.
+    
     Args:
         responses (list): Lista odpowiedzi użytkownika
         max_words (int): Maksymalna liczba słów do zwrócenia
@@ -67,24 +86,22 @@ def extract_keywords(responses, max_words=100):
     # Połącz wszystkie odpowiedzi
     all_text = ' '.join([r['response'] for r in responses if r['response']])
     
-    # Przetwórz tekst
-    processed_text = preprocess_text(all_text)
-    
-    # Podziel na słowa
-    words = processed_text.split()
-    
-    # Odfiltruj stop words
-    filtered_words = [word for word in words if word not in ALL_STOPWORDS and len(word) > 2]
-    
-    # Zlicz wystąpienia słów
-    word_counts = Counter(filtered_words)
-    
     # Zwróć najczęstsze słowa
-    return dict(word_counts.most_common(max_words))
+    return dict(count_terms(all_text).most_common(max_words))
 
 def generate_wordcloud(word_frequencies, width=800, height=400):
     """
-    Generuje chmurę tagów na podstawie częstotliwości słów.
+    Generuje chmurę tagów jako obraz zakodowany w base64.
+    
+    Returns:
+        str: Zakodowany w base64 obraz chmury tagów
+    """
+    png = render_wordcloud(word_frequencies, width, height)
+    return base64.b64encode(png).decode('utf-8') if png else None
+
+def render_wordcloud(word_frequencies, width=800, height=400):
+    """
+    Generuje chmurę tagów na podstawie częstotliwości słów w bieżącym procesie.
     
     Args:
         word_frequencies (dict): Słownik {słowo: liczba_wystąpień}
@@ -92,46 +109,67 @@ def generate_wordcloud(word_frequencies, width=800, height=400):
         height (int): Wysokość obrazu
     
     Returns:
-        str: Zakodowany w base64 obraz chmury tagów
+        bytes: Obraz chmury tagów w formacie PNG
     """
     if not word_frequencies:
         return None
+    return draw_wordcloud(build_wordcloud_payload(word_frequencies, width, height))
+
+def build_wordcloud_payload(word_frequencies, width=800, height=400):
+    """Przygotowuje dane chmury tagów (proste typy - do przekazania do procesu renderującego)."""
+    return {"frequencies": dict(word_frequencies), "width": width, "height": height}
+
+def wordcloud_digest(payload):
+    """
+    Oblicza skrót danych chmury tagów (słowa, liczby wystąpień i rozmiar obrazu).
+    
+    Returns:
+        str: Skrót szesnastkowy identyfikujący obraz
+    """
+    key = [WORDCLOUD_RENDER_VERSION, payload["width"], payload["height"], sorted(payload["frequencies"].items())]
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def draw_wordcloud(payload):
+    """
+    Rysuje chmurę tagów na podstawie danych z build_wordcloud_payload().
     
-    # Tworzymy wykres chmury tagów
-    wordcloud = WordCloud(
-        width=width, 
-        height=height,
+    Obrazy są zapamiętywane według skrótu słownika częstotliwości, więc
+    niezmienione słownictwo użytkownika nie jest renderowane ponownie.
+    
+    Returns:
+        bytes: Obraz chmury tagów w formacie PNG
+    """
+    digest = wordcloud_digest(payload)
+    png = wordcloud_image_cache.get(digest)
+    if png is None:
+        png = _render_wordcloud_png(payload)
+        wordcloud_image_cache.set(digest, png)
+    return png
+
+def _render_wordcloud_png(payload):
+    """Renderuje chmurę tagów bezpośrednio do PNG w docelowym rozmiarze (bez matplotlib)."""
+    wordcloud = wordcloud_lib.WordCloud(
+        width=payload["width"],
+        height=payload["height"],
         background_color='#0d1117',  # Ciemne tło pasujące do motywu
         colormap='viridis',  # Kolorowa paleta
         max_words=100,
         prefer_horizontal=0.9,  # 90% słów poziomo
-        scale=3,  # Wysoka rozdzielczość
+        scale=1,  # Obraz od razu w rozmiarze docelowym
         min_font_size=10,
         max_font_size=200,
         random_state=42  # Dla powtarzalności
     )
     
     # Generujemy chmurę tagów
-    wordcloud.generate_from_frequencies(word_frequencies)
-    
-    # Tworzymy wykres matplotlib
-    plt.figure(figsize=(width/100, height/100), facecolor='#0d1117')
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
-    plt.tight_layout(pad=0)
+    wordcloud.generate_from_frequencies(payload["frequencies"])
     
-    # Zapisujemy do bufora
+    # Obraz PIL zapisywany wprost do bufora
     buf = io.BytesIO()
-    plt.savefig(buf, format='png', facecolor='#0d1117', bbox_inches='tight', pad_inches=0, dpi=100)
-    buf.seek(0)
+    wordcloud.to_image().save(buf, format='PNG', optimize=True)
+    return buf.getvalue()
     
-    # Kodujemy do base64
-    img_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    plt.close()
-    
-    return img_base64
-    
-def analyze_user_responses_keywords(user_id, db):
+def analyze_user_responses_keywords(user_id, db, with_image=True):
     """
     Analizuje odpowiedzi użytkownika, aby zidentyfikować najczęściej używane słowa
     i generuje chmurę tagów.
@@ -139,44 +177,31 @@ def analyze_user_responses_keywords(user_id, db):
     Args:
         user_id (int): ID użytkownika
         db: Obiekt bazy danych SQLAlchemy
+        with_image (bool): Czy generować obraz chmury tagów (strona /analysis
+                           pobiera go osobno z /charts/wordcloud/<user>.png)
     
     Returns:
         dict: Wyniki analizy zawierające:
             - top_keywords (dict): Najczęściej używane słowa i ich częstotliwość
             - wordcloud_image (str): Zakodowany w base64 obraz chmury tagów
     """
-    from models import Conversation
+    from term_frequency import get_top_terms
     
-    # Pobierz odpowiedzi użytkownika z wypełnionymi odpowiedziami
-    conversations = Conversation.query.filter_by(user_id=user_id)\
-        .filter(Conversation.response.isnot(None))\
-        .order_by(Conversation.timestamp.asc())\
-        .all()
+    # Najczęściej używane słowa z przyrostowo utrzymywanej tabeli (bez przetwarzania całej historii)
+    word_frequencies = get_top_terms(user_id)
     
-    if not conversations:
+    if not word_frequencies:
         return {
             "top_keywords": {},
             "wordcloud_image": None,
             "message": "Potrzebujemy więcej Twoich odpowiedzi, aby przeprowadzić analizę słów kluczowych."
         }
     
-    # Przekształć odpowiedzi do formatu wymaganego przez analizę
-    responses = []
-    for conv in conversations:
-        responses.append({
-            "question": conv.question,
-            "response": conv.response,
-            "timestamp": conv.timestamp
-        })
-    
-    # Wyodrębnij najczęściej używane słowa
-    word_frequencies = extract_keywords(responses)
-    
     # Wygeneruj chmurę tagów
-    wordcloud_image = generate_wordcloud(word_frequencies)
+    wordcloud_image = generate_wordcloud(word_frequencies) if with_image else None
     
     # Przygotuj wynik
-    top_keywords = dict(sorted(word_frequencies.items(), key=lambda x: x[1], reverse=True)[:30])
+    top_keywords = dict(list(word_frequencies.items())[:30])
     
     return {
         "top_keywords": top_keywords,